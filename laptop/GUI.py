@@ -9,6 +9,9 @@ from PIL import Image, ImageTk
 import cv2
 import time
 import socket
+import threading
+from datetime import datetime
+from reconnect import Backoff
 
 ### Steps for running in Docker ### 
 # 1. Install VcXsrv (https://vcxsrv.com/)
@@ -22,8 +25,17 @@ import socket
 # 5. Run "docker pull saamij/wildlife-gui:latest"
 # 6. Run "docker run -e DISPLAY=host.docker.internal:0 --rm -v /tmp/.X11-unix:/tmp/.X11-unix wildlife-gui"
 
+def fit_photo(frame, box_w, box_h):
+    # Frame scaled to fit the video area (aspect kept) -> (resized frame, Tk PhotoImage); needs a Tk root
+    h, w = frame.shape[:2]
+    scale = min(box_w / w, box_h / h)
+    new_w, new_h = max(1, int(w * scale)), max(1, int(h * scale))
+    frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_AREA)
+    return frame, ImageTk.PhotoImage(image=Image.fromarray(frame))
+
+
 class GUI(tk.Tk):
-    def __init__(self, host, port, camera=0):
+    def __init__(self, host, port, camera=0, session=None):
         super().__init__()
 
         # Variable initializatio
@@ -37,8 +49,19 @@ class GUI(tk.Tk):
         self.port = port
         self.power = 0.006  # Initial power variable
         self.lastImage = None
+        self._shots_seen = 0
+        self._send_lock = threading.Lock()  # SNAP requests also come from the inference thread
+        self.sock = None
+
+        # Control link: a background thread connects, keeps it alive with PINGs and reconnects
+        # with backoff; the Tk thread only polls the states below (Tk calls stay on the Tk thread)
+        self.keepalive = 2.0                # seconds between PINGs; no reply for 2.5x this = link down
+        self._control_state = "disconnected"
+        self._control_thread = None
+        self._closing = threading.Event()
 
         self.videoClient = camera
+        self.session = session      # optional SessionClient: control rides its channel instead of port 5000
 
         # calling layout window
         self.interface_layout()
@@ -72,6 +95,8 @@ class GUI(tk.Tk):
         self.leftWheelLabel.grid(row=1, column=0, sticky="w", pady=5)
         self.rightWheelLabel = tk.Label(self.fpsFrame, text="Right Whee (rpm)\t: 0", bg="white", fg="black", font=("Arial", 14, "bold"))
         self.rightWheelLabel.grid(row=2, column=0, sticky="w", pady=5)
+        self.cameraModeLabel = tk.Label(self.fpsFrame, text="Camera\t: -", bg="white", fg="black", font=("Arial", 14, "bold"))
+        self.cameraModeLabel.grid(row=3, column=0, sticky="w", pady=5)
 
         # info area
         self.connectionStatusFrame = tk.Frame(self, width=120, height=150, bg="white")
@@ -138,27 +163,105 @@ class GUI(tk.Tk):
         self.btn_save_image.grid(row=1, column=2, padx=5, pady=5)
 
     def connection_setup(self):
-        try:
-            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.sock.connect((self.host, self.port))
-            self.connectionStatusLabel.config(text="Connected", fg="green")
+        # Starts the links once; from then on control and video reconnect by themselves
+        if self._control_thread is not None:
+            return
+        self.connectionStatusLabel.config(text="Connecting...", fg="orange")
+        self._control_thread = threading.Thread(target=self._control_link, daemon=True)
+        self._control_thread.start()
+        self.videoClient.start()
+        stills = getattr(self.videoClient, "still_client", None)
+        if stills is not None:
+            # SNAP requests share the control socket; stills come back on their own channel
+            stills.send = self.send_command
+            stills.start()
+        self.after(250, self.update_link_status)
+
+    # ----- control link (background thread) -----
+    def _open_control(self):
+        if self.session is not None:
+            return self.session.connect().channel("control")
+        return socket.create_connection((self.host, self.port), timeout=5.0)
+
+    def _control_link(self):
+        backoff = Backoff()
+        while not self._closing.is_set():
+            try:
+                sock = self._open_control()
+            except (socket.error, ValueError, KeyError) as e:
+                self._control_state = "reconnecting"
+                delay = backoff.next()
+                print(f"[CONTROL] connect failed: {e}; retrying in {delay:.1f} s")
+                self._closing.wait(delay)
+                continue
+            with self._send_lock:
+                self.sock = sock
+            self._control_state = "connected"
             print("Connected to Pi Zero 2")
-            self.videoClient.connect()
-            self.videoClient.start()
-            
-        except socket.error as e:
-            self.connectionStatusLabel.config(text=f"Error: {e}", fg="red")
-            print(f"Connection error: {e}")
-            self.sock = None
+            try:
+                self._watch_control(sock, backoff)
+            except (socket.error, ConnectionError) as e:
+                print(f"[CONTROL] link lost: {e}")
+            with self._send_lock:
+                if self.sock is sock:
+                    self.sock = None
+            try:
+                sock.close()
+                if self.session is not None:
+                    # A closed channel cannot be reopened: end the mux it belonged to (unless video
+                    # already replaced it), and the next connect() resumes the session on a new one
+                    self.session.close_if(sock.mux)
+            except socket.error:
+                pass
+            if not self._closing.is_set():
+                self._control_state = "reconnecting"
+                self._closing.wait(backoff.next())
+
+    def _watch_control(self, sock, backoff):
+        # The Pi answers "PING" with "PONG"; silence for 2.5 keepalives means the link is gone
+        sock.settimeout(2.5 * self.keepalive)
+        while not self._closing.is_set():
+            with self._send_lock:
+                sock.sendall(b"PING\n")
+            if not sock.recv(1024):
+                raise ConnectionError("closed by the Pi")
+            backoff.reset()
+            self._closing.wait(self.keepalive)
+
+    def update_link_status(self):
+        # Tk thread: fold the control and video link states into the status label
+        video = getattr(self.videoClient, "link_state", "connected")
+        states = {"control": self._control_state, "video": video}
+        down = [name for name, state in states.items() if state != "connected"]
+        if not down:
+            text = "Connected"
+            if self.session is not None:
+                text += f" (session {self.session.session_id})"
+            recovery = getattr(self.videoClient, "recovery_ms", None)
+            if recovery:
+                text += f"\nvideo back in {recovery[-1]:.0f} ms"
+            self.connectionStatusLabel.config(text=text, fg="green")
+        elif any(states[name] == "reconnecting" for name in down):
+            self.connectionStatusLabel.config(text=f"Reconnecting ({', '.join(down)})...", fg="orange")
+        else:
+            self.connectionStatusLabel.config(text="Connecting...", fg="orange")
+        if not self._closing.is_set():
+            self.after(250, self.update_link_status)
 
     def send_command(self, command):
         try:
             if self.sock:
                 try:
-                    self.sock.sendall(command.encode())
+                    with self._send_lock:
+                        self.sock.sendall(command.encode())
                     print(f"Sent command: {command}")
                 except socket.error as e:
                     print(f"Error sending command: {e}")
+                    # Wake the control thread so it reconnects now instead of at the next PING
+                    try:
+                        self.sock.shutdown(socket.SHUT_RDWR)
+                    except (socket.error, AttributeError):
+                        pass
             else:
                 print("Socket not connected.")
         except:
@@ -194,6 +297,8 @@ class GUI(tk.Tk):
             self.btn_start.invoke()  # Start the camera
         elif event.keysym == "Return":
             self.btn_save_image.invoke()  # Save the image
+        elif event.keysym == "F5":
+            self.videoClient.request_model_reload()  # Hot-swap the detection model
         elif event.keysym == "Escape":
             self.on_close()  # Close the application
         elif event.char == '=':
@@ -274,21 +379,12 @@ class GUI(tk.Tk):
         # if not self._running or not self.cap:
         #     return
 
-        if not self.videoClient.frame_queue.empty():
-            frame = self.videoClient.frame_queue.get()
-            self.videoClient.frame_queue.task_done()
-            
-
+        frame = self.videoClient.get_frame()
+        if frame is not None:
             # Fit to label while keeping aspect ratio
-            h, w, _ = frame.shape
             Lw = self.videoFrame.winfo_width() or 1
             Lh = self.videoFrame.winfo_height() or 1
-            scale = min(Lw / w, Lh / h)
-            new_w, new_h = max(1, int(w * scale)), max(1, int(h * scale))
-            frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_AREA)
-
-            img = Image.fromarray(frame)
-            self._imgtk_cache = ImageTk.PhotoImage(image=img)
+            frame, self._imgtk_cache = fit_photo(frame, Lw, Lh)
             self.lastImage = frame  # Store the last displayed image
             self.videoLabel.configure(image=self._imgtk_cache)
         else:
@@ -298,6 +394,19 @@ class GUI(tk.Tk):
             return
         
         self.fpsLabel.config(text=f"FPS: \t {self.videoClient._fps:.1f}")
+        # Pi duty-cycle state (sentinel / active), reported in the frame tags
+        mode = getattr(self.videoClient, "frame_tags", {}).get("mode")
+        if mode:
+            self.cameraModeLabel.config(text=f"Camera\t: {mode}", fg="green" if mode == "active" else "orange")
+
+        # Refresh the list when the video pipeline auto-saved a best shot
+        shots = self.videoClient.shots_saved()
+        stills = getattr(self.videoClient, "still_client", None)
+        if stills is not None:
+            shots += stills.saved
+        if shots != self._shots_seen:
+            self._shots_seen = shots
+            self.load_images_list()
 
         # Schedule next frame (~30–33 ms ≈ 30 FPS)
         self.after(18, self.update_frame)
@@ -307,9 +416,13 @@ class GUI(tk.Tk):
             messagebox.showwarning("Warning", "No image to save.")
             return
         
-        detection = self.videoClient.get_latest()
-        animal_name = detection["animals"][-1]
-        dateTime = detection["times"][-1]
+        sighting = self.videoClient.current_sighting()
+        if sighting is not None:
+            animal_name = sighting.animal
+            dateTime = datetime.fromtimestamp(sighting.start).isoformat(timespec='seconds')
+        else:
+            animal_name = "Unknown"
+            dateTime = datetime.now().isoformat(timespec='seconds')
 
         
         filename = f"laptop/stored_image/{animal_name}_{dateTime}.png"
@@ -317,7 +430,16 @@ class GUI(tk.Tk):
         cv2.imwrite(filename, self.lastImage)
         self.load_images_list()
 
+        # Ask the Pi for the same moment at full sensor resolution; saved alongside when it arrives
+        stills = getattr(self.videoClient, "still_client", None)
+        if stills is not None:
+            if sighting is not None:
+                stills.request(animal_name, sighting.peak_conf, sighting.last_bbox, reason="operator")
+            else:
+                stills.request(animal_name, reason="operator")
+
     def on_close(self):
+        self._closing.set()
         self.stop_camera()
         self.destroy()
         if self.sock:
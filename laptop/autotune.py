@@ -0,0 +1,183 @@
+import glob
+import json
+import os
+import platform
+import time
+
+import cv2
+import numpy as np
+import torch
+
+CACHE_PATH = os.path.expanduser("~/.cache/wildlife-robot/autotune.json")
+IMAGE_DIR = "laptop/stored_image"
+
+IMGSZ_OPTIONS = (320, 416, 512, 640)
+BENCH_SIZE = (480, 270)     # VideoClient's inference frames: the 960x540 stream decoded at 1/2
+
+
+def available_devices():
+    devs = ["cpu"]
+    if torch.cuda.is_available():
+        devs.append("cuda")
+    if torch.backends.mps.is_available():
+        devs.append("mps")
+    return devs
+
+
+def default_device():
+    # Previous hardcoded preference: mps -> cuda -> cpu
+    if torch.backends.mps.is_available():
+        return "mps"
+    if torch.cuda.is_available():
+        return "cuda"
+    return "cpu"
+
+
+def thread_options():
+    n = os.cpu_count() or 1
+    return sorted({1, max(1, n // 2), n})
+
+
+def capped_sizes(options, long_side, stride=32):
+    # Input sizes worth trying on frames with this long side. Above it the letterbox only upsamples:
+    # slower, and no detail the frame does not have. The frame's own size (stride-aligned) is the top
+    native = -(-int(long_side) // stride) * stride
+    return sorted({s for s in options if s < native} | {min(native, max(options))})
+
+
+def bench_frames(image_dir=IMAGE_DIR, n=24, size=BENCH_SIZE):
+    # Replayed frames from stored_image (JPEG round-trip like the live stream), else synthetic
+    frames = []
+    for path in sorted(glob.glob(os.path.join(image_dir, "*.png")))[:n]:
+        img = cv2.imread(path, cv2.IMREAD_COLOR)
+        if img is None:
+            continue
+        img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+        ok, jpeg = cv2.imencode(".jpg", img, [int(cv2.IMWRITE_JPEG_QUALITY), 60])
+        frames.append(cv2.imdecode(jpeg, cv2.IMREAD_COLOR) if ok else img)
+    if not frames:
+        rng = np.random.default_rng(0)
+        for _ in range(n):
+            img = rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)
+            cv2.GaussianBlur(img, (9, 9), 0, dst=img)
+            frames.append(img)
+    return frames
+
+
+def _cache_key(model_path, size, batch=1):
+    st = os.stat(model_path)
+    return (f"{platform.node()}|{platform.machine()}|torch {torch.__version__}|{os.path.basename(model_path)}"
+            f"|{st.st_size}|{int(st.st_mtime)}|{size[0]}x{size[1]}|batch {batch}")
+
+
+def load_cached(model_path, target_fps, size=BENCH_SIZE, cache_path=CACHE_PATH, batch=1):
+    try:
+        with open(cache_path) as f:
+            entry = json.load(f).get(_cache_key(model_path, size, batch))
+    except (OSError, ValueError):
+        return None
+    if entry and entry.get("target_fps") == target_fps:
+        return entry
+    return None
+
+
+def _save(model_path, size, entry, cache_path=CACHE_PATH, batch=1):
+    try:
+        with open(cache_path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    data[_cache_key(model_path, size, batch)] = entry
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(cache_path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def _measure(model_path, frames, device, imgsz, threads, half, seconds, batch=1):
+    # -> frames per second, where each frame is one forward pass over `batch` inputs
+    from ultralytics import YOLO
+    from fast_infer import FastDetector
+
+    yolo = YOLO(model_path)
+    try:
+        yolo.fuse()
+    except Exception:
+        pass
+    det = FastDetector(yolo, imgsz=imgsz, device=device, half=half, threads=threads, max_batch=batch)
+    for f in frames[:3]:
+        det.infer_batch([f] * batch)
+    n = 0
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        det.infer_batch([frames[n % len(frames)]] * batch)
+        n += 1
+    return n / (time.perf_counter() - t0)
+
+
+def autotune(model_path, target_fps=15.0, frames=None, size=BENCH_SIZE, devices=None, imgsz_options=IMGSZ_OPTIONS,
+             seconds=1.5, cache_path=CACHE_PATH, batch=1):
+    """
+    Benchmark imgsz x threads x half/float x device on replayed/synthetic frames of
+    `size` (the frames inference will see) and return the most accurate config that
+    meets target_fps. Accuracy is ranked by input size first (small animals need
+    pixels), then float over half; sizes above the frame's own are not tried, they
+    only upsample. If nothing meets the target the fastest config wins. `batch` is
+    the number of inputs per frame (tiled mode: tiles plus the full-frame view), so
+    the FPS is what the live pipeline gets. The choice is cached per
+    machine/model/frame size/batch.
+    """
+    if frames is None:
+        frames = bench_frames(size=size)
+    size = (frames[0].shape[1], frames[0].shape[0])
+    imgsz_options = capped_sizes(imgsz_options, max(size))
+    devices = devices or available_devices()
+    default_threads = torch.get_num_threads()
+    results = []
+    for device in devices:
+        for half in ([False, True] if device != "cpu" else [False]):
+            for threads in (thread_options() if device == "cpu" else [None]):
+                for imgsz in imgsz_options:
+                    try:
+                        fps = _measure(model_path, frames, device, imgsz, threads, half, seconds, batch)
+                    except Exception as e:
+                        print(f"[TUNE] {device} imgsz={imgsz} half={half} threads={threads}: failed ({e})")
+                        continue
+                    print(f"[TUNE] {device:4s} imgsz={imgsz:4d} half={half!s:5s} threads={threads} "
+                          f"batch={batch}: {fps:6.1f} FPS")
+                    results.append({"device": device, "imgsz": imgsz, "threads": threads, "half": half,
+                                    "batch": batch, "fps": fps})
+    torch.set_num_threads(default_threads)
+    if not results:
+        raise RuntimeError("autotune: no configuration could be run")
+
+    ok = [r for r in results if r["fps"] >= target_fps]
+    if ok:
+        best = max(ok, key=lambda r: (r["imgsz"], not r["half"], r["fps"]))
+    else:
+        best = max(results, key=lambda r: r["fps"])
+    best = dict(best, target_fps=target_fps, met_target=bool(ok), tuned_at=time.time())
+    _save(model_path, size, best, cache_path, batch)
+    print(f"[TUNE] selected {best}")
+    return best
+
+
+def load_or_tune(model_path, target_fps=15.0, force=False, size=BENCH_SIZE, batch=1, **kwargs):
+    if not force:
+        cached = load_cached(model_path, target_fps, size, kwargs.get("cache_path", CACHE_PATH), batch)
+        if cached is not None:
+            print(f"[TUNE] using cached settings {cached}")
+            return cached
+    return autotune(model_path, target_fps=target_fps, size=size, batch=batch, **kwargs)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Pick inference settings for this machine")
+    ap.add_argument("--model", default="laptop/best.pt")
+    ap.add_argument("--target-fps", type=float, default=15.0)
+    ap.add_argument("--seconds", type=float, default=1.5, help="Benchmark time per candidate")
+    ap.add_argument("--force", action="store_true", help="Ignore the cache and re-run")
+    ap.add_argument("--batch", type=int, default=1, help="Inputs per frame (tiled mode: max tiles + 1)")
+    args = ap.parse_args()
+    load_or_tune(args.model, args.target_fps, force=args.force, batch=args.batch, seconds=args.seconds)
@@ -0,0 +1,332 @@
+import json
+import multiprocessing as mp
+import os
+import queue
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import cv2
+
+from detection_store import DetectionStore
+
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".bmp")
+OUT_PATH = "laptop/batch_detections.jsonl"
+NAME_RE = re.compile(r"(.+?)_(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?)(?:_.*)?$")
+
+# Same order as laptop/main.py; used when the model carries no class names
+ANIMAL_NAMES = [
+    "Cockatoo", "Crocodile", "Frog", "Kangaroo", "Koala", "Owl", "Penguin",
+    "Platypus", "Snake", "Tasmanian Devil", "Wombat"
+]
+
+
+# ----- archive -----
+def scan(root):
+    # Every image under root, sorted so runs (and resumes) see the same order
+    paths = []
+    for d, _, files in os.walk(root):
+        paths += [os.path.join(d, f) for f in files if f.lower().endswith(IMAGE_EXTS)]
+    return sorted(paths)
+
+
+def parse_name(path):
+    # "Tasmanian Devil_2025-10-14T20:24:23.png" -> ("Tasmanian Devil", unix time); either may be None.
+    # Anything after the timestamp is a suffix: Pi stills ("_full..."), best shots ("_best<track>")
+    m = NAME_RE.match(os.path.splitext(os.path.basename(path))[0])
+    if m is None:
+        return None, None
+    try:
+        return m.group(1), datetime.fromisoformat(m.group(2)).timestamp()
+    except ValueError:
+        return None, None
+
+
+def load_done(out_path):
+    # -> records already in the output file. A line cut short by a crash is dropped from the file,
+    # so the next append starts on a clean line
+    records = []
+    if not os.path.exists(out_path):
+        return records
+    good = 0
+    with open(out_path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+            good += len(line)
+    if good != os.path.getsize(out_path):
+        print(f"[BATCH] dropping a partial record at the end of {out_path}")
+        with open(out_path, "r+b") as f:
+            f.truncate(good)
+    return records
+
+
+# ----- worker process -----
+def _load_detector(opts):
+    # -> (infer(frames) -> [(xyxy, conf, cls)], class names). Same backends as VideoClient:
+    # FastDetector, else ultralytics predict()
+    import torch
+    from ultralytics import YOLO
+    import autotune as autotuner
+
+    device = opts["device"] or autotuner.default_device()
+    yolo = YOLO(opts["model"])
+    try:
+        yolo.fuse()
+    except Exception:
+        pass
+    names = getattr(yolo, "names", None)
+    try:
+        from fast_infer import FastDetector
+        fast = FastDetector(yolo, imgsz=opts["imgsz"], device=device, conf=opts["conf"], iou=opts["iou"],
+                            half=opts["half"], threads=opts["threads"], max_batch=opts["batch"])
+        return fast.infer_batch, names
+    except Exception as e:
+        print(f"[BATCH] fast inference path unavailable, using predict(): {e}")
+    if opts["threads"]:
+        torch.set_num_threads(opts["threads"])
+
+    def predict(frames):
+        out = []
+        for r in yolo.predict(source=frames, imgsz=opts["imgsz"], conf=opts["conf"], iou=opts["iou"],
+                              device=device, half=opts["half"], verbose=False):
+            b = r.boxes
+            out.append((b.xyxy.cpu().numpy(), b.conf.cpu().numpy(), b.cls.cpu().numpy().astype(int)))
+        return out
+    return predict, names
+
+
+def _decode(path, scale):
+    flags = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4,
+             8: cv2.IMREAD_REDUCED_COLOR_8}[scale]
+    return cv2.imread(path, flags)
+
+
+def _worker(opts, tasks, results):
+    # One model per process. Decode threads prefetch the next batch while this one is on the model.
+    # OpenCV's own thread pool stays off: the processes already fill the cores
+    cv2.setNumThreads(1)
+    try:
+        infer, names = _load_detector(opts)
+    except Exception as e:
+        results.put(("failed", str(e)))
+        return
+    if isinstance(names, dict):
+        names = [names[k] for k in sorted(names)]
+    results.put(("ready", names))
+
+    scale = opts["scale"]
+    with ThreadPoolExecutor(opts["decode_threads"]) as pool:
+        def fetch():
+            batch = tasks.get()
+            if batch is None:
+                return None
+            return batch, [pool.submit(_decode, p, scale) for p in batch]
+
+        pending = fetch()
+        while pending is not None:
+            batch, futures = pending
+            pending = fetch()                   # next batch decodes during this inference
+            frames = [f.result() for f in futures]
+            ok = [i for i, fr in enumerate(frames) if fr is not None]
+            t0 = time.perf_counter()
+            dets = infer([frames[i] for i in ok]) if ok else []
+            ms = 1000 * (time.perf_counter() - t0) / max(1, len(ok))
+            out = []
+            for path, fr in zip(batch, frames):
+                if fr is None:
+                    out.append({"path": path, "error": "unreadable"})
+            for i, (xyxy, conf, cls) in zip(ok, dets):
+                h, w = frames[i].shape[:2]
+                out.append({"path": batch[i], "w": w * scale, "h": h * scale, "ms": round(ms, 1),
+                            "boxes": (xyxy * scale).round().astype(int).tolist(),
+                            "conf": [round(float(c), 4) for c in conf], "cls": [int(c) for c in cls]})
+            results.put(("batch", out))
+    results.put(("done", None))
+
+
+# ----- report -----
+def top_class(record):
+    # Highest-confidence species in a record, or None
+    dets = record.get("detections") or []
+    return max(dets, key=lambda d: d["confidence"])["animal"] if dets else None
+
+
+def agreement(records):
+    # label -> (images, agreeing, Counter of what the model said instead)
+    table = defaultdict(lambda: [0, 0, Counter()])
+    for r in records:
+        if r.get("label") is None or "error" in r:
+            continue
+        row = table[r["label"]]
+        row[0] += 1
+        top = top_class(r)
+        if top == r["label"]:
+            row[1] += 1
+        else:
+            row[2][top or "(nothing)"] += 1
+    return table
+
+
+def report(records, elapsed, new):
+    if new:
+        print(f"\n[BATCH] {new} images in {elapsed:.1f} s: {new / elapsed:.1f} images/s")
+    errors = sum(1 for r in records if "error" in r)
+    unlabeled = sum(1 for r in records if "error" not in r and r.get("label") is None)
+    table = agreement(records)
+    total = sum(t[0] for t in table.values())
+    agree = sum(t[1] for t in table.values())
+    print(f"\n  {'filename label':<18s} {'images':>6s} {'agree':>6s} {'agree %':>7s}  most common instead")
+    for label in sorted(table):
+        n, ok, other = table[label]
+        instead = ", ".join(f"{name} x{c}" for name, c in other.most_common(3))
+        print(f"  {label:<18s} {n:6d} {ok:6d} {100 * ok / n:7.1f}  {instead}")
+    if total:
+        print(f"  {'all':<18s} {total:6d} {agree:6d} {100 * agree / total:7.1f}")
+    print(f"\n  {len(records)} images on record, {unlabeled} without a label in the name, {errors} unreadable")
+
+
+# ----- runner -----
+def run(root, out_path=OUT_PATH, model="laptop/best.pt", workers=None, threads=None, batch=8, imgsz=416,
+        device=None, conf=0.25, iou=0.45, half=False, scale=1, decode_threads=2, store=None, robot_id="batch",
+        names=None, limit=None):
+    """
+    Run the model over every image under `root`, in parallel, appending one JSON line per image to
+    `out_path`. Images already in `out_path` are skipped, so an interrupted run picks up where it
+    stopped. With `store` (a DetectionStore) the detections also go there under `robot_id`, stamped
+    with the capture time from the filename (else the file's mtime). Returns all records.
+    """
+    records = load_done(out_path)
+    done = {r["path"] for r in records}
+    todo = [p for p in scan(root) if os.path.relpath(p, root) not in done]
+    if limit is not None:
+        todo = todo[:limit]
+    print(f"[BATCH] {len(done)} images already in {out_path}, {len(todo)} to go")
+    if not todo:
+        report(records, 0.0, 0)
+        return records
+
+    # CPU: several processes with a few torch threads each beat one process with all of them
+    cores = os.cpu_count() or 1
+    on_cpu = device in (None, "cpu")
+    threads = threads or (max(1, min(4, cores)) if on_cpu else None)
+    workers = workers or (max(1, cores // threads) if on_cpu else 1)
+    workers = min(workers, max(1, -(-len(todo) // batch)))
+    opts = {"model": model, "device": device, "imgsz": imgsz, "conf": conf, "iou": iou, "half": half,
+            "threads": threads, "batch": batch, "scale": scale, "decode_threads": decode_threads}
+    print(f"[BATCH] {workers} worker(s) x {threads or 'default'} threads, batch {batch}, imgsz {imgsz}")
+
+    ctx = mp.get_context("spawn")          # no forked torch / OpenCV thread state
+    tasks, results = ctx.Queue(maxsize=2 * workers + 2), ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(opts, tasks, results), daemon=True) for _ in range(workers)]
+    for p in procs:
+        p.start()
+
+    def feed():
+        for i in range(0, len(todo), batch):
+            tasks.put(todo[i:i + batch])
+        for _ in procs:
+            tasks.put(None)
+    threading.Thread(target=feed, daemon=True).start()
+
+    new = 0
+    finished = 0
+    t0 = time.perf_counter()
+    last_print = t0
+    try:
+        with open(out_path, "a") as out:
+            while finished < workers:
+                try:
+                    kind, payload = results.get(timeout=5.0)
+                except queue.Empty:
+                    if not any(p.is_alive() for p in procs):
+                        raise RuntimeError("all workers exited")
+                    continue
+                if kind == "failed":
+                    raise RuntimeError(f"worker could not load the model: {payload}")
+                if kind == "ready":
+                    names = names or payload or ANIMAL_NAMES
+                    continue
+                if kind == "done":
+                    finished += 1
+                    continue
+                for r in payload:
+                    rec = _record(r, root, names)
+                    out.write(json.dumps(rec) + "\n")
+                    records.append(rec)
+                    if store is not None and "error" not in rec:
+                        store.add_many(rec["ts"], [(d["animal"], d["confidence"], d["bbox"])
+                                                   for d in rec["detections"]], robot_id=robot_id)
+                new += len(payload)
+                out.flush()
+                now = time.perf_counter()
+                if now - last_print >= 5.0:
+                    last_print = now
+                    print(f"[BATCH] {new}/{len(todo)}  {new / (now - t0):.1f} images/s")
+    finally:
+        for p in procs:
+            p.join(timeout=1.0)
+            if p.is_alive():
+                p.terminate()
+    report(records, time.perf_counter() - t0, new)
+    return records
+
+
+def _record(r, root, names):
+    path = r["path"]
+    label, ts = parse_name(path)
+    rec = {"path": os.path.relpath(path, root), "label": label}
+    if "error" in r:
+        rec["error"] = r["error"]
+        return rec
+    if ts is None:
+        ts = os.path.getmtime(path)
+
+    def name(c):
+        return names[c] if 0 <= c < len(names) else str(c)
+    rec.update(ts=ts, w=r["w"], h=r["h"], ms=r["ms"],
+               detections=[{"animal": name(c), "confidence": s, "bbox": b}
+                           for b, s, c in zip(r["boxes"], r["conf"], r["cls"])])
+    return rec
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Re-run the detector over an image archive and audit filename labels")
+    ap.add_argument("root", nargs="?", default="laptop/stored_image", help="directory of images (searched recursively)")
+    ap.add_argument("--out", default=OUT_PATH, help="JSON Lines results; existing entries are skipped (resume)")
+    ap.add_argument("--model", default="laptop/best.pt")
+    ap.add_argument("--workers", type=int, default=None, help="model processes (default: fill the CPU cores)")
+    ap.add_argument("--threads", type=int, default=None, help="torch threads per worker (default: up to 4)")
+    ap.add_argument("--batch", type=int, default=8, help="images per inference call")
+    ap.add_argument("--imgsz", type=int, default=416)
+    ap.add_argument("--device", default=None, help="cpu / cuda / mps (default: best available)")
+    ap.add_argument("--conf", type=float, default=0.25)
+    ap.add_argument("--half", action="store_true", help="half precision on cuda / mps")
+    ap.add_argument("--scale", type=int, choices=[1, 2, 4, 8], default=1,
+                    help="decode at 1/scale (cheap for large JPEGs); boxes are reported in full-size pixels")
+    ap.add_argument("--decode-threads", type=int, default=2, help="prefetching decode threads per worker")
+    ap.add_argument("--store", metavar="DB", default=None, help="also write detections to this detection store")
+    ap.add_argument("--robot-id", default="batch", help="robot_id for the store rows")
+    ap.add_argument("--app-names", action="store_true",
+                    help="name classes with main.py's ANIMAL_NAMES instead of the model's own names")
+    ap.add_argument("--limit", type=int, default=None, help="process at most this many new images")
+    args = ap.parse_args()
+
+    db = DetectionStore(args.store) if args.store else None
+    try:
+        run(args.root, out_path=args.out, model=args.model, workers=args.workers, threads=args.threads,
+            batch=args.batch, imgsz=args.imgsz, device=args.device, conf=args.conf, half=args.half,
+            scale=args.scale, decode_threads=args.decode_threads, store=db, robot_id=args.robot_id,
+            names=ANIMAL_NAMES if args.app_names else None, limit=args.limit)
+    finally:
+        if db is not None:
+            db.close()
@@ -0,0 +1,130 @@
+import heapq
+import os
+import queue
+import threading
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+IMAGE_DIR = "laptop/stored_image"
+
+
+def sharpness(gray_roi, max_side=128):
+    # Variance of the Laplacian; ROI is downscaled first so the cost is bounded
+    h, w = gray_roi.shape[:2]
+    if h < 3 or w < 3:
+        return 0.0
+    s = max_side / max(h, w)
+    if s < 1.0:
+        gray_roi = cv2.resize(gray_roi, (max(3, int(w * s)), max(3, int(h * s))), interpolation=cv2.INTER_AREA)
+    return float(cv2.Laplacian(gray_roi, cv2.CV_32F).var())
+
+
+class BestShotSelector:
+    """
+    Keeps a bounded top-k of candidate frames per open track and writes only the
+    winner when the sighting closes.
+
+    Score = w_conf * confidence + w_sharp * sharpness + w_size * box size, with
+    sharpness and size squashed into [0, 1). A candidate's frame is only copied
+    when it actually enters the top-k, so most frames cost one small Laplacian.
+    """
+
+    def __init__(self, k=3, out_dir=IMAGE_DIR, w_conf=0.5, w_sharp=0.3, w_size=0.2,
+                 sharp_ref=150.0, save_crop=False, pad=0.15):
+        self.k = int(k)
+        self.out_dir = out_dir
+        self.w_conf = float(w_conf)
+        self.w_sharp = float(w_sharp)
+        self.w_size = float(w_size)
+        self.sharp_ref = float(sharp_ref)   # Laplacian variance that scores 0.5
+        self.save_crop = bool(save_crop)    # save padded bbox crop instead of the full frame
+        self.pad = float(pad)
+        self.saved = 0                      # number of shots written so far (GUI polls this)
+        self.last_path = None
+
+        self._heaps = {}                    # track_id -> min-heap of (score, seq, image, conf)
+        self._seq = 0
+        self._write_q = queue.Queue(maxsize=32)
+        threading.Thread(target=self._write_loop, daemon=True).start()
+
+    def score(self, frame, bbox, conf):
+        x1, y1, x2, y2 = (int(v) for v in bbox)
+        h, w = frame.shape[:2]
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(w, x2), min(h, y2)
+        if x2 <= x1 or y2 <= y1:
+            return 0.0
+        roi = cv2.cvtColor(frame[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY)
+        sharp = sharpness(roi)
+        sharp_n = sharp / (sharp + self.sharp_ref)
+        size_n = np.sqrt(((x2 - x1) * (y2 - y1)) / float(w * h))
+        return self.w_conf * float(conf) + self.w_sharp * sharp_n + self.w_size * float(size_n)
+
+    def offer(self, track_id, frame, bbox, conf, full_frame=None):
+        # Call with the un-annotated frame, once per detection. bbox is in `frame` coordinates;
+        # full_frame, if given, is a callable returning a higher-res version to keep instead.
+        sc = self.score(frame, bbox, conf)
+        heap = self._heaps.setdefault(track_id, [])
+        if len(heap) >= self.k and sc <= heap[0][0]:
+            return sc
+        src = frame
+        if full_frame is not None:
+            src = full_frame()
+            if src is None:
+                src = frame
+            else:
+                bbox = np.asarray(bbox, dtype=np.float32) * (src.shape[1] / frame.shape[1])
+        img = self._crop(src, bbox) if self.save_crop else src.copy()
+        self._seq += 1
+        item = (sc, self._seq, img, float(conf))
+        if len(heap) < self.k:
+            heapq.heappush(heap, item)
+        else:
+            heapq.heapreplace(heap, item)
+        return sc
+
+    def _crop(self, frame, bbox):
+        x1, y1, x2, y2 = (int(v) for v in bbox)
+        h, w = frame.shape[:2]
+        px, py = int((x2 - x1) * self.pad), int((y2 - y1) * self.pad)
+        return frame[max(0, y1 - py):min(h, y2 + py), max(0, x1 - px):min(w, x2 + px)].copy()
+
+    def best(self, track_id):
+        heap = self._heaps.get(track_id)
+        return max(heap) if heap else None
+
+    def finish(self, sighting):
+        # Sighting closed: queue the winner for writing, drop the rest
+        heap = self._heaps.pop(sighting.track_id, None)
+        if not heap:
+            return None
+        sc, _, img, conf = max(heap)
+        stamp = datetime.fromtimestamp(sighting.start).isoformat(timespec='seconds')
+        # Own suffix: "{animal}_{stamp}.png" is the operator's Save Image for the same sighting, and the
+        # track id keeps two sightings of one species starting in the same second apart
+        path = os.path.join(self.out_dir, f"{sighting.animal}_{stamp}_best{sighting.track_id}.png")
+        try:
+            self._write_q.put_nowait((path, img))
+        except queue.Full:
+            print(f"[BEST] write queue full, dropped shot for {sighting}")
+            return None
+        return path
+
+    def retain(self, track_ids):
+        # Forget candidates of tracks that were dropped without becoming a sighting
+        for tid in [t for t in self._heaps if t not in track_ids]:
+            del self._heaps[tid]
+
+    def _write_loop(self):
+        while True:
+            path, img = self._write_q.get()
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                if cv2.imwrite(path, img):
+                    self.last_path = path
+                    self.saved += 1
+                    print(f"[BEST] saved {path}")
+            except Exception as e:
+                print(f"[BEST] write error: {e}")
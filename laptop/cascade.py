@@ -0,0 +1,148 @@
+import cv2
+import numpy as np
+import torch
+
+
+def map_class_names(source, target):
+    # Classifier class index -> index in `target` (the app's species list), matched by name; every
+    # classifier class must be a known species, or its votes would land on the wrong animal
+    if isinstance(source, dict):
+        source = [source[k] for k in sorted(source)]
+    if isinstance(target, dict):
+        target = [target[k] for k in sorted(target)]
+    index = {str(n).strip().lower(): i for i, n in enumerate(target)}
+    missing = [n for n in source if str(n).strip().lower() not in index]
+    if missing:
+        raise ValueError(f"classifier classes not in the species list: {', '.join(map(str, missing))}")
+    return np.array([index[str(n).strip().lower()] for n in source], dtype=np.int64)
+
+
+class _TrackVotes:
+    __slots__ = ("prob_sum", "n", "last_frame")
+
+    def __init__(self, nc):
+        self.prob_sum = np.zeros(nc, dtype=np.float32)
+        self.n = 0
+        self.last_frame = -1
+
+    def mean(self):
+        return self.prob_sum / max(1, self.n)
+
+
+class SpeciesCascade:
+    """
+    Second stage of the detector -> classifier cascade.
+
+    A small generic "animal" detector finds boxes on every frame (run through
+    VideoClient's normal inference path); this class classifies the crops, all
+    crops of a frame in one batched forward pass. Results are accumulated per
+    track, and once a track's species is settled (enough votes with a confident
+    mean) its crops are skipped except for an occasional re-check. With
+    `class_names`, the classifier's classes are matched to that list by name
+    and classify() returns indices into it.
+    """
+
+    def __init__(self, classifier_path, device="cpu", imgsz=128, max_batch=8, settle_votes=3,
+                 settle_conf=0.85, recheck_every=30, pad=0.1, half=False, class_names=None):
+        from ultralytics import YOLO
+
+        if not classifier_path:
+            # YOLO(None) would quietly load (or download) some default model instead
+            raise ValueError("the cascade needs species classifier weights")
+        self.device = torch.device(device)
+        self.imgsz = int(imgsz)
+        self.max_batch = int(max_batch)
+        self.settle_votes = int(settle_votes)
+        self.settle_conf = float(settle_conf)
+        self.recheck_every = int(recheck_every)
+        self.pad = float(pad)
+        self.half = bool(half) and self.device.type in ("cuda", "mps")
+
+        yolo = YOLO(classifier_path)
+        self.names = yolo.names
+        self._to_target = map_class_names(self.names, class_names) if class_names is not None else None
+        net = yolo.model.to(self.device).eval()
+        self.net = net.half() if self.half else net.float()
+        self.nc = len(self.names)
+
+        dtype = torch.float16 if self.half else torch.float32
+        self._host = torch.zeros((self.max_batch, self.imgsz, self.imgsz, 3), dtype=torch.uint8,
+                                 pin_memory=self.device.type == "cuda")
+        self._canvas = self._host.numpy()
+        self._input = torch.empty((self.max_batch, 3, self.imgsz, self.imgsz), dtype=dtype, device=self.device)
+        self._tracks = {}           # track_id -> _TrackVotes
+        self._frame = 0
+        self.crops_classified = 0   # counters so the saving is visible
+        self.crops_skipped = 0
+
+    def _settled(self, votes):
+        if votes.n < self.settle_votes:
+            return False
+        if self._frame - votes.last_frame >= self.recheck_every:
+            return False
+        return float(votes.mean().max()) >= self.settle_conf
+
+    def _classify(self, frame, boxes):
+        # boxes in `frame` coordinates -> (n, nc) probabilities, one forward per max_batch crops
+        h, w = frame.shape[:2]
+        out = []
+        for start in range(0, len(boxes), self.max_batch):
+            chunk = boxes[start:start + self.max_batch]
+            for i, (x1, y1, x2, y2) in enumerate(chunk):
+                px, py = (x2 - x1) * self.pad, (y2 - y1) * self.pad
+                x1, y1 = int(max(0, x1 - px)), int(max(0, y1 - py))
+                x2, y2 = int(min(w, x2 + px)), int(min(h, y2 + py))
+                crop = frame[y1:max(y2, y1 + 1), x1:max(x2, x1 + 1)]
+                cv2.resize(crop, (self.imgsz, self.imgsz), dst=self._canvas[i], interpolation=cv2.INTER_LINEAR)
+                cv2.cvtColor(self._canvas[i], cv2.COLOR_BGR2RGB, dst=self._canvas[i])
+            n = len(chunk)
+            with torch.inference_mode():
+                x = self._input[:n]
+                x.copy_(self._host[:n].permute(0, 3, 1, 2), non_blocking=True)
+                x.mul_(1.0 / 255.0)
+                probs = self.net(x)
+                if isinstance(probs, (list, tuple)):
+                    probs = probs[0]
+                out.append(probs.float().cpu().numpy())
+        return np.concatenate(out) if out else np.zeros((0, self.nc), np.float32)
+
+    def classify(self, frame, boxes, track_ids):
+        """
+        boxes: (n, 4) in `frame` coordinates; track_ids: (n,) from the sighting tracker.
+        Returns (cls (n,), cls_conf (n,)) with each track's accumulated species.
+        """
+        self._frame += 1
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        track_ids = [int(t) for t in track_ids]
+        todo = []
+        for i, tid in enumerate(track_ids):
+            votes = self._tracks.get(tid)
+            if votes is None:
+                votes = self._tracks[tid] = _TrackVotes(self.nc)
+            if self._settled(votes):
+                self.crops_skipped += 1
+            else:
+                todo.append(i)
+
+        if todo:
+            probs = self._classify(frame, boxes[todo])
+            self.crops_classified += len(todo)
+            for i, p in zip(todo, probs):
+                votes = self._tracks[track_ids[i]]
+                votes.prob_sum += p
+                votes.n += 1
+                votes.last_frame = self._frame
+
+        cls = np.zeros(len(track_ids), dtype=np.int64)
+        conf = np.zeros(len(track_ids), dtype=np.float32)
+        for i, tid in enumerate(track_ids):
+            m = self._tracks[tid].mean()
+            cls[i] = int(m.argmax())
+            conf[i] = float(m.max())
+        if self._to_target is not None:
+            cls = self._to_target[cls]
+        return cls, conf
+
+    def retain(self, track_ids):
+        for tid in [t for t in self._tracks if t not in track_ids]:
+            del self._tracks[tid]
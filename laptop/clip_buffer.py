@@ -0,0 +1,192 @@
+import itertools
+import json
+import os
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from delta_compositor import DeltaCompositor, is_delta
+from frame_tags import read_tags
+from video_decoders import H264Decoder, h264_is_keyframe, is_h264
+
+CLIP_DIR = "laptop/clips"
+
+
+class _PendingClip:
+    def __init__(self, clip_id, label, t_trigger, t_end, frames):
+        self.clip_id = clip_id
+        self.label = label
+        self.t_trigger = t_trigger
+        self.t_end = t_end
+        self.frames = frames          # list of (ts, frame bytes as received)
+
+
+def sync_point(data):
+    # A frame a clip can start from: any JPEG (delta keyframes are JPEGs) or an H.264 keyframe
+    if is_delta(data):
+        return False
+    return h264_is_keyframe(data) if is_h264(data) else True
+
+
+def to_jpegs(frames, quality=80):
+    # Clip frames in the stream's own encoding -> [(ts, jpeg)]. JPEG passes through untouched; tile
+    # deltas and H.264 are rebuilt from the clip's own keyframes and re-encoded. Frames before the
+    # first keyframe cannot be shown and are left out
+    if not any(is_delta(d) or is_h264(d) for _, d in frames):
+        return frames
+    compositor, h264, out = DeltaCompositor(), None, []
+    params = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
+    for ts, data in frames:
+        if is_delta(data):
+            full = compositor.apply(data)
+        elif is_h264(data):
+            h264 = h264 or H264Decoder()
+            full = h264.decode(data)
+        else:
+            tags = read_tags(data) or {}
+            if "dseq" in tags:
+                compositor.keyframe(cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR), tags)
+            out.append((ts, data))
+            continue
+        if full is not None:
+            ok, jpeg = cv2.imencode(".jpg", full, params)
+            if ok:
+                out.append((ts, jpeg.tobytes()))
+    return out
+
+
+class ClipBuffer:
+    """
+    Time- and byte-bounded ring of the *encoded* frames exactly as they came
+    off the socket. trigger() snapshots the pre-roll and keeps collecting until the
+    post-roll after the label's last trigger() or extend() has elapsed; the clip
+    is then written as a plain MJPEG stream (concatenated JPEGs, playable with
+    `ffplay -f mjpeg clip.mjpeg`) plus a JSON sidecar with per-frame timestamps.
+    JPEG frames are never decoded or re-encoded; delta and H.264 frames are
+    converted by the writer thread, and only for clips that actually get written.
+    """
+
+    def __init__(self, seconds=10.0, max_bytes=64 * 1024 * 1024, clip_dir=CLIP_DIR, pre_roll=5.0, post_roll=5.0):
+        self.seconds = float(seconds)
+        self.max_bytes = int(max_bytes)
+        self.clip_dir = clip_dir
+        self.pre_roll = min(float(pre_roll), self.seconds)
+        self.post_roll = float(post_roll)
+
+        self._frames = deque()        # (ts, frame bytes), oldest first
+        self._bytes = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._write_q = queue.Queue(maxsize=8)
+        self._ids = itertools.count(1)
+        self.clips_written = 0
+        threading.Thread(target=self._write_loop, daemon=True).start()
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def push(self, ts, jpeg):
+        # Called from the receive thread for every frame; bytes objects are immutable, so no copy
+        done = []
+        with self._lock:
+            self._frames.append((ts, jpeg))
+            self._bytes += len(jpeg)
+            while self._frames and (ts - self._frames[0][0] > self.seconds or self._bytes > self.max_bytes):
+                _, old = self._frames.popleft()
+                self._bytes -= len(old)
+
+            if self._pending:
+                still = []
+                for clip in self._pending:
+                    if ts <= clip.t_end:
+                        clip.frames.append((ts, jpeg))
+                        still.append(clip)
+                    else:
+                        done.append(clip)
+                self._pending = still
+
+        for clip in done:
+            self._submit(clip)
+
+    def trigger(self, label, ts, pre_roll=None, post_roll=None):
+        pre = self.pre_roll if pre_roll is None else min(float(pre_roll), self.seconds)
+        post = self.post_roll if post_roll is None else float(post_roll)
+        with self._lock:
+            # Same animal while a clip is still recording: just extend its post-roll
+            clip = self._extend(label, ts + post)
+            if clip is not None:
+                return clip
+            frames = list(self._frames)
+            i = next((k for k, f in enumerate(frames) if f[0] >= ts - pre), len(frames))
+            # Delta / H.264: reach back to the keyframe the pre-roll depends on
+            while 0 < i < len(frames) and not sync_point(frames[i][1]):
+                i -= 1
+            frames = frames[i:]
+            clip = _PendingClip(next(self._ids), label, ts, ts + post, frames)
+            self._pending.append(clip)
+            return clip
+
+    def extend(self, label, ts, post_roll=None):
+        # The animal was seen again at `ts`: its recording clip runs until `post_roll` after that.
+        # Never starts a clip. -> the extended clip, or None if none is recording
+        post = self.post_roll if post_roll is None else float(post_roll)
+        with self._lock:
+            return self._extend(label, ts + post)
+
+    def _extend(self, label, t_end):
+        # caller holds _lock
+        for clip in self._pending:
+            if clip.label == label:
+                clip.t_end = max(clip.t_end, t_end)
+                return clip
+        return None
+
+    def flush(self):
+        # Write out whatever is still recording (e.g. on shutdown)
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for clip in pending:
+            self._submit(clip)
+
+    def _submit(self, clip):
+        try:
+            self._write_q.put_nowait(clip)
+        except queue.Full:
+            print(f"[CLIP] write queue full, dropped clip for {clip.label}")
+
+    def _write_loop(self):
+        while True:
+            clip = self._write_q.get()
+            try:
+                clip.frames = to_jpegs(clip.frames)
+            except Exception as e:
+                print(f"[CLIP] could not convert clip for {clip.label}: {e}")
+                continue
+            if not clip.frames:
+                continue
+            # No ":" (not allowed in Windows file names); the clip id keeps two clips of the
+            # same animal in the same second apart
+            stamp = datetime.fromtimestamp(clip.t_trigger).strftime("%Y%m%d_%H%M%S")
+            base = os.path.join(self.clip_dir, f"{clip.label}_{stamp}_clip{clip.clip_id}")
+            try:
+                os.makedirs(self.clip_dir, exist_ok=True)
+                with open(base + ".mjpeg", "wb") as f:
+                    for _, jpeg in clip.frames:
+                        f.write(jpeg)
+                with open(base + ".json", "w") as f:
+                    json.dump({
+                        "label": clip.label,
+                        "trigger": clip.t_trigger,
+                        "timestamps": [round(t, 4) for t, _ in clip.frames],
+                        "sizes": [len(j) for _, j in clip.frames],
+                    }, f)
+                self.clips_written += 1
+                dur = clip.frames[-1][0] - clip.frames[0][0]
+                print(f"[CLIP] wrote {base}.mjpeg ({len(clip.frames)} frames, {dur:.1f}s)")
+            except OSError as e:
+                print(f"[CLIP] write error: {e}")
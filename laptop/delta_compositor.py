@@ -0,0 +1,56 @@
+import json
+import struct
+
+import cv2
+import numpy as np
+
+# Must match pi/delta_codec.py
+DELTA_MAGIC = b"WDLT"
+DELTA_HDR = struct.Struct(">IIHHHHH")     # seq, prev seq, width, height, tile, n_runs, tags length
+RUN_HDR = struct.Struct(">HHHI")          # tile row, first tile col, n tiles, JPEG length
+
+
+def is_delta(data):
+    return data[:4] == DELTA_MAGIC
+
+
+class DeltaCompositor:
+    """
+    Client side of the Pi's delta mode: keeps the last full frame and pastes
+    changed tile strips into it. Keyframes (JPEGs tagged "dseq") reset it; a
+    delta that does not follow the last applied frame (a drop somewhere) is
+    ignored until the next keyframe rather than painting onto a stale canvas.
+    """
+
+    def __init__(self):
+        self.canvas = None
+        self.seq = None
+        self.tags = {}
+        self.skipped = 0
+
+    def keyframe(self, frame, tags):
+        self.canvas = frame.copy()
+        self.seq = tags.get("dseq")
+
+    def apply(self, data):
+        # -> composited full frame (a copy the caller may draw on), or None if out of sync
+        off = len(DELTA_MAGIC)
+        seq, prev, w, h, tile, n_runs, n_tags = DELTA_HDR.unpack_from(data, off)
+        off += DELTA_HDR.size
+        self.tags = json.loads(data[off:off + n_tags]) if n_tags else {}
+        off += n_tags
+        if self.canvas is None or prev != self.seq or self.canvas.shape[:2] != (h, w):
+            self.skipped += 1
+            return None
+        for _ in range(n_runs):
+            r, c0, n, size = RUN_HDR.unpack_from(data, off)
+            off += RUN_HDR.size
+            strip = cv2.imdecode(np.frombuffer(data, np.uint8, size, off), cv2.IMREAD_COLOR)
+            off += size
+            if strip is None:
+                self.seq = None         # corrupt: wait for a keyframe
+                return None
+            y, x = r * tile, c0 * tile
+            self.canvas[y:y + strip.shape[0], x:x + strip.shape[1]] = strip
+        self.seq = seq
+        return self.canvas.copy()
@@ -0,0 +1,121 @@
+import numpy as np
+
+DETECTION_DTYPE = np.dtype([
+    ("ts", "<f8"),          # unix time (seconds)
+    ("cls", "<i2"),         # class id
+    ("score", "<f4"),       # confidence
+    ("bbox", "<f4", (4,)),  # x1, y1, x2, y2 in full-frame pixels
+    ("seq", "<u4"),         # frame sequence number
+])
+
+
+class DetectionRing:
+    """
+    Fixed-size structured-array ring of detections.
+
+    Single writer, any number of readers, no lock (a seqlock on two counters):
+    the writer first advances `reserved` to claim the slots it is about to fill,
+    writes them, and only then advances `count`. Readers take at most the
+    records up to `count` that no claimed write can reach, copy them, and
+    re-check `reserved` afterwards, retrying if the writer got to any of them.
+    latest(k) and since(t) touch only the records they return.
+    """
+
+    def __init__(self, capacity=4096, buf=None, counter=None, reserved=None):
+        # buf/counter/reserved let the ring live in externally owned memory (e.g. shared memory):
+        # buf is a DETECTION_DTYPE array of `capacity` records, counter and reserved
+        # 1-element uint64 arrays.
+        self.capacity = int(capacity)
+        self.buf = np.zeros(self.capacity, dtype=DETECTION_DTYPE) if buf is None else buf
+        self._counter = np.zeros(1, dtype=np.uint64) if counter is None else counter
+        self._reserved = np.zeros(1, dtype=np.uint64) if reserved is None else reserved
+
+    @property
+    def count(self):
+        # total records ever appended
+        return int(self._counter[0])
+
+    @count.setter
+    def count(self, value):
+        self._counter[0] = value
+
+    @property
+    def reserved(self):
+        # count plus the records of an append in progress
+        return int(self._reserved[0])
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    # ----- writer -----
+    def append(self, ts, cls, scores, bboxes, seq):
+        # cls/scores/bboxes are arrays for one frame's detections (n may be 0)
+        cls = np.asarray(cls).reshape(-1)
+        n = len(cls)
+        if n == 0:
+            return
+        if n > self.capacity:
+            cls, scores, bboxes = cls[-self.capacity:], scores[-self.capacity:], bboxes[-self.capacity:]
+            n = self.capacity
+        end = self.count + n
+        self._reserved[0] = end     # claim the slots before touching them
+        start = self.count % self.capacity
+        idx = (start + np.arange(n)) % self.capacity
+        rec = self.buf
+        rec["ts"][idx] = ts
+        rec["cls"][idx] = cls
+        rec["score"][idx] = np.asarray(scores).reshape(-1)[:n]
+        rec["bbox"][idx] = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)[:n]
+        rec["seq"][idx] = seq
+        self.count = end            # publish only after the data is in place
+
+    # ----- readers -----
+    def _copy_range(self, first, last):
+        # Copy logical records [first, last) out of the ring (oldest first)
+        cap = self.capacity
+        a, b = first % cap, last % cap
+        if last - first <= 0:
+            return self.buf[:0].copy()
+        if a < b:
+            return self.buf[a:b].copy()
+        return np.concatenate((self.buf[a:], self.buf[:b]))
+
+    def _window(self):
+        # (first, end): the published records no in-flight append can overwrite.
+        # `reserved` is read first: an append claims at most `capacity` slots, so first <= end.
+        first = max(0, self.reserved - self.capacity)
+        return first, self.count
+
+    def _intact(self, first):
+        # True if no append has claimed the slot of record `first` since the window was taken
+        return self.reserved - first <= self.capacity
+
+    def latest(self, k):
+        for _ in range(8):
+            first, end = self._window()
+            first = max(first, end - int(k))
+            out = self._copy_range(first, end)
+            if self._intact(first):
+                return out
+        # The writer kept lapping the copy; never hand out a torn record
+        return self.buf[:0].copy()
+
+    def since(self, t):
+        # All records with ts >= t; binary search over the (time-ordered) ring
+        for _ in range(8):
+            first, end = self._window()
+            n = end - first
+            if n == 0:
+                return self.buf[:0].copy()
+            cap = self.capacity
+            a = first % cap
+            # Logical order is buf[a:] then buf[:a] when wrapped
+            head = self.buf["ts"][a:a + n] if a + n <= cap else self.buf["ts"][a:]
+            pos = int(np.searchsorted(head, t, side="left"))
+            if pos == len(head) and len(head) < n:
+                tail = self.buf["ts"][:n - len(head)]
+                pos = len(head) + int(np.searchsorted(tail, t, side="left"))
+            out = self._copy_range(first + pos, end)
+            if self._intact(first + pos):
+                return out
+        return self.buf[:0].copy()
@@ -0,0 +1,273 @@
+import csv
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+DB_PATH = "laptop/detections.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    id         INTEGER PRIMARY KEY,
+    ts         REAL    NOT NULL,   -- unix time (seconds)
+    animal     TEXT    NOT NULL,
+    confidence REAL    NOT NULL,
+    x1         INTEGER,
+    y1         INTEGER,
+    x2         INTEGER,
+    y2         INTEGER,
+    robot_id   TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_detections_ts ON detections (ts);
+CREATE INDEX IF NOT EXISTS idx_detections_animal_ts ON detections (animal, ts);
+
+CREATE TABLE IF NOT EXISTS sightings (
+    id         INTEGER PRIMARY KEY,
+    start_ts   REAL    NOT NULL,
+    end_ts     REAL    NOT NULL,
+    animal     TEXT    NOT NULL,
+    frames     INTEGER NOT NULL,
+    peak_conf  REAL    NOT NULL,
+    mean_conf  REAL    NOT NULL,
+    x1         INTEGER,
+    y1         INTEGER,
+    x2         INTEGER,
+    y2         INTEGER,
+    robot_id   TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sightings_start ON sightings (start_ts);
+CREATE INDEX IF NOT EXISTS idx_sightings_animal_start ON sightings (animal, start_ts);
+
+CREATE TABLE IF NOT EXISTS stills (
+    id         INTEGER PRIMARY KEY,
+    ts         REAL    NOT NULL,   -- capture time on the Pi
+    animal     TEXT    NOT NULL,
+    confidence REAL,
+    x1         INTEGER,            -- bbox in stream coordinates at request time
+    y1         INTEGER,
+    x2         INTEGER,
+    y2         INTEGER,
+    reason     TEXT,               -- "sighting" / "operator"
+    path       TEXT    NOT NULL,
+    width      INTEGER,
+    height     INTEGER,
+    robot_id   TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_stills_ts ON stills (ts);
+"""
+
+INSERT_SQL = {
+    "detections": "INSERT INTO detections (ts, animal, confidence, x1, y1, x2, y2, robot_id) "
+                  "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+    "sightings": "INSERT INTO sightings (start_ts, end_ts, animal, frames, peak_conf, mean_conf, "
+                 "x1, y1, x2, y2, robot_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "stills": "INSERT INTO stills (ts, animal, confidence, x1, y1, x2, y2, reason, path, width, height, robot_id) "
+              "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+}
+
+CSV_HEADER = ["timestamp", "animal", "confidence", "x1", "y1", "x2", "y2", "robot_id"]
+
+
+class DetectionStore:
+    """
+    Persistent detection/sighting log backed by SQLite (WAL mode).
+
+    The inference thread only ever calls add()/add_many()/add_sighting()/add_still(), which drop rows into
+    an in-memory queue. A background thread drains the queue and commits rows in
+    batches, so disk I/O never happens on the caller's thread.
+    """
+
+    def __init__(self, path=DB_PATH, batch_size=256, flush_interval=1.0, max_pending=20000):
+        self.path = path
+        self.batch_size = int(batch_size)
+        self.flush_interval = float(flush_interval)
+        self.dropped = 0                         # rows lost because the queue was full
+        self._q = queue.Queue(maxsize=max_pending)
+        self._running = True
+
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        conn = self._open()
+        conn.executescript(SCHEMA)
+        conn.commit()
+        conn.close()
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ----- producer side (never blocks) -----
+    def add(self, ts, animal, confidence, bbox=None, robot_id=None):
+        x1, y1, x2, y2 = bbox if bbox is not None else (None, None, None, None)
+        self._put("detections", (float(ts), str(animal), float(confidence), x1, y1, x2, y2, robot_id))
+
+    def add_many(self, ts, dets, robot_id=None):
+        # dets: iterable of (animal, confidence, (x1, y1, x2, y2))
+        for animal, conf, bbox in dets:
+            self.add(ts, animal, conf, bbox, robot_id)
+
+    def add_sighting(self, sighting, robot_id=None):
+        x1, y1, x2, y2 = (int(v) for v in sighting.best_bbox)
+        self._put("sightings", (float(sighting.start), float(sighting.end), sighting.animal,
+                                int(sighting.frames), float(sighting.peak_conf), float(sighting.mean_conf),
+                                x1, y1, x2, y2, robot_id))
+
+    def add_still(self, ts, animal, path, width, height, confidence=None, bbox=None, reason=None, robot_id=None):
+        x1, y1, x2, y2 = (int(v) for v in bbox) if bbox is not None else (None, None, None, None)
+        self._put("stills", (float(ts), str(animal), confidence, x1, y1, x2, y2, reason, path,
+                             int(width), int(height), robot_id))
+
+    def _put(self, table, row):
+        try:
+            self._q.put_nowait((table, row))
+        except queue.Full:
+            self.dropped += 1
+
+    # ----- background writer -----
+    def _write_loop(self):
+        conn = self._open()
+        try:
+            while self._running or not self._q.empty():
+                try:
+                    first = self._q.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+                batch = [first]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._q.get_nowait())
+                    except queue.Empty:
+                        break
+                by_table = {}
+                for table, row in batch:
+                    by_table.setdefault(table, []).append(row)
+                try:
+                    with conn:
+                        for table, rows in by_table.items():
+                            conn.executemany(INSERT_SQL[table], rows)
+                except sqlite3.Error as e:
+                    print(f"[STORE] Write error: {e}")
+        finally:
+            conn.close()
+
+    # ----- queries (run on the caller's thread, own connection) -----
+    def query(self, start=None, end=None, animal=None, robot_id=None, limit=None):
+        sql = "SELECT ts, animal, confidence, x1, y1, x2, y2, robot_id FROM detections WHERE 1=1"
+        args = []
+        if start is not None:
+            sql += " AND ts >= ?"
+            args.append(_to_ts(start))
+        if end is not None:
+            sql += " AND ts < ?"
+            args.append(_to_ts(end))
+        if animal is not None:
+            sql += " AND animal = ?"
+            args.append(animal)
+        if robot_id is not None:
+            sql += " AND robot_id = ?"
+            args.append(robot_id)
+        sql += " ORDER BY ts"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+        conn = self._open()
+        try:
+            return conn.execute(sql, args).fetchall()
+        finally:
+            conn.close()
+
+    def query_sightings(self, start=None, end=None, animal=None, limit=None):
+        sql = ("SELECT start_ts, end_ts, animal, frames, peak_conf, mean_conf, x1, y1, x2, y2, robot_id "
+               "FROM sightings WHERE 1=1")
+        args = []
+        if start is not None:
+            sql += " AND start_ts >= ?"
+            args.append(_to_ts(start))
+        if end is not None:
+            sql += " AND start_ts < ?"
+            args.append(_to_ts(end))
+        if animal is not None:
+            sql += " AND animal = ?"
+            args.append(animal)
+        sql += " ORDER BY start_ts"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+        conn = self._open()
+        try:
+            return conn.execute(sql, args).fetchall()
+        finally:
+            conn.close()
+
+    def counts_by_animal(self, start=None, end=None):
+        sql = "SELECT animal, COUNT(*) FROM detections WHERE 1=1"
+        args = []
+        if start is not None:
+            sql += " AND ts >= ?"
+            args.append(_to_ts(start))
+        if end is not None:
+            sql += " AND ts < ?"
+            args.append(_to_ts(end))
+        sql += " GROUP BY animal ORDER BY COUNT(*) DESC"
+        conn = self._open()
+        try:
+            return dict(conn.execute(sql, args).fetchall())
+        finally:
+            conn.close()
+
+    def export_csv(self, csv_path, **filters):
+        rows = self.query(**filters)
+        with open(csv_path, "w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(CSV_HEADER)
+            for ts, animal, conf, x1, y1, x2, y2, robot_id in rows:
+                stamp = datetime.fromtimestamp(ts).isoformat(timespec="milliseconds")
+                w.writerow([stamp, animal, f"{conf:.3f}", x1, y1, x2, y2, robot_id])
+        return len(rows)
+
+    def close(self, timeout=5.0):
+        self._running = False
+        self._writer.join(timeout=timeout)
+
+
+def _to_ts(t):
+    # Accept unix seconds, datetime or ISO string
+    if isinstance(t, datetime):
+        return t.timestamp()
+    if isinstance(t, str):
+        try:
+            return float(t)
+        except ValueError:
+            return datetime.fromisoformat(t).timestamp()
+    return float(t)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Query / export the detection store")
+    ap.add_argument("--db", default=DB_PATH)
+    ap.add_argument("--start", help="ISO time or unix seconds")
+    ap.add_argument("--end", help="ISO time or unix seconds")
+    ap.add_argument("--animal")
+    ap.add_argument("--csv", metavar="path", help="Export matching rows to CSV")
+    args = ap.parse_args()
+
+    store = DetectionStore(args.db)
+    filters = {"start": args.start, "end": args.end, "animal": args.animal}
+    if args.csv:
+        t0 = time.perf_counter()
+        n = store.export_csv(args.csv, **filters)
+        print(f"Exported {n} rows to {args.csv} in {(time.perf_counter() - t0) * 1000:.1f} ms")
+    else:
+        for animal, n in store.counts_by_animal(args.start, args.end).items():
+            print(f"{animal:20s} {n}")
+    store.close()
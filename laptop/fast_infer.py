@@ -0,0 +1,149 @@
+import cv2
+import numpy as np
+import torch
+
+try:
+    from torchvision.ops import batched_nms as _tv_batched_nms
+except Exception:           # torchvision missing or built without ops
+    _tv_batched_nms = None
+
+
+def nms(boxes, scores, iou_threshold):
+    # Plain NumPy greedy NMS; each step is one vectorized IoU against all remaining boxes
+    boxes = np.asarray(boxes, dtype=np.float32)
+    order = np.argsort(-np.asarray(scores))
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        xx1 = np.maximum(boxes[i, 0], boxes[rest, 0])
+        yy1 = np.maximum(boxes[i, 1], boxes[rest, 1])
+        xx2 = np.minimum(boxes[i, 2], boxes[rest, 2])
+        yy2 = np.minimum(boxes[i, 3], boxes[rest, 3])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-6)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def batched_nms(boxes, scores, classes, iou_threshold):
+    # Class-aware NMS: offset boxes per class so different classes never overlap
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.int64)
+    boxes = np.asarray(boxes, dtype=np.float32)
+    offset = (np.asarray(classes, dtype=np.float32) * (boxes.max() + 1.0))[:, None]
+    return nms(boxes + offset, scores, iou_threshold)
+
+
+class FastDetector:
+    """
+    Lean YOLO (v8-style head) inference that skips ultralytics' predict() pipeline.
+
+    Frames are letterboxed in place into a preallocated (pinned on CUDA) uint8
+    staging buffer, copied once into a preallocated input tensor and run under
+    torch.inference_mode(). Decoding + NMS are vectorized and the results come
+    back as plain NumPy arrays in original-frame coordinates.
+    """
+
+    def __init__(self, yolo, imgsz=416, device="cpu", conf=0.25, iou=0.45, half=False,
+                 threads=None, max_batch=1, max_det=100):
+        self.imgsz = int(imgsz)
+        self.device = torch.device(device)
+        self.conf = float(conf)
+        self.iou = float(iou)
+        self.max_det = int(max_det)
+        self.max_batch = int(max_batch)
+        self.half = bool(half) and self.device.type in ("cuda", "mps")
+        if threads:
+            torch.set_num_threads(int(threads))
+
+        # Accept an ultralytics YOLO wrapper or the bare nn.Module
+        net = getattr(yolo, "model", yolo)
+        net = net.to(self.device).eval()
+        self.net = net.half() if self.half else net.float()
+        self.stride = int(max(getattr(net, "stride", torch.tensor([32])).tolist()))
+        if self.imgsz % self.stride:
+            self.imgsz = (self.imgsz // self.stride + 1) * self.stride
+
+        dtype = torch.float16 if self.half else torch.float32
+        pin = self.device.type == "cuda"
+        shape = (self.max_batch, self.imgsz, self.imgsz, 3)
+        self._host = torch.full(shape, 114, dtype=torch.uint8, pin_memory=pin)
+        self._canvas = self._host.numpy()       # letterbox writes straight into the staging buffer
+        self._input = torch.empty((self.max_batch, 3, self.imgsz, self.imgsz), dtype=dtype, device=self.device)
+        self._geom = [None] * self.max_batch    # (h, w) the border of each canvas was last filled for
+
+        self(np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8))   # warm-up / allocator priming
+
+    # ----- preprocess -----
+    def _letterbox_into(self, i, frame):
+        h, w = frame.shape[:2]
+        r = min(self.imgsz / h, self.imgsz / w)
+        nw, nh = int(round(w * r)), int(round(h * r))
+        top, left = (self.imgsz - nh) // 2, (self.imgsz - nw) // 2
+        canvas = self._canvas[i]
+        if self._geom[i] != (h, w):
+            canvas[:] = 114
+            self._geom[i] = (h, w)
+        roi = canvas[top:top + nh, left:left + nw]
+        if (nw, nh) == (w, h):
+            roi[:] = frame
+        else:
+            cv2.resize(frame, (nw, nh), dst=roi, interpolation=cv2.INTER_LINEAR)
+        cv2.cvtColor(roi, cv2.COLOR_BGR2RGB, dst=roi)
+        return r, left, top
+
+    # ----- inference -----
+    def __call__(self, frame):
+        return self.infer_batch([frame])[0]
+
+    def infer_batch(self, frames):
+        out = []
+        for start in range(0, len(frames), self.max_batch):
+            out.extend(self._run(frames[start:start + self.max_batch]))
+        return out
+
+    def _run(self, frames):
+        n = len(frames)
+        geoms = [self._letterbox_into(i, f) for i, f in enumerate(frames)]
+        with torch.inference_mode():
+            x = self._input[:n]
+            x.copy_(self._host[:n].permute(0, 3, 1, 2), non_blocking=True)
+            x.mul_(1.0 / 255.0)
+            preds = self.net(x)
+            if isinstance(preds, (list, tuple)):
+                preds = preds[0]
+            preds = preds.float()                           # (n, 4 + nc, anchors)
+            results = []
+            for i in range(n):
+                results.append(self._postprocess(preds[i], frames[i].shape[:2], *geoms[i]))
+        return results
+
+    def _postprocess(self, p, shape, r, left, top):
+        p = p.transpose(0, 1)                               # (anchors, 4 + nc)
+        scores, cls = p[:, 4:].max(dim=1)
+        mask = scores > self.conf
+        p, scores, cls = p[mask], scores[mask], cls[mask]
+        if p.shape[0] == 0:
+            return np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64)
+
+        cx, cy, w, h = p[:, 0], p[:, 1], p[:, 2], p[:, 3]
+        boxes = torch.stack((cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2), dim=1)
+        if _tv_batched_nms is not None:
+            keep = _tv_batched_nms(boxes, scores, cls, self.iou)[:self.max_det]
+            boxes, scores, cls = boxes[keep], scores[keep], cls[keep]
+            boxes, scores, cls = boxes.cpu().numpy(), scores.cpu().numpy(), cls.cpu().numpy()
+        else:
+            boxes, scores, cls = boxes.cpu().numpy(), scores.cpu().numpy(), cls.cpu().numpy()
+            keep = batched_nms(boxes, scores, cls, self.iou)[:self.max_det]
+            boxes, scores, cls = boxes[keep], scores[keep], cls[keep]
+
+        # Undo letterbox: back to original-frame pixels
+        boxes -= np.array([left, top, left, top], dtype=np.float32)
+        boxes /= r
+        fh, fw = shape
+        np.clip(boxes[:, 0::2], 0, fw, out=boxes[:, 0::2])
+        np.clip(boxes[:, 1::2], 0, fh, out=boxes[:, 1::2])
+        return boxes, scores.astype(np.float32), cls.astype(np.int64)
@@ -0,0 +1,22 @@
+import json
+
+# Per-frame metadata rides inside the JPEG as a COM (0xFFFE) segment right after
+# SOI. Decoders skip COM segments, so old clients keep working unchanged.
+TAG_MAGIC = b"WLR1"
+
+
+def tag_jpeg(jpeg, tags):
+    body = TAG_MAGIC + json.dumps(tags, separators=(",", ":")).encode("utf-8")
+    seg = b"\xff\xfe" + (len(body) + 2).to_bytes(2, "big") + body
+    return jpeg[:2] + seg + jpeg[2:]
+
+
+def read_tags(data):
+    # Returns the tag dict, or None for untagged frames
+    if len(data) < 8 or data[2:4] != b"\xff\xfe" or data[6:10] != TAG_MAGIC:
+        return None
+    n = int.from_bytes(data[4:6], "big")
+    try:
+        return json.loads(data[10:4 + n])
+    except ValueError:
+        return None
@@ -0,0 +1,252 @@
+import multiprocessing as mp
+import time
+from datetime import datetime
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from detection_ring import DETECTION_DTYPE, DetectionRing
+
+HEADER_DTYPE = np.dtype([
+    ("latest_seq", "<u8"),    # seq of the newest complete frame slot
+    ("fps", "<f4"),
+    ("shots", "<u4"),         # best shots saved by the worker
+    ("sight_cls", "<i4"),     # class of the current sighting, -1 if none
+    ("sight_start", "<f8"),
+    ("det_count", "<u8"),     # DetectionRing counter
+    ("det_reserved", "<u8"),  # DetectionRing reserved counter (seqlock)
+    ("reload_req", "<u4"),    # bumped by the GUI to ask the worker for a model reload
+    ("link_state", "<u1"),    # index into LINK_STATES
+    ("recovery_ms", "<f4"),   # last reconnect -> first frame, 0 before the first reconnect
+])
+
+LINK_STATES = ("disconnected", "connected", "reconnecting", "stopped")
+
+SLOT_DTYPE = np.dtype([
+    ("seq", "<u8"),           # 0 while the slot is being written
+    ("h", "<u4"),
+    ("w", "<u4"),
+    ("ts", "<f8"),
+])
+
+
+def _align(n, a=64):
+    return (n + a - 1) // a * a
+
+
+class SharedFrameRing:
+    """
+    Preallocated frame slots + detection ring in one shared-memory block.
+
+    Single writer (the worker). A slot's seq is zeroed before its pixels are
+    overwritten and set to the new seq afterwards, so a reader that sees the same
+    non-zero seq before and after copying has a consistent frame.
+    """
+
+    def __init__(self, n_slots=3, max_h=1080, max_w=1920, det_capacity=4096, name=None, create=True):
+        self.n_slots, self.max_h, self.max_w, self.det_capacity = n_slots, max_h, max_w, det_capacity
+        off_header = 0
+        off_slots = _align(off_header + HEADER_DTYPE.itemsize)
+        off_dets = _align(off_slots + SLOT_DTYPE.itemsize * n_slots)
+        off_frames = _align(off_dets + DETECTION_DTYPE.itemsize * det_capacity)
+        size = off_frames + n_slots * max_h * max_w * 3
+
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        self.name = self.shm.name
+        buf = self.shm.buf
+        self.header = np.ndarray((1,), HEADER_DTYPE, buffer=buf, offset=off_header)
+        self.slots = np.ndarray((n_slots,), SLOT_DTYPE, buffer=buf, offset=off_slots)
+        self.frames = np.ndarray((n_slots, max_h, max_w, 3), np.uint8, buffer=buf, offset=off_frames)
+        det_buf = np.ndarray((det_capacity,), DETECTION_DTYPE, buffer=buf, offset=off_dets)
+        self.detections = DetectionRing(det_capacity, buf=det_buf, counter=self.header["det_count"],
+                                        reserved=self.header["det_reserved"])
+        if create:
+            self.header[0] = 0
+            self.header["sight_cls"] = -1
+            self.slots[:] = 0
+
+    def layout(self):
+        return {"n_slots": self.n_slots, "max_h": self.max_h, "max_w": self.max_w, "det_capacity": self.det_capacity}
+
+    # ----- writer -----
+    def write_frame(self, frame, ts):
+        h, w = frame.shape[:2]
+        if h > self.max_h or w > self.max_w:
+            raise ValueError(f"frame {w}x{h} exceeds slot size {self.max_w}x{self.max_h}")
+        seq = int(self.header["latest_seq"][0]) + 1
+        slot = self.slots[seq % self.n_slots]
+        slot["seq"] = 0
+        self.frames[seq % self.n_slots, :h, :w] = frame
+        slot["h"], slot["w"], slot["ts"] = h, w, ts
+        slot["seq"] = seq
+        self.header["latest_seq"] = seq
+        return seq
+
+    # ----- reader -----
+    def read_latest(self, after_seq=0):
+        # Copy of the newest frame if it is newer than after_seq, else (after_seq, None)
+        seq = int(self.header["latest_seq"][0])
+        if seq <= after_seq:
+            return after_seq, None
+        i = seq % self.n_slots
+        slot = self.slots[i]
+        h, w = int(slot["h"]), int(slot["w"])
+        frame = self.frames[i, :h, :w].copy()
+        if int(slot["seq"]) != seq:
+            return after_seq, None      # overwritten while copying; next poll gets a newer one
+        return seq, frame
+
+    def close(self, unlink=False):
+        self.header = self.slots = self.frames = self.detections = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass        # views still held elsewhere (e.g. a VideoClient's ring); freed at exit
+        if unlink:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _worker_main(shm_name, layout, client_kwargs, use_store, use_clips, stop_evt):
+    # Runs in the child process: owns the socket, decode, model and all per-frame state
+    from video_client import VideoClient
+    from detection_store import DetectionStore
+    from clip_buffer import ClipBuffer
+
+    ring = SharedFrameRing(name=shm_name, create=False, **layout)
+    store = DetectionStore() if use_store else None
+    client = VideoClient(store=store, clip_buffer=ClipBuffer() if use_clips else None,
+                         detection_ring=ring.detections, **client_kwargs)
+    client.connect()
+    client.start()
+    reload_seen = 0
+    try:
+        while not stop_evt.is_set() and client.is_alive():
+            req = int(ring.header["reload_req"][0])
+            if req != reload_seen:
+                reload_seen = req
+                client.request_model_reload()
+            frame = client.get_frame(timeout=0.2)
+            hdr = ring.header
+            hdr["link_state"] = LINK_STATES.index(client.link_state)
+            if client.recovery_ms:
+                hdr["recovery_ms"] = client.recovery_ms[-1]
+            if frame is None:
+                continue
+            ring.write_frame(frame, time.time())
+            hdr["fps"] = client._fps
+            hdr["shots"] = client.shots_saved()
+            s = client.current_sighting()
+            hdr["sight_cls"] = s.cls_id if s is not None else -1
+            hdr["sight_start"] = s.start if s is not None else 0.0
+    finally:
+        client.stop()
+        if store is not None:
+            store.close()
+        ring.close()
+
+
+class _SightingInfo:
+    __slots__ = ("cls_id", "animal", "start")
+
+    def __init__(self, cls_id, animal, start):
+        self.cls_id, self.animal, self.start = cls_id, animal, start
+
+
+class InferenceProcess:
+    """
+    GUI-side stand-in for VideoClient that runs the whole receive/decode/inference
+    pipeline in a separate process. Frames and detections come back through a
+    SharedFrameRing, so nothing is pickled per frame and the Tk process only copies
+    the newest slot it is about to display.
+    """
+
+    def __init__(self, server_ip, server_port, animal_names, store=True, clips=True,
+                 n_slots=3, max_size=(1080, 1920), **client_kwargs):
+        self.animal_names = animal_names
+        self.client_kwargs = dict(server_ip=server_ip, server_port=server_port,
+                                  animal_names=animal_names, **client_kwargs)
+        self.use_store, self.use_clips = bool(store), bool(clips)
+        self.ring = SharedFrameRing(n_slots=n_slots, max_h=max_size[0], max_w=max_size[1])
+        self._ctx = mp.get_context("spawn")   # never fork a process that holds torch/Tk state
+        self._stop = self._ctx.Event()
+        self._proc = None
+        self._seen = 0
+
+    # ----- VideoClient surface used by the GUI -----
+    def connect(self):
+        # The worker opens the socket itself once started
+        pass
+
+    def start(self):
+        if self._proc is not None:
+            return
+        self._proc = self._ctx.Process(
+            target=_worker_main,
+            args=(self.ring.name, self.ring.layout(), self.client_kwargs, self.use_store, self.use_clips, self._stop),
+            daemon=True,
+        )
+        self._proc.start()
+        print(f"[WORKER] inference process started (pid {self._proc.pid})")
+
+    def is_alive(self):
+        return self._proc is not None and self._proc.is_alive()
+
+    def get_frame(self):
+        self._seen, frame = self.ring.read_latest(self._seen)
+        return frame
+
+    @property
+    def link_state(self):
+        if not self.is_alive():
+            return "disconnected" if self._proc is None else "stopped"
+        return LINK_STATES[int(self.ring.header["link_state"][0])]
+
+    @property
+    def recovery_ms(self):
+        ms = float(self.ring.header["recovery_ms"][0])
+        return [ms] if ms else []
+
+    @property
+    def _fps(self):
+        return float(self.ring.header["fps"][0])
+
+    def shots_saved(self):
+        return int(self.ring.header["shots"][0])
+
+    def _class_name(self, cls_id):
+        if 0 <= cls_id < len(self.animal_names):
+            return self.animal_names[cls_id]
+        return str(cls_id)
+
+    def current_sighting(self):
+        cls_id = int(self.ring.header["sight_cls"][0])
+        if cls_id < 0:
+            return None
+        return _SightingInfo(cls_id, self._class_name(cls_id), float(self.ring.header["sight_start"][0]))
+
+    def request_model_reload(self, path=None):
+        # Only reloads the configured weights path; the worker owns the registry
+        self.ring.header["reload_req"] += 1
+
+    def get_latest(self, n=10):
+        recs = self.ring.detections.latest(n)
+        return {
+            "times": [datetime.fromtimestamp(t).isoformat(timespec='seconds') for t in recs["ts"].tolist()],
+            "animals": [self._class_name(c) for c in recs["cls"].tolist()],
+            "scores": [round(s, 3) for s in recs["score"].tolist()],
+            "bboxes": recs["bbox"].astype(int).tolist(),
+            "name": self.client_kwargs.get("label_name", "video_stream"),
+        }
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self, timeout=5.0):
+        if self._proc is not None:
+            self._proc.join(timeout)
+            if self._proc.is_alive():
+                self._proc.terminate()
+        self.ring.close(unlink=True)
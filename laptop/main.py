@@ -1,8 +1,28 @@
+import argparse
+
 from GUI import GUI
 from video_client import VideoClient
+from detection_store import DetectionStore
+from clip_buffer import ClipBuffer
+from inference_worker import InferenceProcess
+from still_client import StillClient
+from session_client import SessionClient
 
 if __name__ == "__main__":
-    
+    ap = argparse.ArgumentParser(description="Wildlife Monitoring Robot base station")
+    ap.add_argument("--worker-process", action="store_true",
+                    help="Run video decode + inference in a separate process (shared-memory frame handoff)")
+    ap.add_argument("--autotune", action="store_true",
+                    help="Benchmark inference settings on first run and reuse the cached choice")
+    ap.add_argument("--udp", action="store_true",
+                    help="Receive video over UDP (Pi started with --udp); drops late frames instead of stalling")
+    ap.add_argument("--codec", choices=["mjpeg", "delta", "h264"], default=None,
+                    help="Ask the Pi for this video codec (default: whatever the Pi streams by default)")
+    ap.add_argument("--session", action="store_true",
+                    help="Control and video over one multiplexed connection (Pi session port 5050)")
+    args = ap.parse_args()
+    transport = "udp" if args.udp else "tcp"
+
     animal_names = [
         "Cockatoo", "Crocodile", "Frog", "Kangaroo", "Koala", "Owl", "Penguin",
         "Platypus", "Snake", "Tasmanian Devil", "Wombat"
@@ -12,12 +32,31 @@ if __name__ == "__main__":
     hostIP = "raspberrypi.local"
     robotControlPort = 5000
     videoPort = 8000
+    stillPort = 8002
+    sessionPort = 5050
+    session = SessionClient(hostIP, sessionPort) if args.session else None
 
-    video_client = VideoClient(server_ip=hostIP, server_port=videoPort, animal_names=animal_names)
+    if args.worker_process:
+        if session is not None:
+            # A socket cannot be shared with the worker process: video keeps its own port there
+            print("--session with --worker-process: only control uses the session")
+        # Store and clip buffer live in the worker, next to the pipeline that feeds them
+        store = None
+        video_client = InferenceProcess(server_ip=hostIP, server_port=videoPort, animal_names=animal_names,
+                                        autotune=args.autotune, transport=transport,
+                                        codec=args.codec)
+    else:
+        store = DetectionStore()
+        video_client = VideoClient(server_ip=hostIP, server_port=videoPort, animal_names=animal_names,
+                                   store=store, clip_buffer=ClipBuffer(), autotune=args.autotune, transport=transport,
+                                   codec=args.codec, still_client=StillClient(hostIP, stillPort, store=store),
+                                   session=session)
 
-    app = GUI(host=hostIP, port=robotControlPort, camera=video_client)
+    app = GUI(host=hostIP, port=robotControlPort, camera=video_client, session=session)
     app.mainloop()
 
     video_client.stop()
     video_client.join()
+    if store is not None:
+        store.close()
 
@@ -0,0 +1,143 @@
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class ModelRegistry:
+    """
+    Holds the live inference backend and swaps in new weights without pausing.
+
+    A background thread watches the weights file (or takes request_reload()),
+    loads and warms the new backend off the inference thread, runs it over a few
+    recently seen frames, and only then replaces `current` in one assignment, so
+    the inference loop picks it up on its next frame. A backend that fails the
+    sanity run is discarded; rollback() restores the previous one after a swap.
+    """
+
+    def __init__(self, path, load_fn, infer_fn, initial=None, poll_interval=2.0, watch=True,
+                 n_recent=8, max_class=None, max_slowdown=3.0):
+        self.path = path
+        self.load_fn = load_fn          # path -> backend
+        self.infer_fn = infer_fn        # (backend, frame) -> (xyxy, conf, cls)
+        self.current = initial
+        self.previous = None
+        self.max_class = max_class
+        self.max_slowdown = float(max_slowdown)
+        self.poll_interval = float(poll_interval)
+        self.watch = bool(watch)
+        self.swaps = 0
+        self.status = "ready"
+
+        self._recent = deque(maxlen=n_recent)
+        self._reload_evt = threading.Event()
+        self._reload_path = None
+        self._mtime = self._stat(path)
+        self._cur_ms = None             # per-frame inference time of `current`, measured by the inference thread
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+            return (st.st_mtime, st.st_size)
+        except OSError:
+            return None
+
+    # ----- called from the inference thread -----
+    def remember(self, frame):
+        # Caller passes a private copy; kept for warm-up / sanity runs
+        self._recent.append(frame)
+
+    def record_ms(self, backend, ms):
+        # Live timing of the current backend: the baseline a new model's sanity run is held to.
+        # The registry never runs `current` itself, its buffers belong to the inference thread
+        if backend is self.current:
+            self._cur_ms = ms if self._cur_ms is None else 0.9 * self._cur_ms + 0.1 * ms
+
+    def request_reload(self, path=None):
+        self._reload_path = path
+        self._reload_evt.set()
+
+    def rollback(self):
+        if self.previous is None:
+            return False
+        self.current, self.previous = self.previous, None
+        self._cur_ms = None
+        self.status = "rolled back"
+        print("[MODEL] rolled back to previous model")
+        return True
+
+    # ----- background -----
+    def _loop(self):
+        pending = None
+        while True:
+            requested = self._reload_evt.wait(self.poll_interval)
+            self._reload_evt.clear()
+            if requested:
+                path = self._reload_path or self.path
+                self._reload_path = None
+                self._reload(path)
+                continue
+            if not self.watch:
+                continue
+            st = self._stat(self.path)
+            if st is None or st == self._mtime:
+                pending = None
+                continue
+            # Wait for the file to stop changing so we never load a half-copied checkpoint
+            if st != pending:
+                pending = st
+                continue
+            pending = None
+            self._mtime = st
+            self._reload(self.path)
+
+    def _reload(self, path):
+        self.status = "loading"
+        print(f"[MODEL] loading {path} in background")
+        try:
+            backend = self.load_fn(path)
+        except Exception as e:
+            self.status = "load failed"
+            print(f"[MODEL] load failed, keeping current model: {e}")
+            return
+        ok, why, ms = self._sanity(backend)
+        if not ok:
+            self.status = "rejected"
+            print(f"[MODEL] new model rejected ({why}), keeping current model")
+            return
+        self.previous, self.current = self.current, backend     # atomic swap between frames
+        self._cur_ms = None
+        self.path = path
+        self._mtime = self._stat(path)      # the watcher must not load the file just swapped in again
+        self.swaps += 1
+        self.status = "swapped"
+        print(f"[MODEL] swapped in {path} ({ms:.1f} ms/frame on sanity run)")
+
+    def _time(self, backend, frames):
+        t0 = time.perf_counter()
+        outs = [self.infer_fn(backend, f) for f in frames]
+        return outs, 1000 * (time.perf_counter() - t0) / len(frames)
+
+    def _sanity(self, backend):
+        frames = list(self._recent) or [np.zeros((270, 480, 3), dtype=np.uint8)]
+        try:
+            self.infer_fn(backend, frames[0])           # warm-up
+            outs, ms = self._time(backend, frames)
+        except Exception as e:
+            return False, f"inference error: {e}", None
+        for xyxy, conf, cls in outs:
+            xyxy, conf, cls = np.asarray(xyxy), np.asarray(conf), np.asarray(cls)
+            if xyxy.reshape(-1, 4).shape[0] != conf.shape[0] or conf.shape[0] != cls.shape[0]:
+                return False, "inconsistent output shapes", ms
+            if not np.all(np.isfinite(xyxy)) or not np.all((conf >= 0) & (conf <= 1)):
+                return False, "non-finite boxes or scores out of range", ms
+            if self.max_class is not None and cls.size and int(cls.max()) >= self.max_class:
+                return False, f"class id {int(cls.max())} outside the {self.max_class} known classes", ms
+        if self.current is not None and self.current[0] is not None:
+            if self._cur_ms and ms > self.max_slowdown * self._cur_ms:
+                return False, f"{ms:.1f} ms/frame vs {self._cur_ms:.1f} ms for the current model", ms
+        return True, "ok", ms
@@ -0,0 +1,220 @@
+import collections
+import json
+import socket
+import struct
+import threading
+
+# Session protocol: after one JSON hello line each way, every message is
+# [channel u8][flags u8][len u32] + payload. Each channel is a byte stream
+# carrying exactly what the legacy port carried (control lines, length-
+# prefixed video frames, audio header + PCM, telemetry JSON lines), cut into
+# chunks so a high-priority channel can go between the chunks of a big frame.
+MUX_HDR = struct.Struct(">BBI")
+FLAG_FIN = 0x01                 # sender closed this channel
+
+CHANNELS = {"control": 0, "video": 1, "audio": 2, "telemetry": 3}
+# Lower goes first. Control must never wait behind video.
+PRIORITY = {0: 0, 3: 1, 2: 2, 1: 3}
+# Bytes a channel may have queued before sendall() blocks (backpressure, like SO_SNDBUF)
+QUEUE_BYTES = {0: 1 << 20, 1: 256 * 1024, 2: 64 * 1024, 3: 64 * 1024}
+
+
+def read_json_line(sock, limit=4096):
+    line = b""
+    while not line.endswith(b"\n"):
+        more = sock.recv(1)
+        if not more:
+            raise ConnectionError("session closed during handshake")
+        line += more
+        if len(line) > limit:
+            raise ValueError("session hello too long")
+    return json.loads(line)
+
+
+class ChannelSocket:
+    """
+    One channel of a MuxConnection with the socket calls the existing stream
+    code uses (sendall, recv, settimeout, setsockopt, close), so control,
+    video and audio handlers run on it unchanged.
+    """
+
+    def __init__(self, mux, channel):
+        self.mux = mux
+        self.channel = channel
+        self.timeout = None
+        self._buf = bytearray()
+        self._cond = threading.Condition()
+        self._eof = False
+        self.closed = False
+
+    # ----- socket-like API -----
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def setsockopt(self, *args):
+        pass
+
+    def sendall(self, data):
+        if self.closed:
+            raise OSError("channel closed")
+        self.mux.send(self.channel, data, self.timeout)
+
+    def recv(self, n):
+        with self._cond:
+            if not self._buf and not self._eof:
+                if not self._cond.wait_for(lambda: self._buf or self._eof, self.timeout):
+                    raise socket.timeout("timed out")
+            data = bytes(self._buf[:n])
+            del self._buf[:n]
+            return data
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.mux.send_fin(self.channel)
+
+    # ----- fed by the MuxConnection reader -----
+    def _feed(self, data):
+        with self._cond:
+            self._buf += data
+            self._cond.notify_all()
+
+    def _end(self):
+        with self._cond:
+            self._eof = True
+            self._cond.notify_all()
+
+
+class MuxConnection:
+    """
+    Both ends of the session protocol over one TCP socket.
+
+    A writer thread always sends the next chunk of the highest-priority channel
+    that has data (priorities=False: strict arrival order, for comparison), so
+    a control line waits for at most one in-flight chunk plus what is already in
+    the kernel send buffer, never for the rest of a video frame. A reader
+    thread routes incoming chunks to the ChannelSockets.
+    """
+
+    def __init__(self, sock, chunk=16 * 1024, priorities=True, on_close=None):
+        self.sock = sock
+        self.chunk = int(chunk)
+        self.priorities = bool(priorities)
+        self.on_close = on_close
+        self.channels = {}
+        self.alive = True
+        self.bytes_sent = collections.Counter()
+        self._queues = {ch: collections.deque() for ch in CHANNELS.values()}
+        self._queued = collections.Counter()
+        self._order = collections.deque()       # channel of every queued chunk, for priorities=False
+        self._cond = threading.Condition()
+        try:
+            # Keep the shared FIFO in the kernel short; the priority queues are up here
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 64 * 1024)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            pass
+        sock.settimeout(None)
+        for ch in CHANNELS.values():
+            self.channels[ch] = ChannelSocket(self, ch)
+
+    def channel(self, name):
+        return self.channels[CHANNELS[name]]
+
+    def start(self):
+        threading.Thread(target=self._write_loop, daemon=True).start()
+        threading.Thread(target=self._read_loop, daemon=True).start()
+        return self
+
+    # ----- sending -----
+    def send(self, ch, data, timeout=None):
+        view = memoryview(data)
+        with self._cond:
+            for off in range(0, len(view), self.chunk):
+                piece = bytes(view[off:off + self.chunk])
+                ok = self._cond.wait_for(
+                    lambda: not self.alive or self._queued[ch] + len(piece) <= QUEUE_BYTES[ch] or not self._queued[ch],
+                    timeout)
+                if not self.alive:
+                    raise OSError("session closed")
+                if not ok:
+                    raise socket.timeout("timed out")
+                self._queues[ch].append((0, piece))
+                self._queued[ch] += len(piece)
+                self._order.append(ch)
+                self._cond.notify_all()
+
+    def send_fin(self, ch):
+        with self._cond:
+            if self.alive:
+                self._queues[ch].append((FLAG_FIN, b""))
+                self._order.append(ch)
+                self._cond.notify_all()
+
+    def _next(self):
+        # -> (channel, flags, payload); caller holds _cond
+        if self.priorities:
+            ch = min((c for c, q in self._queues.items() if q), key=PRIORITY.get)
+            self._order.remove(ch)
+        else:
+            ch = self._order.popleft()
+        flags, piece = self._queues[ch].popleft()
+        self._queued[ch] -= len(piece)
+        return ch, flags, piece
+
+    def _write_loop(self):
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._order or not self.alive)
+                    if not self.alive:
+                        break
+                    ch, flags, piece = self._next()
+                    self._cond.notify_all()
+                self.sock.sendall(MUX_HDR.pack(ch, flags, len(piece)) + piece)
+                self.bytes_sent[ch] += len(piece)
+        except OSError:
+            pass
+        self.close()
+
+    # ----- receiving -----
+    def _recv_exact(self, n):
+        buf = bytearray()
+        while len(buf) < n:
+            more = self.sock.recv(n - len(buf))
+            if not more:
+                raise ConnectionError("session closed")
+            buf += more
+        return bytes(buf)
+
+    def _read_loop(self):
+        try:
+            while self.alive:
+                ch, flags, n = MUX_HDR.unpack(self._recv_exact(MUX_HDR.size))
+                payload = self._recv_exact(n) if n else b""
+                chan = self.channels.get(ch)
+                if chan is None:
+                    continue
+                if payload:
+                    chan._feed(payload)
+                if flags & FLAG_FIN:
+                    chan._end()
+        except (OSError, ConnectionError):
+            pass
+        self.close()
+
+    def close(self):
+        with self._cond:
+            if not self.alive:
+                return
+            self.alive = False
+            self._cond.notify_all()
+        for chan in self.channels.values():
+            chan._end()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+        if self.on_close is not None:
+            self.on_close(self)
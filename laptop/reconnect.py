@@ -0,0 +1,31 @@
+import random
+
+
+class Backoff:
+    """
+    Jittered exponential backoff for the reconnect loops (video, control).
+
+    The n-th consecutive failure waits a random time in [d/2, d], where
+    d = initial * factor**n capped at `maximum`. The first retry is quick, so
+    a Pi that only dropped off Wi-Fi for a moment is back within a fraction of
+    a second. A Pi that is rebooting gets one attempt every 1-2 s, which is
+    cheap on the LAN and bounds how late a retry lands after the link is back.
+    The jitter keeps the channels from retrying in lockstep. Call reset()
+    once the link has proved itself (first frame, first PONG), not on connect
+    alone: a server that accepts and then drops every connection should still
+    back off.
+    """
+
+    def __init__(self, initial=0.2, maximum=2.0, factor=2.0):
+        self.initial = float(initial)
+        self.maximum = float(maximum)
+        self.factor = float(factor)
+        self.failures = 0
+
+    def next(self):
+        d = min(self.maximum, self.initial * self.factor ** self.failures)
+        self.failures += 1
+        return random.uniform(d / 2, d)
+
+    def reset(self):
+        self.failures = 0
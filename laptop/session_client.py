@@ -0,0 +1,92 @@
+import json
+import socket
+import threading
+
+from mux_protocol import MuxConnection, read_json_line
+
+
+class SessionClient:
+    """
+    Laptop end of the Pi's session protocol: control, video, audio and
+    telemetry over one TCP connection (port 5050), each as a socket-like
+    channel. GUI and VideoClient use channel("control") / channel("video")
+    in place of their own sockets; nothing else about their protocols changes.
+
+    The session id the Pi hands out is kept and offered again by connect(),
+    so a reconnect replaces the old session on the Pi instead of leaving it
+    to time out.
+    """
+
+    def __init__(self, host, port=5050, channels=("control", "video", "telemetry")):
+        self.host = host
+        self.port = port
+        self.wanted = list(channels)
+        self.session_id = None
+        self.accepted = []
+        self.mux = None
+        self.telemetry = {}         # latest telemetry line from the Pi
+        self._lock = threading.Lock()
+
+    def connect(self, timeout=5.0):
+        with self._lock:
+            if self.mux is not None and self.mux.alive:
+                return self
+            sock = socket.create_connection((self.host, self.port), timeout=timeout)
+            try:
+                hello = {"session": self.session_id, "channels": self.wanted}
+                sock.sendall((json.dumps(hello) + "\n").encode("utf-8"))
+                reply = read_json_line(sock)
+            except Exception:
+                sock.close()
+                raise
+            self.session_id = reply["session"]
+            self.accepted = reply.get("channels", [])
+            self.mux = MuxConnection(sock).start()
+            print(f"Session {self.session_id} {'resumed' if reply.get('resumed') else 'opened'}: "
+                  f"{', '.join(self.accepted)}")
+        if "telemetry" in self.accepted:
+            threading.Thread(target=self._read_telemetry, args=(self.mux,), daemon=True).start()
+        return self
+
+    @property
+    def alive(self):
+        return self.mux is not None and self.mux.alive
+
+    def channel(self, name):
+        if self.mux is None:
+            raise ConnectionError("session not connected")
+        if name not in self.accepted:
+            raise ConnectionError(f"the Pi did not accept the {name} channel")
+        chan = self.mux.channel(name)
+        if chan.closed:
+            # Channels are one-shot: a closed one stays closed until close() + connect()
+            raise ConnectionError(f"{name} channel was closed; reconnect the session")
+        return chan
+
+    def _read_telemetry(self, mux):
+        chan = mux.channel("telemetry")
+        buf = b""
+        while True:
+            more = chan.recv(4096)
+            if not more:
+                return
+            buf += more
+            *lines, buf = buf.split(b"\n")
+            for line in lines:
+                try:
+                    self.telemetry = json.loads(line)
+                except ValueError:
+                    pass
+
+    def close_if(self, mux):
+        # Close the session only if `mux` is still the live one. A channel that dropped must not
+        # take down a session another channel has already reopened. -> True if it was closed
+        with self._lock:
+            if mux is None or mux is not self.mux:
+                return False
+        mux.close()
+        return True
+
+    def close(self):
+        if self.mux is not None:
+            self.mux.close()
@@ -0,0 +1,162 @@
+import numpy as np
+
+
+def iou_matrix(a, b):
+    # a: (N, 4), b: (M, 4) xyxy boxes -> (N, M) IoU, fully vectorized
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return inter / np.maximum(union, 1e-6)
+
+
+class Sighting:
+    """One animal continuously in view: a closed (or still open) track."""
+
+    __slots__ = ("track_id", "cls_id", "animal", "start", "end", "frames",
+                 "peak_conf", "conf_sum", "best_bbox", "last_bbox")
+
+    def __init__(self, track_id, cls_id, animal, ts, conf, bbox):
+        self.track_id = track_id
+        self.cls_id = int(cls_id)
+        self.animal = animal
+        self.start = ts
+        self.end = ts
+        self.frames = 1
+        self.peak_conf = conf
+        self.conf_sum = conf
+        self.best_bbox = bbox
+        self.last_bbox = bbox
+
+    def _extend(self, ts, conf, bbox):
+        self.end = ts
+        self.frames += 1
+        self.conf_sum += conf
+        self.last_bbox = bbox
+        if conf > self.peak_conf:
+            self.peak_conf = conf
+            self.best_bbox = bbox
+
+    @property
+    def mean_conf(self):
+        return self.conf_sum / max(1, self.frames)
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    def as_dict(self):
+        return {
+            "track_id": self.track_id,
+            "animal": self.animal,
+            "start": self.start,
+            "end": self.end,
+            "frames": self.frames,
+            "peak_conf": round(float(self.peak_conf), 3),
+            "mean_conf": round(float(self.mean_conf), 3),
+            "best_bbox": tuple(int(v) for v in self.best_bbox),
+        }
+
+    def __repr__(self):
+        return (f"Sighting({self.track_id}, {self.animal}, {self.frames} frames, "
+                f"{self.duration:.1f}s, peak={self.peak_conf:.2f})")
+
+
+class SightingTracker:
+    """
+    Links per-frame detections into tracks with greedy IoU matching and emits
+    one Sighting per track once it has been unseen for `max_gap` seconds.
+    """
+
+    def __init__(self, class_name=str, iou_threshold=0.3, max_gap=2.0, min_frames=2, class_agnostic=False):
+        self.class_name = class_name
+        self.iou_threshold = float(iou_threshold)
+        self.max_gap = float(max_gap)
+        self.min_frames = int(min_frames)   # shorter tracks are treated as flicker and dropped
+        self.class_agnostic = bool(class_agnostic)
+        self.active = {}                    # track_id -> Sighting
+        self._next_id = 1
+
+    def update(self, ts, boxes, scores, classes):
+        """
+        Feed one inferred frame (possibly with no detections).
+        Returns (track_ids, confirmed, ended): the track id for every input box, the
+        sightings this frame confirmed (their track just reached `min_frames`, so a
+        one-frame flicker never shows up here) and the sightings that closed.
+        """
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+        classes = np.asarray(classes, dtype=np.int64).reshape(-1)
+        track_ids = np.zeros(len(boxes), dtype=np.int64)
+        confirmed = []
+
+        tracks = list(self.active.values())
+        if tracks and len(boxes):
+            t_boxes = np.array([t.last_bbox for t in tracks], dtype=np.float32)
+            iou = iou_matrix(boxes, t_boxes)
+            if not self.class_agnostic:
+                t_cls = np.array([t.cls_id for t in tracks], dtype=np.int64)
+                iou[classes[:, None] != t_cls[None, :]] = 0.0
+            # Greedy: take pairs in descending IoU order, each det/track used once
+            order = np.argsort(iou, axis=None)[::-1]
+            di, ti = np.unravel_index(order, iou.shape)
+            keep = iou[di, ti] >= self.iou_threshold
+            used_d, used_t = set(), set()
+            for d, t in zip(di[keep].tolist(), ti[keep].tolist()):
+                if d in used_d or t in used_t:
+                    continue
+                used_d.add(d)
+                used_t.add(t)
+                tr = tracks[t]
+                tr._extend(ts, float(scores[d]), tuple(boxes[d].tolist()))
+                track_ids[d] = tr.track_id
+                if tr.frames == self.min_frames:
+                    confirmed.append(tr)
+
+        for d in np.flatnonzero(track_ids == 0).tolist():
+            tid = self._next_id
+            self._next_id += 1
+            s = Sighting(tid, classes[d], self.class_name(int(classes[d])), ts,
+                         float(scores[d]), tuple(boxes[d].tolist()))
+            self.active[tid] = s
+            track_ids[d] = tid
+            if self.min_frames <= 1:
+                confirmed.append(s)
+
+        ended = self._expire(ts)
+        return track_ids, confirmed, ended
+
+    def _expire(self, ts):
+        ended = []
+        for tid in [tid for tid, s in self.active.items() if ts - s.end > self.max_gap]:
+            s = self.active.pop(tid)
+            if s.frames >= self.min_frames:
+                ended.append(s)
+        return ended
+
+    def set_class(self, track_id, cls_id):
+        s = self.active.get(track_id)
+        if s is not None:
+            s.cls_id = int(cls_id)
+            s.animal = self.class_name(int(cls_id))
+
+    def current(self):
+        # Best currently-open sighting (highest peak confidence), or None.
+        # Safe to call from another thread: list() snapshots the dict in one step.
+        active = list(self.active.values())
+        if not active:
+            return None
+        return max(active, key=lambda s: s.peak_conf)
+
+    def flush(self):
+        ended = [s for s in self.active.values() if s.frames >= self.min_frames]
+        self.active.clear()
+        return ended
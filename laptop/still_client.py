@@ -0,0 +1,116 @@
+import itertools
+import json
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+
+IMAGE_DIR = "laptop/stored_image"
+
+
+class StillClient(threading.Thread):
+    """
+    Requests full-sensor-resolution stills from the Pi and saves them with their metadata.
+
+    request() sends "SNAP <id>" over the robot control socket (via `send`, which
+    the GUI points at its send_command) and remembers what the still is for.
+    This thread holds the side-channel connection (port 8002) and writes each
+    arriving still as {animal}_{time}_full{id}.jpg plus a .json sidecar, and a row
+    in the DetectionStore if one is given.
+    """
+
+    def __init__(self, server_ip, server_port=8002, out_dir=IMAGE_DIR, store=None, robot_id=None,
+                 min_interval=5.0):
+        super().__init__(daemon=True)
+        self.server_ip = server_ip
+        self.server_port = server_port
+        self.out_dir = out_dir
+        self.store = store
+        self.robot_id = str(robot_id) if robot_id is not None else str(server_ip)
+        self.min_interval = float(min_interval)     # per-animal rate limit for automatic requests
+        self.send = None                            # callable(str) -> None, set by the GUI
+        self.saved = 0
+        self.last_path = None
+        self.running = True
+
+        self._ids = itertools.count(1)
+        self._pending = {}                          # id -> metadata
+        self._last_auto = {}                        # animal -> last automatic request time
+        self._lock = threading.Lock()
+
+    def request(self, animal, confidence=None, bbox=None, reason="operator"):
+        # Safe to call from the inference or GUI thread; returns the request id or None
+        if self.send is None:
+            return None
+        now = time.time()
+        with self._lock:
+            if reason != "operator":
+                if now - self._last_auto.get(animal, 0.0) < self.min_interval:
+                    return None
+                self._last_auto[animal] = now
+            req_id = f"{next(self._ids)}"
+            self._pending[req_id] = {
+                "animal": animal,
+                "confidence": None if confidence is None else round(float(confidence), 3),
+                "bbox": None if bbox is None else [int(v) for v in bbox],
+                "reason": reason,
+                "requested": now,
+            }
+        self.send(f"SNAP {req_id}\n")
+        return req_id
+
+    def run(self):
+        while self.running:
+            try:
+                sock = socket.create_connection((self.server_ip, self.server_port), timeout=5.0)
+            except OSError as e:
+                print(f"[STILL] connect failed: {e}")
+                time.sleep(5.0)
+                continue
+            print("[STILL] connected to still channel")
+            sock.settimeout(None)
+            try:
+                f = sock.makefile("rb")
+                while self.running:
+                    line = f.readline()
+                    if not line:
+                        raise ConnectionError("still channel closed")
+                    header = json.loads(line)
+                    data = f.read(header["size"])
+                    if len(data) != header["size"]:
+                        raise ConnectionError("still channel closed mid-transfer")
+                    self._save(header, data)
+            except Exception as e:
+                print(f"[STILL] {e}")
+            finally:
+                sock.close()
+
+    def _save(self, header, data):
+        with self._lock:
+            metas = [self._pending.pop(i, None) for i in header["ids"]]
+        metas = [m for m in metas if m is not None] or [{"animal": "Unknown", "reason": "unknown"}]
+        # An operator save wins the file name; otherwise the first request does
+        meta = next((m for m in metas if m["reason"] == "operator"), metas[0])
+        stamp = datetime.fromtimestamp(header["ts"]).isoformat(timespec="seconds")
+        # The request id keeps two stills captured in the same second from sharing a name
+        base = os.path.join(self.out_dir, f"{meta['animal']}_{stamp}_full{(header['ids'] or [''])[0]}")
+        os.makedirs(self.out_dir, exist_ok=True)
+        with open(base + ".jpg", "wb") as out:
+            out.write(data)
+        sidecar = dict(meta, ts=header["ts"], width=header["w"], height=header["h"],
+                       robot_id=self.robot_id, requests=metas)
+        with open(base + ".json", "w") as out:
+            json.dump(sidecar, out, indent=2)
+        if self.store is not None:
+            self.store.add_still(header["ts"], meta["animal"], base + ".jpg", header["w"], header["h"],
+                                 confidence=meta.get("confidence"), bbox=meta.get("bbox"),
+                                 reason=meta.get("reason"), robot_id=self.robot_id)
+        self.last_path = base + ".jpg"
+        self.saved += 1
+        lag = header["ts"] - meta.get("requested", header["ts"])
+        print(f"[STILL] saved {base}.jpg ({header['w']}x{header['h']}, {len(data) // 1024} KB, "
+              f"captured {lag:.2f} s after request)")
+
+    def stop(self):
+        self.running = False
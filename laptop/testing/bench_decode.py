@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Decode + preprocess cost per frame: full-res decode vs DCT-scaled decode.
+
+Frames are the PNGs in laptop/stored_image re-encoded the way the Pi sends them
+(960x540, JPEG quality 60). "preprocess" is the YOLO-style letterbox to --imgsz.
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+}
+
+
+def load_jpegs(image_dir, quality=60, size=(960, 540)):
+    out = []
+    for path in sorted(glob.glob(os.path.join(image_dir, "*.png"))):
+        img = cv2.imread(path, cv2.IMREAD_COLOR)
+        if img is None:
+            continue
+        img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+        ok, jpeg = cv2.imencode(".jpg", img, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        if ok:
+            out.append(jpeg.tobytes())
+    return out
+
+
+def letterbox(img, imgsz):
+    h, w = img.shape[:2]
+    r = imgsz / max(h, w)
+    nw, nh = int(round(w * r)), int(round(h * r))
+    if (nw, nh) != (w, h):
+        img = cv2.resize(img, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    top = (imgsz - nh) // 2
+    left = (imgsz - nw) // 2
+    return cv2.copyMakeBorder(img, top, imgsz - nh - top, left, imgsz - nw - left,
+                              cv2.BORDER_CONSTANT, value=(114, 114, 114))
+
+
+def bench(jpegs, scale, imgsz, repeat):
+    flag = FLAGS[scale]
+    t_dec = t_pre = 0.0
+    n = 0
+    for _ in range(repeat):
+        for data in jpegs:
+            t0 = time.perf_counter()
+            img = cv2.imdecode(np.frombuffer(data, np.uint8), flag)
+            t1 = time.perf_counter()
+            letterbox(img, imgsz)
+            t2 = time.perf_counter()
+            t_dec += t1 - t0
+            t_pre += t2 - t1
+            n += 1
+    return 1000 * t_dec / n, 1000 * t_pre / n, img.shape
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark scaled JPEG decode for inference")
+    ap.add_argument("--images", default="laptop/stored_image")
+    ap.add_argument("--imgsz", type=int, default=416)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    jpegs = load_jpegs(args.images)
+    if not jpegs:
+        raise SystemExit(f"No images found in {args.images}")
+    print(f"{len(jpegs)} frames, mean {np.mean([len(j) for j in jpegs]) / 1024:.1f} KiB, imgsz={args.imgsz}")
+
+    base = None
+    for scale in sorted(FLAGS):
+        dec, pre, shape = bench(jpegs, scale, args.imgsz, args.repeat)
+        total = dec + pre
+        base = base or total
+        print(f"scale 1/{scale}: decode {dec:6.2f} ms  preprocess {pre:5.2f} ms  "
+              f"total {total:6.2f} ms  ({base / total:4.2f}x)  decoded {shape[1]}x{shape[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the per-frame hot paths, with a stored baseline.
+
+Fixtures are the PNGs in laptop/stored_image, re-encoded the way the Pi
+sends them (960x540, JPEG quality 60). Each path is timed per call over the
+whole fixture set for --min-time seconds, in five blocks; the reported median
+is the best block's:
+
+  framing_parse     VideoClient._tcp_frames over the length-prefixed stream
+  imdecode_full     cv2.imdecode at full resolution (display path)
+  imdecode_half     cv2.imdecode at 1/2 (VideoClient's default inference decode)
+  detect_annotate   VideoClient._detect_and_annotate on the 1/2 decode (needs laptop/best.pt)
+  draw_fps          VideoClient._draw_fps on a full-resolution frame
+  gui_photo         GUI.fit_photo: resize into the 960x540 video area -> Tk PhotoImage (needs a display)
+  pi_jpeg_encode    the Pi's MjpegEncoder at quality 60, with frame tags
+  get_latest        VideoClient.get_latest(10) on a full detection ring
+
+A path whose dependencies are missing here (torch, the model, PIL, a
+display) is recorded as skipped, not timed. Results go to --out as JSON.
+With --baseline (default hot_paths_baseline.json next to this script, if
+present) every path is compared on its median. One that got slower by
+more than --threshold is flagged and the exit status is 1.
+--save-baseline writes this run as the new baseline. Baselines are
+per machine; make one on the machine you compare on.
+
+Run from the repo root: python laptop/testing/bench_hot_paths.py [--save-baseline]
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import struct
+import sys
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, HERE)
+sys.path.insert(1, os.path.join(HERE, ".."))
+sys.path.insert(2, os.path.join(HERE, "..", "..", "pi"))
+from bench_decode import load_jpegs  # noqa: E402
+from detection_ring import DetectionRing  # noqa: E402
+from video_codecs import MjpegEncoder  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(HERE, "hot_paths_baseline.json")
+# Same order as laptop/main.py
+ANIMAL_NAMES = [
+    "Cockatoo", "Crocodile", "Frog", "Kangaroo", "Koala", "Owl", "Penguin",
+    "Platypus", "Snake", "Tasmanian Devil", "Wombat"
+]
+
+
+class Skip(Exception):
+    pass
+
+
+def measure(fn, items, min_time, blocks=5):
+    # Per-call times (µs) over rounds through `items`, after one warm-up round. The time is split into
+    # blocks and the median is the lowest block median (like timeit's best-of-N): other load on the
+    # machine only ever makes a block slower, so this is what compares across runs.
+    for it in items:
+        fn(it)
+    times, medians = [], []
+    for _ in range(blocks):
+        block = []
+        t_end = time.perf_counter() + min_time / blocks
+        while time.perf_counter() < t_end or len(block) < len(items):
+            for it in items:
+                t0 = time.perf_counter()
+                fn(it)
+                block.append(time.perf_counter() - t0)
+        medians.append(np.median(block))
+        times += block
+    us = 1e6 * np.array(times)
+    return {"median_us": round(1e6 * float(min(medians)), 2), "p95_us": round(float(np.percentile(us, 95)), 2),
+            "calls": len(times)}
+
+
+# ----- fixtures -----
+class StreamSocket:
+    # Replays a captured TCP stream through recv() like a socket would
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def recv(self, n):
+        chunk = self.data[self.pos:self.pos + n]
+        self.pos += len(chunk)
+        return chunk
+
+
+def bare_client():
+    # VideoClient without the constructor (no model load): enough for the methods that only touch
+    # the stream / drawing / ring state
+    from video_client import VideoClient
+    c = VideoClient.__new__(VideoClient)
+    c.running = True
+    c.annotate = True
+    c.acks = False
+    c.stream_info = {}
+    c._send_acks = False
+    c.animal_names = ANIMAL_NAMES
+    c.v_names = "video_stream"
+    return c
+
+
+# ----- benchmarks: each returns (fn, items, frames per call) or raises Skip -----
+def framing_parse(jpegs, args):
+    try:
+        client = bare_client()
+    except ImportError as e:
+        raise Skip(f"video_client not importable: {e}")
+    header = json.dumps({"codec": "mjpeg", "w": 960, "h": 540}).encode() + b"\n"
+    stream = header + b"".join(struct.pack(">I", len(j)) + j for j in jpegs)
+
+    def parse(_):
+        client.sock = StreamSocket(stream)
+        try:
+            for _frame in client._tcp_frames():
+                pass
+        except ConnectionError:
+            pass        # end of the replayed stream
+    # One call parses the whole stream: reported per frame
+    return parse, [None], len(jpegs)
+
+
+def imdecode_full(jpegs, args):
+    return (lambda j: cv2.imdecode(np.frombuffer(j, np.uint8), cv2.IMREAD_COLOR)), jpegs, 1
+
+
+def imdecode_half(jpegs, args):
+    return (lambda j: cv2.imdecode(np.frombuffer(j, np.uint8), cv2.IMREAD_REDUCED_COLOR_2)), jpegs, 1
+
+
+def detect_annotate(jpegs, args):
+    if not os.path.exists(args.model):
+        raise Skip(f"no model at {args.model}")
+    try:
+        from video_client import VideoClient
+    except ImportError as e:
+        raise Skip(f"video_client not importable: {e}")
+    client = VideoClient("127.0.0.1", 0, ANIMAL_NAMES, best_shot=False, reconnect=False)
+    if client.registry.current[0] is None:
+        raise Skip("model failed to load")
+    frames = [(cv2.imdecode(np.frombuffer(j, np.uint8), cv2.IMREAD_REDUCED_COLOR_2), j) for j in jpegs]
+
+    def run(item):
+        small, j = item
+        client._frame_seq += 1
+        client._detect_and_annotate(small, 2, lambda: cv2.imdecode(np.frombuffer(j, np.uint8), cv2.IMREAD_COLOR))
+    return run, frames, 1
+
+
+def draw_fps(jpegs, args):
+    try:
+        client = bare_client()
+    except ImportError as e:
+        raise Skip(f"video_client not importable: {e}")
+    frames = [cv2.imdecode(np.frombuffer(j, np.uint8), cv2.IMREAD_COLOR) for j in jpegs]
+    return (lambda f: client._draw_fps(f, 29.7)), frames, 1
+
+
+def gui_photo(jpegs, args):
+    try:
+        import tkinter as tk
+        from GUI import fit_photo
+    except ImportError as e:
+        raise Skip(f"GUI not importable: {e}")
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        raise Skip(f"no display: {e}")
+    root.withdraw()
+    frames = [cv2.imdecode(np.frombuffer(j, np.uint8), cv2.IMREAD_COLOR) for j in jpegs]
+    # The GUI's video area is 960x540; a slightly smaller label forces the real resize
+    return (lambda f: fit_photo(f, 958, 538)), frames, 1
+
+
+def pi_jpeg_encode(jpegs, args):
+    enc = MjpegEncoder(quality=60)
+    frames = [cv2.imdecode(np.frombuffer(j, np.uint8), cv2.IMREAD_COLOR) for j in jpegs]
+    tags = {"f": 1234, "t": round(time.time(), 3), "q": 60, "s": 1.0}
+    return (lambda f: enc.encode(f, tags)), frames, 1
+
+
+def get_latest(jpegs, args):
+    try:
+        client = bare_client()
+    except ImportError as e:
+        raise Skip(f"video_client not importable: {e}")
+    ring = DetectionRing(4096)
+    rng = np.random.default_rng(0)
+    now = time.time()
+    for i in range(4096):
+        n = int(rng.integers(1, 4))
+        boxes = rng.integers(0, 900, (n, 4))
+        ring.append(now + i / 30, rng.integers(0, len(ANIMAL_NAMES), n), rng.random(n).astype(np.float32), boxes, i)
+    client.v_detections = ring
+    return (lambda _: client.get_latest(10)), [None], 1
+
+
+BENCHMARKS = [framing_parse, imdecode_full, imdecode_half, detect_annotate, draw_fps, gui_photo, pi_jpeg_encode,
+              get_latest]
+
+
+def compare(results, baseline, threshold):
+    # -> list of (name, base median, new median, change) for paths slower than threshold
+    regressions = []
+    print(f"\n  {'path':<16s} {'median µs':>10s} {'p95 µs':>9s} {'baseline':>9s} {'change':>7s}")
+    for name, r in results.items():
+        if "skipped" in r:
+            print(f"  {name:<16s} skipped: {r['skipped']}")
+            continue
+        base = (baseline or {}).get(name, {})
+        line = f"  {name:<16s} {r['median_us']:10.1f} {r['p95_us']:9.1f}"
+        if "median_us" in base:
+            change = r["median_us"] / base["median_us"] - 1
+            flag = "  REGRESSION" if change > threshold else ""
+            line += f" {base['median_us']:9.1f} {100 * change:+6.0f}%{flag}"
+            if change > threshold:
+                regressions.append((name, base["median_us"], r["median_us"], change))
+        print(line)
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Hot-path micro-benchmarks with baseline comparison")
+    ap.add_argument("--images", default="laptop/stored_image")
+    ap.add_argument("--model", default="laptop/best.pt")
+    ap.add_argument("--min-time", type=float, default=2.0, help="seconds of timing per path")
+    ap.add_argument("--only", nargs="*", default=None, help="run just these paths")
+    ap.add_argument("--out", default="hot_paths.json", help="results file")
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE)
+    ap.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    ap.add_argument("--threshold", type=float, default=0.15, help="slowdown flagged as a regression (0.15 = 15%%)")
+    args = ap.parse_args()
+
+    jpegs = load_jpegs(args.images)
+    if not jpegs:
+        raise SystemExit(f"no fixture images in {args.images}")
+    print(f"{len(jpegs)} fixture frames from {args.images} (960x540, q60)")
+
+    results = {}
+    for bench in BENCHMARKS:
+        name = bench.__name__
+        if args.only and name not in args.only:
+            continue
+        try:
+            fn, items, per_call = bench(jpegs, args)
+        except Skip as e:
+            results[name] = {"skipped": str(e)}
+            continue
+        r = measure(fn, items, args.min_time)
+        if per_call > 1:
+            # One call covered `per_call` frames: report per frame
+            r["median_us"] = round(r["median_us"] / per_call, 2)
+            r["p95_us"] = round(r["p95_us"] / per_call, 2)
+        results[name] = r
+
+    meta = {"date": datetime.now().isoformat(timespec="seconds"), "host": socket.gethostname(),
+            "platform": platform.platform(), "python": platform.python_version(), "opencv": cv2.__version__,
+            "frames": len(jpegs), "min_time": args.min_time}
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        baseline = stored["results"]
+        print(f"baseline: {args.baseline} ({stored['meta']['date']}, {stored['meta']['host']})")
+        if stored["meta"].get("host") != meta["host"]:
+            print("  note: baseline is from another machine; differences may be hardware, not code")
+    regressions = compare(results, baseline, args.threshold)
+
+    with open(args.out, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    print(f"\nwrote {args.out}")
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+        print(f"saved baseline {args.baseline}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {100 * args.threshold:.0f}%:")
+        for name, base, new, change in regressions:
+            print(f"  {name}: {base:.1f} -> {new:.1f} µs ({100 * change:+.0f}%)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
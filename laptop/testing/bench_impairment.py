@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Video, audio and control under each impairment profile.
+
+Runs the Pi video server on the synthetic camera, plus stand-ins for the
+audio and control servers that speak the Pi's wire formats (audio: JSON
+header line, then length-prefixed 20 ms PCM chunks; control: PING lines
+answered with PONG). All three go through impairment proxies sharing one
+Link, which follows the profile (testing/profiles/*.json), for
+`--duration` seconds each. Every channel reconnects on its own after an
+outage.
+
+Per channel it reports messages per second, latency percentiles, drops and
+reconnects:
+  video    frames shown; latency = capture -> received; drops = frames the
+           server captured for us that never arrived (sequence gaps)
+  audio    chunks; latency = capture -> received; drops = chunks missing or
+           later than the 200 ms playout buffer
+  control  PINGs every 100 ms; latency = round trip; drops = no PONG within 1 s
+
+--udp carries the video over the UDP transport (Pi --udp) instead of TCP.
+
+Run from the repo root: python laptop/testing/bench_impairment.py [profile ...] [--json results.json]
+"""
+
+import argparse
+import glob
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, HERE)
+sys.path.insert(1, os.path.join(HERE, ".."))
+sys.path.insert(2, os.path.join(HERE, "..", "..", "pi"))
+from frame_tags import read_tags  # noqa: E402
+from impairment_proxy import PROFILE_DIR, Link, ThrottlingProxy, UdpImpairmentProxy, load_profile  # noqa: E402
+from udp_receiver import UdpFrameReceiver  # noqa: E402
+from video_server import video_streaming_server  # noqa: E402
+
+AUDIO_CHUNK_S = 0.02        # 20 ms of 16 kHz mono S16_LE, like the Pi's default
+AUDIO_CHUNK = struct.Struct(">dQ")      # stand-in payload starts with (capture time, chunk number)
+PLAYOUT_S = 0.2
+PING_INTERVAL = 0.1
+PING_DEADLINE = 1.0
+
+
+def free_port():
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+# ----- server stand-ins -----
+def serve(port, handler):
+    lsock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    lsock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    lsock.bind(("127.0.0.1", port))
+    lsock.listen(8)
+
+    def accept_loop():
+        while True:
+            conn, _ = lsock.accept()
+            threading.Thread(target=handler, args=(conn,), daemon=True).start()
+    threading.Thread(target=accept_loop, daemon=True).start()
+
+
+def audio_handler(conn):
+    # Same header and framing as the Pi's stream_audio; chunk numbers run on wall time across connections
+    chunk_bytes = int(16000 * 2 * AUDIO_CHUNK_S)
+    header = {"sample_rate": 16000, "channels": 1, "format": "S16_LE", "chunk_bytes": chunk_bytes}
+    pad = bytes(chunk_bytes - AUDIO_CHUNK.size)
+    try:
+        conn.sendall((json.dumps(header) + "\n").encode("utf-8"))
+        n = int(time.time() / AUDIO_CHUNK_S)
+        while True:
+            wait = (n + 1) * AUDIO_CHUNK_S - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            n += 1
+            chunk = AUDIO_CHUNK.pack(time.time(), n) + pad
+            conn.sendall(struct.pack(">I", len(chunk)) + chunk)
+    except OSError:
+        pass
+    conn.close()
+
+
+def control_handler(conn):
+    # handle_control_client's PING path; nothing here drives a UART
+    buf = b""
+    try:
+        while True:
+            more = conn.recv(1024)
+            if not more:
+                break
+            buf += more
+            *lines, buf = buf.split(b"\n")
+            for line in lines:
+                if line.startswith(b"PING"):
+                    conn.sendall(b"PONG" + line[4:] + b"\n")
+    except OSError:
+        pass
+    conn.close()
+
+
+# ----- clients -----
+class ChannelStats:
+    def __init__(self):
+        self.latencies = []
+        self.received = 0
+        self.drops = 0
+        self.reconnects = 0
+        self._connected = False
+
+    def connected(self):
+        # Called once a session has actually delivered (the proxy accepts and drops during an outage)
+        if self._connected:
+            self.reconnects += 1
+        self._connected = True
+
+
+def recv_exact(f, n):
+    data = f.read(n)
+    if len(data) < n:
+        raise ConnectionError("closed")
+    return data
+
+
+def reconnecting(port, stats, stop, session):
+    # Runs session(sock) until stop; any link failure -> short pause, reconnect
+    while not stop.is_set():
+        try:
+            sock = socket.create_connection(("127.0.0.1", port), timeout=2.0)
+        except OSError:
+            stop.wait(0.2)
+            continue
+        sock.settimeout(5.0)
+        try:
+            session(sock)
+        except (OSError, ConnectionError, ValueError):
+            pass
+        sock.close()
+        stop.wait(0.2)
+
+
+def video_tcp(port, stats, stop):
+    last = [None]
+
+    def session(sock):
+        sock.sendall(b'{"codecs": ["mjpeg"], "acks": false}\n')
+        f = sock.makefile("rb")
+        if not f.readline().startswith(b"{"):
+            raise ConnectionError("no stream header")
+        stats.connected()
+        while not stop.is_set():
+            data = recv_exact(f, int.from_bytes(recv_exact(f, 4), "big"))
+            count_frame(read_tags(data) or {}, stats, last)
+    reconnecting(port, stats, stop, session)
+
+
+def video_udp(port, stats, stop):
+    rx = UdpFrameReceiver("127.0.0.1", port)
+    stats.connected()
+    last = [None]
+    for data, _sent in rx.frames(lambda: not stop.is_set()):
+        count_frame(read_tags(data) or {}, stats, last)
+    rx.close()
+
+
+def count_frame(tags, stats, last):
+    if "t" in tags:
+        stats.latencies.append(time.time() - tags["t"])
+    stats.received += 1
+    seq = tags.get("f")
+    if seq is not None:
+        if last[0] is not None and seq > last[0] + 1:
+            stats.drops += seq - last[0] - 1
+        last[0] = seq
+
+
+def audio(port, stats, stop):
+    last = [None]
+
+    def session(sock):
+        f = sock.makefile("rb")
+        json.loads(f.readline())
+        stats.connected()
+        while not stop.is_set():
+            chunk = recv_exact(f, int.from_bytes(recv_exact(f, 4), "big"))
+            t, n = AUDIO_CHUNK.unpack_from(chunk)
+            lat = time.time() - t
+            stats.latencies.append(lat)
+            stats.received += 1
+            if lat > PLAYOUT_S:
+                stats.drops += 1
+            if last[0] is not None and n > last[0] + 1:
+                stats.drops += n - last[0] - 1
+            last[0] = n
+    reconnecting(port, stats, stop, session)
+
+
+def control(port, stats, stop):
+    sent = {}
+    total = [0]
+
+    def session(sock):
+        def reader():
+            buf = b""
+            first = True
+            try:
+                while True:
+                    more = sock.recv(1024)
+                    if not more:
+                        return
+                    buf += more
+                    *lines, buf = buf.split(b"\n")
+                    now = time.monotonic()
+                    for line in lines:
+                        t0 = sent.pop(line[4:].strip(), None)
+                        if first:
+                            stats.connected()
+                            first = False
+                        if t0 is not None and now - t0 <= PING_DEADLINE:
+                            stats.latencies.append(now - t0)
+                            stats.received += 1
+            except OSError:
+                pass
+        threading.Thread(target=reader, daemon=True).start()
+        n = 0
+        while not stop.is_set():
+            key = f"{id(sock)}-{n}".encode()
+            sent[key] = time.monotonic()
+            sock.sendall(b"PING " + key + b"\n")
+            total[0] += 1
+            n += 1
+            stop.wait(PING_INTERVAL)
+    reconnecting(port, stats, stop, session)
+    # Everything never answered, or answered too late, is a drop
+    stats.drops = total[0] - stats.received
+
+
+# ----- runner -----
+def run_profile(profile, ports, duration, udp):
+    link = Link()
+    proxies = {name: ThrottlingProxy(("127.0.0.1", port), link=link) for name, port in ports.items()}
+    if udp:
+        proxies["video"] = UdpImpairmentProxy(("127.0.0.1", ports["video"]), link=link)
+    link.start(profile=profile)
+    for p in proxies.values():
+        p.start()
+
+    stats = {name: ChannelStats() for name in ("video", "audio", "control")}
+    stop = threading.Event()
+    clients = {"video": video_udp if udp else video_tcp, "audio": audio, "control": control}
+    threads = [threading.Thread(target=fn, args=(proxies[name].port, stats[name], stop), daemon=True)
+               for name, fn in clients.items()]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for p in proxies.values():
+        p.stop()
+    for t in threads:
+        t.join(timeout=3.0)
+
+    result = {"outages": link.outages}
+    for name, s in stats.items():
+        lat = 1000 * np.array(s.latencies) if s.latencies else np.zeros(1)
+        result[name] = {
+            "rate": round(s.received / duration, 1),
+            "p50_ms": round(float(np.percentile(lat, 50)), 1),
+            "p95_ms": round(float(np.percentile(lat, 95)), 1),
+            "p99_ms": round(float(np.percentile(lat, 99)), 1),
+            "max_ms": round(float(lat.max()), 1),
+            "drops": int(s.drops),
+            "reconnects": s.reconnects,
+        }
+    return result
+
+
+def report(name, result):
+    print(f"\n{name} ({result['outages']} outages)")
+    print(f"  {'channel':<8s} {'msg/s':>6s} {'p50 ms':>7s} {'p95 ms':>7s} {'p99 ms':>7s} {'max ms':>7s} "
+          f"{'drops':>6s} {'reconn':>6s}")
+    for ch in ("video", "audio", "control"):
+        r = result[ch]
+        print(f"  {ch:<8s} {r['rate']:6.1f} {r['p50_ms']:7.1f} {r['p95_ms']:7.1f} {r['p99_ms']:7.1f} "
+              f"{r['max_ms']:7.1f} {r['drops']:6d} {r['reconnects']:6d}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Streaming channels under Wi-Fi impairment profiles")
+    ap.add_argument("profiles", nargs="*", help="profile files or names (default: all in testing/profiles)")
+    ap.add_argument("--duration", type=float, default=30.0, help="seconds per profile")
+    ap.add_argument("--udp", action="store_true", help="video over the UDP transport")
+    ap.add_argument("--json", default=None, help="write all results to this file")
+    args = ap.parse_args()
+    names = args.profiles or sorted(glob.glob(os.path.join(PROFILE_DIR, "*.json")))
+    profiles = [load_profile(n) for n in names]
+
+    ports = {"video": free_port(), "audio": free_port(), "control": free_port()}
+    # Timestamps + sequence numbers come with rate control; an unreachable target never adapts anything
+    threading.Thread(target=video_streaming_server, daemon=True,
+                     kwargs={"host": "127.0.0.1", "port": ports["video"], "camera": "synthetic",
+                             "udp": args.udp, "rate_control": True, "target_latency": 1e9}).start()
+    serve(ports["audio"], audio_handler)
+    serve(ports["control"], control_handler)
+    time.sleep(1.0)
+
+    results = {}
+    for profile in profiles:
+        print(f"\n=== {profile['name']}: {profile.get('description', '')}")
+        results[profile["name"]] = run_profile(profile, ports, args.duration, args.udp)
+        report(profile["name"], results[profile["name"]])
+
+    print("\nsummary (video FPS / p95 ms / drops, audio p95 ms / drops, control p95 ms / drops)")
+    for name, r in results.items():
+        v, a, c = r["video"], r["audio"], r["control"]
+        print(f"  {name:<16s} video {v['rate']:5.1f} / {v['p95_ms']:6.0f} / {v['drops']:5d}   "
+              f"audio {a['p95_ms']:6.0f} / {a['drops']:4d}   control {c['p95_ms']:6.0f} / {c['drops']:4d}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"duration": args.duration, "udp": args.udp, "profiles": results}, f, indent=2)
+        print(f"\nwrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Per-frame inference cost: ultralytics predict() vs the FastDetector path.
+
+Overhead = end-to-end time minus the bare forward pass on an already-prepared
+tensor, i.e. everything spent on letterbox, tensor creation and post-processing.
+Run from the repo root: python laptop/testing/bench_inference.py
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from bench_decode import load_jpegs  # noqa: E402
+from fast_infer import FastDetector  # noqa: E402
+from ultralytics import YOLO  # noqa: E402
+
+
+def timed(fn, frames, repeat):
+    for f in frames[:3]:
+        fn(f)                            # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for f in frames:
+            fn(f)
+    return 1000 * (time.perf_counter() - t0) / (repeat * len(frames))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark predict() vs FastDetector")
+    ap.add_argument("--model", default="laptop/best.pt")
+    ap.add_argument("--images", default="laptop/stored_image")
+    ap.add_argument("--imgsz", type=int, default=416)
+    ap.add_argument("--device", default="cpu")
+    ap.add_argument("--threads", type=int, default=None)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    frames = [cv2.imdecode(np.frombuffer(j, np.uint8), cv2.IMREAD_REDUCED_COLOR_2) for j in load_jpegs(args.images)]
+    yolo = YOLO(args.model)
+    yolo.fuse()
+
+    ms_predict = timed(lambda f: yolo.predict(source=f, imgsz=args.imgsz, conf=0.25, verbose=False,
+                                              device=args.device), frames, args.repeat)
+    fast = FastDetector(yolo, imgsz=args.imgsz, device=args.device, conf=0.25, threads=args.threads)
+    ms_fast = timed(fast, frames, args.repeat)
+
+    x = torch.zeros((1, 3, fast.imgsz, fast.imgsz), device=fast.device)
+    with torch.inference_mode():
+        ms_forward = timed(lambda _: fast.net(x), frames, args.repeat)
+
+    print(f"{len(frames)} frames @ imgsz={fast.imgsz} on {args.device}, threads={torch.get_num_threads()}")
+    print(f"forward only : {ms_forward:7.2f} ms")
+    print(f"predict()    : {ms_predict:7.2f} ms  (overhead {ms_predict - ms_forward:6.2f} ms)")
+    print(f"FastDetector : {ms_fast:7.2f} ms  (overhead {ms_fast - ms_forward:6.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
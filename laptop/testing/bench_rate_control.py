@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Rate control under a bandwidth drop, through the throttling proxy.
+
+Runs the Pi video server on the synthetic camera, puts ThrottlingProxy in
+front of it with a link schedule (default: 20 Mbit/s, 3 Mbit/s from 8 s, back
+to 20 Mbit/s at 20 s) and reads the stream with an acking client that
+decodes every frame like VideoClient. Prints a per-second timeline (link,
+delivered FPS, Mbit/s, latency, the quality/scale in use) with the controller
+on, then the same schedule with it off. "Off" runs the controller with an
+unreachable target, so frames still carry the timestamps latency is
+measured from but nothing is ever adapted.
+
+Run from the repo root: python laptop/testing/bench_rate_control.py
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, HERE)
+sys.path.insert(1, os.path.join(HERE, ".."))
+sys.path.insert(2, os.path.join(HERE, "..", "..", "pi"))
+from frame_tags import read_tags  # noqa: E402
+from impairment_proxy import ThrottlingProxy, parse_schedule  # noqa: E402
+from video_server import video_streaming_server  # noqa: E402
+
+
+def free_port():
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def read_frames(sock):
+    f = sock.makefile("rb")
+    header = json.loads(f.readline())
+    while True:
+        head = f.read(4)
+        if len(head) < 4:
+            return
+        data = f.read(int.from_bytes(head, "big"))
+        yield header, data
+
+
+def run(target, schedule, duration):
+    port = free_port()
+    threading.Thread(target=video_streaming_server, daemon=True,
+                     kwargs={"host": "127.0.0.1", "port": port, "camera": "synthetic",
+                             "rate_control": True, "target_latency": target}).start()
+    time.sleep(1.0)
+    proxy = ThrottlingProxy(("127.0.0.1", port), schedule=schedule)
+    proxy.start()
+    sock = socket.create_connection(("127.0.0.1", proxy.port))
+    sock.sendall(b'{"codecs": ["mjpeg"], "acks": true}\n')
+    sock.settimeout(5.0)
+
+    rows = []       # (elapsed, latency, bytes, quality, scale)
+    proc = None
+    try:
+        for _header, data in read_frames(sock):
+            t0 = time.perf_counter()
+            tags = read_tags(data) or {}
+            cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_REDUCED_COLOR_2)
+            rows.append((proxy.elapsed(), time.time() - tags["t"], len(data), tags["q"], tags["s"]))
+            ms = 1000 * (time.perf_counter() - t0)
+            proc = ms if proc is None else 0.8 * proc + 0.2 * ms
+            sock.sendall((json.dumps({"f": tags["f"], "p": round(proc, 1)}) + "\n").encode())
+            if proxy.elapsed() >= duration:
+                break
+    except OSError as e:
+        print(f"  client: {e}")
+    sock.close()
+    proxy.stop()
+    return rows
+
+
+def link_at(schedule, t):
+    rate = 0.0
+    for start, mbps in schedule:
+        if t >= start:
+            rate = mbps
+    return rate
+
+
+def report(rows, schedule, target, duration):
+    print(f"  {'t s':>4s} {'link':>6s} {'FPS':>5s} {'Mbit/s':>7s} {'p50 ms':>7s} {'max ms':>7s} {'q':>4s} {'scale':>5s}")
+    for sec in range(int(duration)):
+        b = [r for r in rows if sec <= r[0] < sec + 1]
+        if not b:
+            print(f"  {sec:4d} {link_at(schedule, sec):6g}     0")
+            continue
+        lat = [r[1] for r in b]
+        print(f"  {sec:4d} {link_at(schedule, sec):6g} {len(b):5d} {sum(r[2] for r in b) * 8 / 1e6:7.2f} "
+              f"{1000 * np.median(lat):7.0f} {1000 * max(lat):7.0f} {b[-1][3]:4d} {b[-1][4]:5g}")
+    over = sum(r[1] > target for r in rows)
+    print(f"  frames {len(rows)}, over {1000 * target:.0f} ms target: {over} ({over / max(1, len(rows)):.0%})")
+    # Reaction: after each drop in link rate, how long until frames stay under the target for a second
+    ends = [t for t, _ in schedule[1:]] + [duration]
+    for (t_prev, r_prev), (t, r), end in zip(schedule, schedule[1:], ends[1:]):
+        if r >= r_prev:
+            continue
+        phase = [row for row in rows if t <= row[0] < end]
+        settled = next((a[0] for i, a in enumerate(phase)
+                        if all(b[1] <= target for b in phase[i:] if b[0] <= a[0] + 1.0)), None)
+        print(f"  drop to {r:g} Mbit/s at {t:g} s: " +
+              (f"under target again {settled - t:.1f} s later" if settled is not None else "never back under target"))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Rate controller vs a bandwidth drop")
+    ap.add_argument("--schedule", default="0:20,8:3,20:20", help="link Mbit/s over time, t:mbps,...")
+    ap.add_argument("--duration", type=float, default=30.0)
+    ap.add_argument("--target", type=float, default=0.25, help="target latency in seconds")
+    args = ap.parse_args()
+    schedule = parse_schedule(args.schedule)
+
+    for label, target in (("rate control on", args.target), ("rate control off", 1e9)):
+        print(f"\n{label} (target {1000 * args.target:.0f} ms)")
+        rows = run(target, schedule, args.duration)
+        report(rows, schedule, args.target, args.duration)
+
+
+if __name__ == "__main__":
+    main()
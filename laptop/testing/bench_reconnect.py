@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Video recovery after link outages, through the impairment proxy.
+
+Runs the Pi video server on the synthetic camera behind ThrottlingProxy and
+a real VideoClient (model, pipeline and all) against the proxy, with a
+display loop polling get_frame() like the GUI. Every `--every` seconds the
+proxy cuts the link for `--outage` seconds. For each outage it prints how
+long after the link came back the first frame was displayed, and the
+client's own reconnect -> first frame figure (VideoClient.recovery_ms). The
+gap between the two is the backoff wait that happened to straddle the
+restore.
+
+Run from the repo root: python laptop/testing/bench_reconnect.py
+"""
+
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, HERE)
+sys.path.insert(1, os.path.join(HERE, ".."))
+sys.path.insert(2, os.path.join(HERE, "..", "..", "pi"))
+from impairment_proxy import ThrottlingProxy  # noqa: E402
+from video_client import VideoClient  # noqa: E402
+from video_server import video_streaming_server  # noqa: E402
+
+
+def free_port():
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Time from link recovery to first displayed frame")
+    ap.add_argument("--outages", type=int, default=5)
+    ap.add_argument("--outage", type=float, default=2.0, help="seconds the link stays down")
+    ap.add_argument("--every", type=float, default=6.0, help="seconds between outages")
+    ap.add_argument("--codec", default=None, help="mjpeg / delta / h264 (default: the server's)")
+    args = ap.parse_args()
+
+    port = free_port()
+    threading.Thread(target=video_streaming_server, daemon=True,
+                     kwargs={"host": "127.0.0.1", "port": port, "camera": "synthetic"}).start()
+    time.sleep(1.0)
+    proxy = ThrottlingProxy(("127.0.0.1", port))
+    proxy.start()
+
+    client = VideoClient("127.0.0.1", proxy.port, animal_names=["animal"], best_shot=False,
+                         codec=args.codec, stall_timeout=2.0)
+    client.start()
+
+    restores = []
+    first_frames = []
+    waiting = False
+    t_next = time.monotonic() + args.every
+    while len(first_frames) < args.outages:
+        now = time.monotonic()
+        if not waiting and now >= t_next:
+            proxy.cut(args.outage)
+            restores.append(now + args.outage)
+            waiting = True
+        frame = client.get_frame(timeout=0.01)
+        if frame is not None and waiting and time.monotonic() > restores[-1]:
+            first_frames.append(time.monotonic())
+            waiting = False
+            t_next = time.monotonic() + args.every - args.outage
+        if now > t_next + 60:
+            print("no frame a minute after the link came back")
+            break
+    client.stop()
+    proxy.stop()
+
+    print(f"\n{'outage':>6s} {'restore -> frame ms':>20s} {'reconnect -> frame ms':>22s}")
+    since_restore = [1000 * (f - r) for r, f in zip(restores, first_frames)]
+    recovery = list(client.recovery_ms)
+    for i, ms in enumerate(since_restore):
+        rec = f"{recovery[i]:22.0f}" if i < len(recovery) else f"{'-':>22s}"
+        print(f"{i + 1:6d} {ms:20.0f} {rec}")
+    if since_restore:
+        print(f"restore -> frame: p50 {np.percentile(since_restore, 50):.0f} ms, max {max(since_restore):.0f} ms "
+              f"({client.reconnects} reconnects)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Control latency under video load on the multiplexed session.
+
+Runs the Pi's SessionServer with the synthetic-camera video server behind
+ThrottlingProxy (default 8 Mbit/s), opens a SessionClient through it and
+reads video on the "video" channel while sending a PING on the "control"
+channel every 100 ms. Prints PONG round-trip percentiles and the video
+frame rate with channel priorities on, then with them off (chunks leave in
+arrival order, which is what one shared TCP stream without priorities
+would do).
+
+Run from the repo root: python laptop/testing/bench_session.py
+"""
+
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, HERE)
+sys.path.insert(1, os.path.join(HERE, ".."))
+sys.path.insert(2, os.path.join(HERE, "..", "..", "pi"))
+from impairment_proxy import ThrottlingProxy  # noqa: E402
+from session_client import SessionClient  # noqa: E402
+from session_server import SessionServer  # noqa: E402
+from video_server import video_streaming_server  # noqa: E402
+
+
+def free_port():
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def ping_handler(conn):
+    # Control channel stand-in: answer PING like handle_control_client, ignore the rest
+    buf = b""
+    while True:
+        more = conn.recv(1024)
+        if not more:
+            return
+        buf += more
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            if line.startswith(b"PING"):
+                conn.sendall(b"PONG" + line[4:] + b"\n")
+
+
+def read_video(chan, counts, stop):
+    chan.sendall(b'{"codecs": ["mjpeg"], "acks": false}\n')
+    buf = b""
+    while b"\n" not in buf:
+        buf += chan.recv(4096)
+    buf = buf.split(b"\n", 1)[1]
+    while not stop.is_set():
+        while len(buf) < 4:
+            more = chan.recv(65536)
+            if not more:
+                return
+            buf += more
+        n = int.from_bytes(buf[:4], "big")
+        while len(buf) < 4 + n:
+            more = chan.recv(65536)
+            if not more:
+                return
+            buf += more
+        buf = buf[4 + n:]
+        counts.append((time.monotonic(), n))
+
+
+def run(priorities, rate, duration):
+    port = free_port()
+    session = SessionServer("127.0.0.1", port, priorities=priorities)
+    session.handlers["control"] = ping_handler
+    threading.Thread(target=video_streaming_server, daemon=True,
+                     kwargs={"host": "127.0.0.1", "port": free_port(), "camera": "synthetic",
+                             "jpeg_quality": 90, "session": session}).start()
+    session.start()
+    time.sleep(1.0)
+    proxy = ThrottlingProxy(("127.0.0.1", port), rate_mbps=rate)
+    proxy.start()
+
+    client = SessionClient("127.0.0.1", proxy.port, channels=("control", "video")).connect()
+    control = client.channel("control")
+    frames, stop = [], threading.Event()
+    threading.Thread(target=read_video, args=(client.channel("video"), frames, stop), daemon=True).start()
+    time.sleep(1.0)     # let the video fill the link first
+
+    rtts, buf = [], b""
+    control.settimeout(5.0)
+    t_end = time.monotonic() + duration
+    t_start = time.monotonic()
+    i = 0
+    try:
+        while time.monotonic() < t_end:
+            t0 = time.perf_counter()
+            control.sendall(f"PING {i}\n".encode())
+            while b"\n" not in buf:
+                buf += control.recv(1024)
+            line, buf = buf.split(b"\n", 1)
+            rtts.append(1000 * (time.perf_counter() - t0))
+            i += 1
+            time.sleep(0.1)
+    except OSError as e:
+        print(f"  control: {e}")
+    stop.set()
+    got = [n for t, n in frames if t >= t_start]
+    client.close()
+    proxy.stop()
+    return rtts, len(got) / duration, 8 * sum(got) / duration / 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Control RTT vs video load on the session connection")
+    ap.add_argument("--rate", type=float, default=8.0, help="link Mbit/s")
+    ap.add_argument("--duration", type=float, default=10.0)
+    args = ap.parse_args()
+
+    print(f"link {args.rate:g} Mbit/s, {args.duration:g} s per run")
+    print(f"  {'priorities':<11s} {'pings':>5s} {'p50 ms':>7s} {'p95 ms':>7s} {'max ms':>7s} {'video FPS':>9s} {'Mbit/s':>7s}")
+    for priorities in (True, False):
+        rtts, fps, mbps = run(priorities, args.rate, args.duration)
+        if not rtts:
+            print(f"  {'on' if priorities else 'off':<11s} no PONGs")
+            continue
+        print(f"  {'on' if priorities else 'off':<11s} {len(rtts):5d} {np.percentile(rtts, 50):7.1f} "
+              f"{np.percentile(rtts, 95):7.1f} {max(rtts):7.1f} {fps:9.1f} {mbps:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
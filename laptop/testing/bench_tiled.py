@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Throughput of tiled ROI inference vs plain full-frame inference.
+
+Replays laptop/stored_image as a 960x540 "video" (each still held for a few
+frames with a small shift so the motion ROI finder has something to track) and
+reports FPS, tiles per frame and detections per frame for both modes.
+Run from the repo root: python laptop/testing/bench_tiled.py
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from bench_decode import load_jpegs  # noqa: E402
+from fast_infer import FastDetector  # noqa: E402
+from tiled_inference import TiledDetector  # noqa: E402
+from ultralytics import YOLO  # noqa: E402
+
+
+def replay(jpegs, hold=4):
+    for data in jpegs:
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        for k in range(hold):
+            yield np.roll(img, 6 * k, axis=1)
+
+
+def run(fn, frames):
+    n_det = 0
+    t0 = time.perf_counter()
+    for f in frames:
+        n_det += len(fn(f)[0])
+    dt = time.perf_counter() - t0
+    return len(frames) / dt, n_det / len(frames)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark tiled vs full-frame inference")
+    ap.add_argument("--model", default="laptop/best.pt")
+    ap.add_argument("--images", default="laptop/stored_image")
+    ap.add_argument("--imgsz", type=int, default=416)
+    ap.add_argument("--max-tiles", type=int, default=4)
+    ap.add_argument("--device", default="cpu")
+    ap.add_argument("--conf", type=float, default=0.25)
+    args = ap.parse_args()
+
+    frames = list(replay(load_jpegs(args.images)))
+    yolo = YOLO(args.model)
+    yolo.fuse()
+
+    full = FastDetector(yolo, imgsz=args.imgsz, device=args.device, conf=args.conf)
+    fps_full, det_full = run(full, frames)
+
+    tiler = TiledDetector(tile=args.imgsz, max_tiles=args.max_tiles)
+    tiled = FastDetector(yolo, imgsz=args.imgsz, device=args.device, conf=args.conf, max_batch=tiler.max_batch)
+    fps_tiled, det_tiled = run(lambda f: tiler(tiled, f), frames)
+
+    print(f"{len(frames)} frames 960x540, imgsz={args.imgsz}, device={args.device}")
+    print(f"full frame : {fps_full:6.1f} FPS  {det_full:4.2f} det/frame")
+    print(f"tiled      : {fps_tiled:6.1f} FPS  {det_tiled:4.2f} det/frame  "
+          f"{tiler.tiles_run / max(1, tiler.frames):4.2f} tiles/frame  ({fps_tiled / fps_full:4.2f}x throughput)")
+
+
+if __name__ == "__main__":
+    main()
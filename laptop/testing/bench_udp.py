@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Frame latency over TCP vs the UDP transport on loopback, with simulated loss.
+
+Synthetic 960x540 JPEGs are sent at --fps through a shim per transport:
+  TCP: a relay that, for each lost segment in a chunk, holds the chunk for one
+       retransmission timeout (everything behind it waits: head-of-line blocking).
+  UDP: a relay that drops each datagram with the given probability.
+Latency is send -> fully received per delivered frame; the table also shows
+the fraction of frames that arrived.
+
+Run from the repo root: python laptop/testing/bench_udp.py [--loss 0 0.01 0.05]
+"""
+
+import argparse
+import os
+import queue
+import random
+import select
+import socket
+import struct
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(1, os.path.join(HERE, "..", "..", "pi"))
+from frame_tags import read_tags, tag_jpeg  # noqa: E402  (same module on both sides)
+from udp_receiver import UdpFrameReceiver  # noqa: E402
+from udp_sender import UdpVideoSender  # noqa: E402
+from video_server import SyntheticCamera  # noqa: E402
+
+SEGMENT = 1448      # TCP payload per segment on a 1500-byte MTU
+
+
+def make_frames(n):
+    cam = SyntheticCamera(realtime=False)
+    enc = [int(cv2.IMWRITE_JPEG_QUALITY), 60]
+    return [cv2.imencode(".jpg", cam.read(), enc)[1].tobytes() for _ in range(n)]
+
+
+# ----- shims -----
+class LossyUdpRelay(threading.Thread):
+    def __init__(self, target, loss, seed=0):
+        super().__init__(daemon=True)
+        self.front = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.front.bind(("127.0.0.1", 0))
+        self.port = self.front.getsockname()[1]
+        self.back = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.back.connect(target)
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.client = None
+        self.running = True
+
+    def run(self):
+        while self.running:
+            r, _, _ = select.select([self.front, self.back], [], [], 0.2)
+            for s in r:
+                if s is self.front:
+                    data, self.client = self.front.recvfrom(65536)
+                    self.back.send(data)
+                else:
+                    data = self.back.recv(65536)
+                    if self.client is not None and self.rng.random() >= self.loss:
+                        self.front.sendto(data, self.client)
+
+
+class StallingTcpRelay(threading.Thread):
+    def __init__(self, target, loss, rto=0.2, chunk=16 * 1024, seed=0):
+        super().__init__(daemon=True)
+        self.lsock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.lsock.bind(("127.0.0.1", 0))
+        self.lsock.listen(1)
+        self.port = self.lsock.getsockname()[1]
+        self.target = target
+        self.p_chunk = 1 - (1 - loss) ** (chunk / SEGMENT)     # any segment of the chunk lost
+        self.rto = rto
+        self.chunk = chunk
+        self.rng = random.Random(seed)
+
+    def run(self):
+        conn, _ = self.lsock.accept()
+        up = socket.create_connection(self.target)
+        up.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 64 * 1024)
+        try:
+            while True:
+                data = up.recv(self.chunk)
+                if not data:
+                    break
+                if self.rng.random() < self.p_chunk:
+                    time.sleep(self.rto)       # retransmission: this and everything queued behind it waits
+                conn.sendall(data)
+        except OSError:
+            pass
+        finally:
+            conn.close()
+            up.close()
+
+
+# ----- senders -----
+def tcp_sender(frames, fps, stop):
+    # Same shape as ClientWriter: latest-frame queue, length-prefixed, 2 s send timeout
+    lsock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    lsock.bind(("127.0.0.1", 0))
+    lsock.listen(1)
+    port = lsock.getsockname()[1]
+
+    def serve():
+        conn, _ = lsock.accept()
+        conn.settimeout(2.0)
+        conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 256 * 1024)
+        q = queue.Queue(maxsize=1)
+
+        def writer():
+            try:
+                while True:
+                    data = q.get()
+                    if data is None:
+                        break
+                    conn.sendall(struct.pack(">I", len(data)) + data)
+            except OSError as e:
+                print(f"  TCP writer died: {e}")
+            conn.close()
+
+        threading.Thread(target=writer, daemon=True).start()
+        for i, jpeg in enumerate(_paced(frames, fps, stop)):
+            data = tag_jpeg(jpeg, {"t": time.time(), "i": i})
+            if q.full():
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+            q.put(data)
+        q.put(None)
+
+    threading.Thread(target=serve, daemon=True).start()
+    return port
+
+
+def _paced(frames, fps, stop):
+    t_next = time.perf_counter()
+    for f in frames:
+        if stop.is_set():
+            return
+        t_next += 1.0 / fps
+        time.sleep(max(0.0, t_next - time.perf_counter()))
+        yield f
+
+
+def run_tcp(frames, fps, loss):
+    stop = threading.Event()
+    port = tcp_sender(frames, fps, stop)
+    relay = StallingTcpRelay(("127.0.0.1", port), loss)
+    relay.start()
+    sock = socket.create_connection(("127.0.0.1", relay.port))
+    sock.settimeout(3.0)
+    lat, buf = [], b""
+    try:
+        while True:
+            while len(buf) < 4:
+                more = sock.recv(65536)
+                if not more:
+                    raise ConnectionError
+                buf += more
+            n = struct.unpack(">I", buf[:4])[0]
+            buf = buf[4:]
+            while len(buf) < n:
+                more = sock.recv(65536)
+                if not more:
+                    raise ConnectionError
+                buf += more
+            tags = read_tags(buf[:n])
+            buf = buf[n:]
+            lat.append(time.time() - tags["t"])
+    except (ConnectionError, OSError):
+        pass
+    stop.set()
+    return lat
+
+
+def run_udp(frames, fps, loss):
+    sender = UdpVideoSender("127.0.0.1", 0)
+    relay = LossyUdpRelay(("127.0.0.1", sender.port), loss)
+    relay.start()
+    rx = UdpFrameReceiver("127.0.0.1", relay.port)
+    time.sleep(0.3)     # let the HELLO through before frames start
+    lat = []
+    done = threading.Event()
+
+    def feed():
+        for jpeg in _paced(frames, fps, threading.Event()):
+            sender.push(jpeg)
+        time.sleep(0.5)
+        done.set()
+
+    threading.Thread(target=feed, daemon=True).start()
+    for _data, ts in rx.frames(lambda: not done.is_set()):
+        lat.append(time.time() - ts)
+    relay.running = False
+    rx.close()
+    return lat, rx.reasm.stats()
+
+
+def pct(lat, q):
+    return 1000 * float(np.percentile(lat, q)) if lat else float("nan")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="TCP vs UDP video latency under simulated loss")
+    ap.add_argument("--loss", type=float, nargs="+", default=[0.0, 0.01, 0.05])
+    ap.add_argument("--frames", type=int, default=300)
+    ap.add_argument("--fps", type=float, default=30.0)
+    args = ap.parse_args()
+
+    frames = make_frames(args.frames)
+    print(f"{len(frames)} frames, mean {np.mean([len(f) for f in frames]) / 1024:.0f} KB, {args.fps:.0f} FPS")
+    print(f"{'transport':9s} {'loss':>5s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'arrived':>8s}")
+    for loss in args.loss:
+        lat = run_tcp(frames, args.fps, loss)
+        print(f"{'tcp':9s} {loss:5.2f} {pct(lat, 50):8.1f} {pct(lat, 95):8.1f} {pct(lat, 99):8.1f} "
+              f"{len(lat) / len(frames):8.0%}")
+        lat, st = run_udp(frames, args.fps, loss)
+        print(f"{'udp':9s} {loss:5.2f} {pct(lat, 50):8.1f} {pct(lat, 95):8.1f} {pct(lat, 99):8.1f} "
+              f"{len(lat) / len(frames):8.0%}  (receiver-reported loss {st['loss']:.1%})")
+
+
+if __name__ == "__main__":
+    main()
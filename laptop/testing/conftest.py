@@ -0,0 +1,7 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# test_laptop_*.py drive a real robot over the network and are run by hand, not collected
+collect_ignore_glob = ["test_laptop_*.py"]
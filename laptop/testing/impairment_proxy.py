@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+Local TCP/UDP proxy that impairs the link between a Pi server and the laptop.
+
+Sits between VideoClient (or any client) and a server and makes loopback
+behave like field Wi-Fi: a bandwidth cap, one-way latency with jitter,
+packet loss and outages, all held in a Link that every proxied connection
+shares (like the one radio hop they all cross). The parameters can change
+over time, from a rate schedule ("0:20,10:2,25:20" = 20 Mbit/s, 2 Mbit/s
+from t=10 s, back to 20 at 25 s) or from a JSON profile (see profiles/):
+
+  {"name": "marginal", "rate_mbps": 4, "latency_ms": 30, "jitter_ms": 20,
+   "loss": 0.02, "steps": [{"t": 10, "rate_mbps": 1.5}, {"t": 20, "rate_mbps": 4}],
+   "disconnects": [{"t": 15, "for": 3}]}
+
+The cap applies server -> client (up_rate_mbps caps the other way); latency,
+jitter and loss apply both ways. TCP cannot lose bytes, so a lost segment
+holds its chunk, and the whole stream behind it, for one retransmission
+timeout (head-of-line blocking). UDP datagrams are dropped outright, and
+ones that would queue for longer than `queue_ms` at the cap are tail-dropped
+like a router would. The upstream socket's receive buffer is kept small
+so, like a congested Wi-Fi hop, backpressure reaches the server instead of
+piling up here. During an outage (cut(), "disconnects") open TCP connections
+are dropped, new ones are closed straight away and datagrams vanish.
+
+Run: python laptop/testing/impairment_proxy.py --target raspberrypi.local:8000 --listen 8000 --rate 2
+     python laptop/testing/impairment_proxy.py --target raspberrypi.local:8000 --listen 8000 --udp \\
+         --profile marginal_wifi
+then point the client at 127.0.0.1:8000.
+"""
+
+import argparse
+import collections
+import heapq
+import itertools
+import json
+import os
+import random
+import socket
+import threading
+import time
+
+PROFILE_DIR = os.path.join(os.path.dirname(__file__), "profiles")
+LINK_PARAMS = ("rate_mbps", "up_rate_mbps", "latency_ms", "jitter_ms", "loss")
+SEGMENT = 1448      # TCP payload per segment on a 1500-byte MTU
+
+
+def parse_schedule(text):
+    # "t:mbps,t:mbps,..." -> [(t, mbps)] sorted by time
+    steps = []
+    for part in text.split(","):
+        t, mbps = part.split(":")
+        steps.append((float(t), float(mbps)))
+    return sorted(steps)
+
+
+def load_profile(name_or_path):
+    # A profile file, or the name of one in profiles/ ("marginal_wifi")
+    path = name_or_path
+    if not os.path.exists(path):
+        path = os.path.join(PROFILE_DIR, name_or_path + ".json")
+    with open(path) as f:
+        profile = json.load(f)
+    unknown = set(profile) - set(LINK_PARAMS) - {"name", "description", "rto_ms", "steps", "disconnects"}
+    if unknown:
+        raise ValueError(f"{path}: unknown profile keys {sorted(unknown)}")
+    profile.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    return profile
+
+
+class Link:
+    """
+    The impaired hop shared by every proxy that is given it.
+
+    Bandwidth is serialized per direction across all connections, so a video
+    stream filling the cap delays control bytes too, as on the real radio.
+    Parameters can be changed at any time (set(), a schedule or a profile).
+    """
+
+    def __init__(self, rate_mbps=0.0, up_rate_mbps=0.0, latency_ms=0.0, jitter_ms=0.0, loss=0.0, rto_ms=200.0,
+                 seed=None):
+        self.rate_mbps = float(rate_mbps)           # server -> client, 0 = unlimited
+        self.up_rate_mbps = float(up_rate_mbps)     # client -> server, 0 = unlimited
+        self.latency_ms = float(latency_ms)         # one way
+        self.jitter_ms = float(jitter_ms)
+        self.loss = float(loss)                     # per packet (TCP segment / UDP datagram)
+        self.rto_ms = float(rto_ms)                 # TCP hold per lost segment
+        self.rng = random.Random(seed)
+        self.t0 = None
+        self.outages = 0
+        self._down_until = 0.0
+        self._free = {True: 0.0, False: 0.0}        # direction (down?) -> time the link is free again
+        self._lock = threading.Lock()
+        self._on_cut = []                           # proxies drop their connections on an outage
+
+    def elapsed(self):
+        return 0.0 if self.t0 is None else time.monotonic() - self.t0
+
+    def set(self, **params):
+        for key, value in params.items():
+            if key not in LINK_PARAMS:
+                raise ValueError(f"unknown link parameter {key}")
+            setattr(self, key, float(value))
+        print(f"[PROXY] {self.elapsed():6.1f} s  " + self.describe())
+
+    def describe(self):
+        parts = [f"{self.rate_mbps:g} Mbit/s" if self.rate_mbps else "unlimited"]
+        if self.up_rate_mbps:
+            parts.append(f"up {self.up_rate_mbps:g} Mbit/s")
+        if self.latency_ms or self.jitter_ms:
+            parts.append(f"{self.latency_ms:g}±{self.jitter_ms:g} ms")
+        if self.loss:
+            parts.append(f"{100 * self.loss:g}% loss")
+        return "link " + ", ".join(parts)
+
+    # ----- outages -----
+    def cut(self, seconds):
+        self._down_until = time.monotonic() + seconds
+        self.outages += 1
+        print(f"[PROXY] {self.elapsed():6.1f} s  link down for {seconds:g} s")
+        for drop in list(self._on_cut):
+            drop()
+
+    def is_down(self):
+        return time.monotonic() < self._down_until
+
+    # ----- per-packet decisions -----
+    def departure(self, nbytes, down=True, max_queue=None):
+        # When the last byte of `nbytes` has left the link (serialized behind everyone else's bytes).
+        # None, and no link time used, if that is more than `max_queue` seconds away (tail drop).
+        rate = self.rate_mbps if down else self.up_rate_mbps
+        now = time.monotonic()
+        if rate <= 0:
+            return now
+        with self._lock:
+            depart = max(self._free[down], now) + nbytes * 8 / (rate * 1e6)
+            if max_queue is not None and depart - now > max_queue:
+                return None
+            self._free[down] = depart
+            return depart
+
+    def delay(self):
+        # One-way latency with jitter, in seconds
+        d = self.latency_ms
+        if self.jitter_ms:
+            d += self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(0.0, d) / 1000.0
+
+    def lost(self):
+        return self.loss > 0 and self.rng.random() < self.loss
+
+    def tcp_hold(self, nbytes):
+        # Retransmission time a TCP chunk picks up from its lost segments
+        if self.loss <= 0:
+            return 0.0
+        segments = -(-nbytes // SEGMENT)
+        return sum(self.rng.random() < self.loss for _ in range(segments)) * self.rto_ms / 1000.0
+
+    # ----- time-varying parameters -----
+    def start(self, schedule=None, profile=None):
+        # schedule: [(t, mbps)]; profile: dict from load_profile(). Returns self.
+        self.t0 = time.monotonic()
+        events = [(t, "set", {"rate_mbps": mbps}) for t, mbps in (schedule or [])]
+        if profile is not None:
+            self.rto_ms = float(profile.get("rto_ms", self.rto_ms))
+            base = {k: profile[k] for k in LINK_PARAMS if k in profile}
+            if base:
+                self.set(**base)
+            for step in profile.get("steps", []):
+                step = dict(step)
+                events.append((float(step.pop("t")), "set", step))
+            for d in profile.get("disconnects", []):
+                events.append((float(d["t"]), "cut", float(d["for"])))
+        if events:
+            threading.Thread(target=self._follow, args=(sorted(events, key=lambda e: e[0]),), daemon=True).start()
+        return self
+
+    def _follow(self, events):
+        for t, kind, arg in events:
+            delay = self.t0 + t - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            if kind == "set":
+                self.set(**arg)
+            else:
+                self.cut(arg)
+
+
+class _DelayLine(threading.Thread):
+    # In-order delivery of (due, data) to one socket; None closes it
+    def __init__(self, dst, on_error):
+        super().__init__(daemon=True)
+        self.dst = dst
+        self.on_error = on_error
+        self._q = collections.deque()
+        self._cond = threading.Condition()
+
+    def put(self, due, data):
+        with self._cond:
+            self._q.append((due, data))
+            self._cond.notify()
+
+    def run(self):
+        try:
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._q)
+                    due, data = self._q.popleft()
+                if data is None:
+                    break
+                wait = due - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                self.dst.sendall(data)
+        except OSError:
+            pass
+        self.on_error()
+
+
+class ThrottlingProxy(threading.Thread):
+    """TCP side: one listening port forwarded to `target` through a Link."""
+
+    def __init__(self, target, listen=("127.0.0.1", 0), rate_mbps=0.0, schedule=None, chunk=8 * 1024, link=None,
+                 profile=None):
+        super().__init__(daemon=True)
+        self.target = target
+        self.lsock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.lsock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.lsock.bind(listen)
+        self.lsock.listen(8)
+        self.port = self.lsock.getsockname()[1]
+        # Own link unless one is shared with other proxies (then whoever owns it starts it)
+        self._owns_link = link is None
+        self.link = link if link is not None else Link(rate_mbps)
+        self.schedule = list(schedule or [])
+        self.profile = profile
+        self.chunk = int(chunk)
+        self.bytes_down = 0
+        self.running = True
+        self._conns = set()
+        self.link._on_cut.append(self._drop_all)
+
+    @property
+    def rate_mbps(self):
+        return self.link.rate_mbps
+
+    def set_rate(self, mbps):
+        self.link.set(rate_mbps=mbps)
+
+    def cut(self, seconds):
+        # Link outage: drop every open connection and refuse new ones for `seconds`
+        self.link.cut(seconds)
+
+    def elapsed(self):
+        return self.link.elapsed()
+
+    def _drop_all(self):
+        for s in list(self._conns):
+            try:
+                s.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def run(self):
+        if self._owns_link:
+            self.link.start(self.schedule, self.profile)
+        while self.running:
+            try:
+                conn, addr = self.lsock.accept()
+            except OSError:
+                break
+            if self.link.is_down():
+                conn.close()
+                continue
+            try:
+                up = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                up.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 64 * 1024)
+                up.connect(self.target)
+            except OSError as e:
+                print(f"[PROXY] upstream connect failed: {e}")
+                conn.close()
+                continue
+            self._conns.update((conn, up))
+            threading.Thread(target=self._pump, args=(conn, up, False), daemon=True).start()
+            threading.Thread(target=self._pump, args=(up, conn, True), daemon=True).start()
+
+    def _close(self, *socks):
+        for s in socks:
+            try:
+                s.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            s.close()
+            self._conns.discard(s)
+
+    def _pump(self, src, dst, down):
+        link = self.link
+        line = _DelayLine(dst, lambda: self._close(src, dst))
+        line.start()
+        last_due = 0.0
+        try:
+            while self.running:
+                data = src.recv(self.chunk)
+                if not data:
+                    break
+                # Serialize at the link rate: reading waits until the link is free again (backpressure)
+                depart = link.departure(len(data), down)
+                wait = depart - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                # In order: jitter and retransmissions delay everything behind them too
+                last_due = max(last_due, depart + link.delay() + link.tcp_hold(len(data)))
+                line.put(last_due, data)
+                if down:
+                    self.bytes_down += len(data)
+        except OSError:
+            pass
+        line.put(last_due, None)
+
+    def stop(self):
+        self.running = False
+        self.lsock.close()
+        self._drop_all()
+
+
+class UdpImpairmentProxy(threading.Thread):
+    """
+    UDP side: datagrams from each client go to `target` from their own
+    upstream socket, and the replies come back to that client, both through
+    the Link. Lost or late datagrams are simply not delivered.
+    """
+
+    def __init__(self, target, listen=("127.0.0.1", 0), link=None, profile=None, queue_ms=250.0):
+        super().__init__(daemon=True)
+        self.target = target
+        self.front = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.front.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 2 * 1024 * 1024)
+        self.front.bind(listen)
+        self.port = self.front.getsockname()[1]
+        self._owns_link = link is None
+        self.link = link if link is not None else Link()
+        self.profile = profile
+        self.queue_s = float(queue_ms) / 1000.0
+        self.running = True
+        self.dropped = collections.Counter()       # "loss", "queue", "outage"
+        self._clients = {}                          # client addr -> upstream socket
+        self._heap = []                             # (due, n, sock, data, addr or None)
+        self._n = itertools.count()
+        self._cond = threading.Condition()
+
+    def run(self):
+        if self._owns_link:
+            self.link.start(profile=self.profile)
+        threading.Thread(target=self._deliver_loop, daemon=True).start()
+        while self.running:
+            try:
+                data, addr = self.front.recvfrom(65536)
+            except OSError:
+                break
+            up = self._clients.get(addr)
+            if up is None:
+                up = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                up.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 2 * 1024 * 1024)
+                up.connect(self.target)
+                self._clients[addr] = up
+                threading.Thread(target=self._upstream_loop, args=(up, addr), daemon=True).start()
+            self._forward(up, data, None, down=False)
+
+    def _upstream_loop(self, up, addr):
+        while self.running:
+            try:
+                data = up.recv(65536)
+            except ConnectionRefusedError:
+                continue            # server not up (yet); the client keeps saying hello
+            except OSError:
+                break
+            self._forward(self.front, data, addr, down=True)
+
+    def _forward(self, sock, data, addr, down):
+        link = self.link
+        if link.is_down():
+            self.dropped["outage"] += 1
+            return
+        if link.lost():
+            self.dropped["loss"] += 1
+            return
+        depart = link.departure(len(data), down, self.queue_s)
+        if depart is None:
+            self.dropped["queue"] += 1
+            return
+        with self._cond:
+            heapq.heappush(self._heap, (depart + link.delay(), next(self._n), sock, data, addr))
+            self._cond.notify()
+
+    def _deliver_loop(self):
+        # Datagrams leave in due order, so jitter reorders them, as on a real link
+        while self.running:
+            with self._cond:
+                self._cond.wait_for(lambda: self._heap or not self.running)
+                if not self.running:
+                    return
+                due = self._heap[0][0]
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                _, _, sock, data, addr = heapq.heappop(self._heap)
+            try:
+                if addr is None:
+                    sock.send(data)
+                else:
+                    sock.sendto(data, addr)
+            except OSError:
+                pass
+
+    def stop(self):
+        self.running = False
+        with self._cond:
+            self._cond.notify_all()
+        self.front.close()
+        for up in self._clients.values():
+            up.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Wi-Fi impairment proxy (TCP or UDP)")
+    ap.add_argument("--target", required=True, help="host:port of the real server")
+    ap.add_argument("--listen", type=int, default=8000, help="local port for the client")
+    ap.add_argument("--udp", action="store_true", help="proxy UDP datagrams instead of TCP")
+    ap.add_argument("--rate", type=float, default=0.0, help="server -> client Mbit/s (0 = unlimited)")
+    ap.add_argument("--schedule", default=None, help='rate changes over time, e.g. "0:20,10:2,25:20"')
+    ap.add_argument("--profile", default=None, help="profile JSON file, or a name from testing/profiles")
+    args = ap.parse_args()
+
+    host, port = args.target.rsplit(":", 1)
+    target = (host, int(port))
+    link = Link(args.rate)
+    profile = load_profile(args.profile) if args.profile else None
+    if args.udp:
+        proxy = UdpImpairmentProxy(target, ("0.0.0.0", args.listen), link=link)
+    else:
+        proxy = ThrottlingProxy(target, ("0.0.0.0", args.listen), link=link)
+    link.start(parse_schedule(args.schedule) if args.schedule else None, profile)
+    proxy.start()
+    print(f"[PROXY] {'UDP' if args.udp else 'TCP'} 127.0.0.1:{proxy.port} -> {args.target}, {link.describe()}")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        proxy.stop()
+
+
+if __name__ == "__main__":
+    main()
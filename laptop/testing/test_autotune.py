@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+import autotune  # noqa: E402
+
+
+def test_sizes_capped_at_the_frame():
+    assert autotune.capped_sizes((320, 416, 512, 640), 480) == [320, 416, 480]
+    assert autotune.capped_sizes((320, 416, 512, 640), 960) == [320, 416, 512, 640]
+    assert autotune.capped_sizes((320, 416, 512, 640), 300) == [320]
+
+
+def test_no_upsampled_candidate_is_picked(tmp_path, monkeypatch):
+    tried = []
+
+    def measure(model_path, frames, device, imgsz, threads, half, seconds, batch=1):
+        tried.append(imgsz)
+        return 1000.0 / imgsz       # all fast enough; the largest size would win
+    monkeypatch.setattr(autotune, "_measure", measure)
+    model = tmp_path / "best.pt"
+    model.write_bytes(b"weights")
+    frames = [np.zeros((270, 480, 3), np.uint8)]
+    best = autotune.autotune(str(model), target_fps=1.0, frames=frames, devices=["cpu"],
+                             cache_path=str(tmp_path / "cache.json"))
+    assert max(tried) == 480
+    assert best["imgsz"] == 480
+    # Cached per frame size: another size is tuned on its own
+    assert autotune.load_cached(str(model), 1.0, (480, 270), str(tmp_path / "cache.json")) is not None
+    assert autotune.load_cached(str(model), 1.0, (960, 540), str(tmp_path / "cache.json")) is None
+
+
+def test_tiled_batch_is_timed_as_one_frame(tmp_path, monkeypatch):
+    def measure(model_path, frames, device, imgsz, threads, half, seconds, batch=1):
+        return 100.0 / batch * 320 / imgsz       # one input at 320 runs at 100 FPS
+    monkeypatch.setattr(autotune, "_measure", measure)
+    model = tmp_path / "best.pt"
+    model.write_bytes(b"weights")
+    frames = [np.zeros((540, 960, 3), np.uint8)]
+    cache = str(tmp_path / "cache.json")
+    single = autotune.autotune(str(model), target_fps=16.0, frames=frames, devices=["cpu"], cache_path=cache)
+    tiled = autotune.autotune(str(model), target_fps=16.0, frames=frames, devices=["cpu"], cache_path=cache,
+                              batch=5)
+    assert single["imgsz"] == 640
+    # Five inputs per frame: only 320 still makes 16 FPS
+    assert tiled["imgsz"] == 320 and tiled["fps"] >= 16.0
+    assert autotune.load_cached(str(model), 16.0, (960, 540), cache, batch=5)["imgsz"] == 320
+    assert autotune.load_cached(str(model), 16.0, (960, 540), cache)["imgsz"] == 640
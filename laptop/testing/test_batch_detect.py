@@ -0,0 +1,53 @@
+import json
+from datetime import datetime
+
+from batch_detect import agreement, load_done, parse_name, scan
+
+STAMP = "2025-10-14T20:37:22"
+TS = datetime.fromisoformat(STAMP).timestamp()
+
+
+def test_label_and_time_from_filename():
+    assert parse_name(f"laptop/stored_image/Koala_{STAMP}.png") == ("Koala", TS)
+    assert parse_name(f"Tasmanian Devil_{STAMP}.png") == ("Tasmanian Devil", TS)
+
+
+def test_suffixed_names_keep_their_label():
+    # Pi full-resolution stills and auto best shots
+    assert parse_name(f"Koala_{STAMP}_full.jpg") == ("Koala", TS)
+    assert parse_name(f"Koala_{STAMP}_full7.jpg") == ("Koala", TS)
+    assert parse_name(f"Owl_{STAMP}_best12.png") == ("Owl", TS)
+
+
+def test_unlabeled_names():
+    assert parse_name("IMG_0001.jpg") == (None, None)
+    assert parse_name("snapshot.png") == (None, None)
+
+
+def test_resume_drops_a_partial_last_line(tmp_path):
+    out = tmp_path / "out.jsonl"
+    good = [{"path": "a.png", "label": "Owl"}, {"path": "b.png", "label": "Frog"}]
+    out.write_text("".join(json.dumps(r) + "\n" for r in good) + '{"path": "c.p')
+    assert load_done(str(out)) == good
+    assert out.read_text().endswith("\n") and out.read_text().count("\n") == 2
+
+
+def test_scan_is_recursive_and_sorted(tmp_path):
+    (tmp_path / "sub").mkdir()
+    for name in ("b.png", "a.jpg", "sub/c.JPG", "notes.txt"):
+        (tmp_path / name).write_bytes(b"")
+    assert [p[len(str(tmp_path)) + 1:] for p in scan(str(tmp_path))] == ["a.jpg", "b.png", "sub/c.JPG"]
+
+
+def test_agreement_uses_the_top_detection():
+    det = lambda animal, conf: {"animal": animal, "confidence": conf, "bbox": [0, 0, 1, 1]}  # noqa: E731
+    records = [
+        {"label": "Koala", "detections": [det("Wombat", 0.4), det("Koala", 0.9)]},
+        {"label": "Koala", "detections": []},
+        {"label": "Owl", "detections": [det("Owl", 0.7)]},
+        {"label": None, "detections": [det("Owl", 0.7)]},
+        {"label": "Owl", "error": "unreadable"},
+    ]
+    table = agreement(records)
+    assert table["Koala"][:2] == [2, 1] and table["Koala"][2] == {"(nothing)": 1}
+    assert table["Owl"][:2] == [1, 1]
@@ -0,0 +1,49 @@
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from best_shot import BestShotSelector
+from sightings import Sighting
+
+
+def frame(seed):
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 255, (270, 480, 3), dtype=np.uint8)
+
+
+def wait_saved(sel, n, timeout=3.0):
+    t_end = time.monotonic() + timeout
+    while sel.saved < n and time.monotonic() < t_end:
+        time.sleep(0.02)
+    return sel.saved
+
+
+def test_keeps_top_k():
+    sel = BestShotSelector(k=2, out_dir="unused")
+    scores = [sel.offer(1, frame(i), (100, 50, 300, 200), conf) for i, conf in enumerate((0.3, 0.9, 0.6, 0.4))]
+    heap = sel._heaps[1]
+    assert len(heap) == 2
+    assert sorted(s for s, *_ in heap) == sorted(scores)[-2:]
+
+
+def test_best_shot_names_never_collide(tmp_path):
+    sel = BestShotSelector(out_dir=str(tmp_path))
+    start = 1760474242.0
+    paths = []
+    for track_id in (3, 4):
+        sel.offer(track_id, frame(track_id), (100, 50, 300, 200), 0.8)
+        paths.append(sel.finish(Sighting(track_id, 4, "Koala", start, 0.8, (100, 50, 300, 200))))
+
+    stamp = datetime.fromtimestamp(start).isoformat(timespec="seconds")
+    manual = os.path.join(str(tmp_path), f"Koala_{stamp}.png")      # GUI.save_image's name
+    assert paths[0] != paths[1]
+    assert manual not in paths
+    assert wait_saved(sel, 2) == 2
+    assert all(os.path.exists(p) for p in paths)
+
+
+def test_finish_without_candidates():
+    sel = BestShotSelector(out_dir="unused")
+    assert sel.finish(Sighting(9, 0, "Owl", 0.0, 0.5, (0, 0, 1, 1))) is None
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+from cascade import SpeciesCascade, map_class_names  # noqa: E402
+
+ANIMAL_NAMES = ["Cockatoo", "Crocodile", "Frog", "Kangaroo", "Koala", "Owl", "Penguin",
+                "Platypus", "Snake", "Tasmanian Devil", "Wombat"]
+
+
+def test_classifier_classes_mapped_by_name():
+    classifier = {0: "koala", 1: "Wombat", 2: "tasmanian devil"}
+    assert map_class_names(classifier, ANIMAL_NAMES).tolist() == [4, 10, 9]
+
+
+def test_same_order_maps_to_itself():
+    assert map_class_names(ANIMAL_NAMES, ANIMAL_NAMES).tolist() == list(range(len(ANIMAL_NAMES)))
+
+
+def test_unknown_classifier_class_is_rejected():
+    with pytest.raises(ValueError, match="Dingo"):
+        map_class_names(["Koala", "Dingo"], ANIMAL_NAMES)
+
+
+def test_cascade_needs_classifier_weights():
+    with pytest.raises(ValueError):
+        SpeciesCascade(None)
+
+
+def test_votes_come_back_in_app_order():
+    casc = SpeciesCascade.__new__(SpeciesCascade)
+    casc.nc, casc.settle_votes, casc.settle_conf, casc.recheck_every = 3, 3, 0.85, 30
+    casc._tracks, casc._frame, casc.crops_classified, casc.crops_skipped = {}, 0, 0, 0
+    casc._to_target = map_class_names(["Wombat", "Koala", "Owl"], ANIMAL_NAMES)
+    casc._classify = lambda frame, boxes: np.tile([0.1, 0.8, 0.1], (len(boxes), 1)).astype(np.float32)
+    cls, conf = casc.classify(np.zeros((64, 64, 3), np.uint8), [[0, 0, 10, 10]], [1])
+    assert ANIMAL_NAMES[int(cls[0])] == "Koala"
@@ -0,0 +1,128 @@
+import json
+import os
+import time
+from fractions import Fraction
+
+import cv2
+import numpy as np
+import pytest
+
+from clip_buffer import ClipBuffer, to_jpegs
+from delta_compositor import DELTA_HDR, DELTA_MAGIC, RUN_HDR
+from frame_tags import tag_jpeg
+from video_decoders import H264_HDR, H264_MAGIC, h264_is_keyframe
+
+
+def jpeg(value, tags=None, size=(64, 128)):
+    img = np.full((size[0], size[1], 3), value, np.uint8)
+    data = cv2.imencode(".jpg", img)[1].tobytes()
+    return tag_jpeg(data, tags) if tags else data
+
+
+def delta(seq, prev, value, w=128, h=64, tile=64):
+    # One changed tile at row 0, col 1
+    strip = cv2.imencode(".jpg", np.full((tile, tile, 3), value, np.uint8))[1].tobytes()
+    run = RUN_HDR.pack(0, 1, 1, len(strip)) + strip
+    return DELTA_MAGIC + DELTA_HDR.pack(seq, prev, w, h, tile, 1, 0) + run
+
+
+def wait_written(clips, n, timeout=3.0):
+    t_end = time.monotonic() + timeout
+    while clips.clips_written < n and time.monotonic() < t_end:
+        time.sleep(0.02)
+    return clips.clips_written
+
+
+def test_jpeg_clip_is_written_byte_for_byte(tmp_path):
+    clips = ClipBuffer(clip_dir=str(tmp_path), pre_roll=1.0, post_roll=1.0)
+    frames = [(t * 0.5, jpeg(t * 20)) for t in range(10)]
+    for ts, data in frames[:5]:
+        clips.push(ts, data)
+    clips.trigger("Koala", 2.0)
+    for ts, data in frames[5:]:
+        clips.push(ts, data)
+    assert wait_written(clips, 1) == 1
+    base = [f for f in os.listdir(tmp_path) if f.endswith(".mjpeg")][0]
+    with open(tmp_path / base, "rb") as f:
+        written = f.read()
+    # pre-roll 1.0 s before t=2.0 through post-roll to t=3.0
+    assert written == b"".join(d for ts, d in frames if 1.0 <= ts <= 3.0)
+    with open(tmp_path / base.replace(".mjpeg", ".json")) as f:
+        assert json.load(f)["timestamps"] == [1.0, 1.5, 2.0, 2.5, 3.0]
+
+
+def test_extend_counts_post_roll_from_the_last_sighting(tmp_path):
+    clips = ClipBuffer(clip_dir=str(tmp_path), pre_roll=0.0, post_roll=1.0)
+    clip = clips.trigger("Koala", 0.0)
+    for k in range(1, 46):
+        ts = k / 10
+        clips.push(ts, jpeg(k))
+        if ts <= 3.0:
+            assert clips.extend("Koala", ts) is clip     # the animal is still in view
+    # Recorded through 1 s after the last sighting at 3.0 s, as one clip
+    assert wait_written(clips, 1) == 1
+    assert round(clip.frames[-1][0], 1) == 4.0
+    assert clips.extend("Koala", 5.0) is None and clips._pending == []
+
+
+def test_same_second_clips_get_their_own_safe_names(tmp_path):
+    clips = ClipBuffer(clip_dir=str(tmp_path), pre_roll=0.0, post_roll=0.1)
+    clips.trigger("Koala", 1000.2)
+    clips.push(1000.25, jpeg(10))
+    clips.flush()
+    assert wait_written(clips, 1) == 1
+    clips.trigger("Koala", 1000.6)
+    clips.push(1000.65, jpeg(20))
+    clips.flush()
+    assert wait_written(clips, 2) == 2
+    names = sorted(f for f in os.listdir(tmp_path) if f.endswith(".mjpeg"))
+    assert len(names) == 2
+    assert not any(c in n for n in names for c in ':<>"|?*')
+
+
+def test_ring_is_bounded():
+    clips = ClipBuffer(seconds=1.0, max_bytes=10**9)
+    for t in range(20):
+        clips.push(t * 0.25, jpeg(t))
+    assert len(clips._frames) == 5
+
+
+def test_jpeg_frames_pass_through_untouched():
+    frames = [(0.0, jpeg(10)), (0.1, jpeg(20))]
+    assert to_jpegs(frames) is frames
+
+
+def test_delta_clip_reaches_back_to_its_keyframe():
+    clips = ClipBuffer(pre_roll=0.15, post_roll=0.0)
+    clips.push(0.0, jpeg(50, {"dseq": 1}))
+    clips.push(0.1, delta(2, 1, 200))
+    clips.push(0.2, delta(3, 2, 100))
+    clip = clips.trigger("Owl", 0.3)
+    # The pre-roll alone (0.15 s onwards) would start at a delta nothing can be painted on
+    assert [ts for ts, _ in clip.frames] == [0.0, 0.1, 0.2]
+    out = to_jpegs(clip.frames)
+    assert len(out) == 3
+    last = cv2.imdecode(np.frombuffer(out[-1][1], np.uint8), cv2.IMREAD_COLOR)
+    assert abs(int(last[32, 96, 0]) - 100) < 8 and abs(int(last[32, 32, 0]) - 50) < 8
+
+
+def test_delta_without_keyframe_is_left_out():
+    assert to_jpegs([(0.0, delta(5, 4, 100))]) == []
+
+
+def test_h264_keyframe_detection():
+    av = pytest.importorskip("av")
+    ctx = av.CodecContext.create("libx264", "w")
+    ctx.width, ctx.height, ctx.pix_fmt = 128, 64, "yuv420p"
+    ctx.time_base = Fraction(1, 30)
+    ctx.gop_size = 10
+    ctx.options = {"preset": "ultrafast", "tune": "zerolatency"}
+    keys = []
+    for i in range(12):
+        vf = av.VideoFrame.from_ndarray(np.full((64, 128, 3), i * 10, np.uint8), format="bgr24")
+        vf.pts = i
+        for p in ctx.encode(vf):
+            payload = H264_MAGIC + H264_HDR.pack(0) + bytes(p)
+            keys.append((h264_is_keyframe(payload), p.is_keyframe))
+    assert keys and all(ours == theirs for ours, theirs in keys)
+    assert any(k for k, _ in keys) and not all(k for k, _ in keys)
@@ -0,0 +1,50 @@
+import numpy as np
+
+from detection_ring import DetectionRing
+
+
+def append(ring, ts, n=1, seq=0):
+    ring.append(ts, np.full(n, 3), np.full(n, 0.5), np.tile([0, 0, 10, 10], (n, 1)), seq)
+
+
+def test_latest_and_since_after_wrap():
+    ring = DetectionRing(8)
+    for i in range(20):
+        append(ring, float(i), seq=i)
+    assert len(ring) == 8
+    assert list(ring.latest(3)["seq"]) == [17, 18, 19]
+    assert list(ring.latest(100)["seq"]) == list(range(12, 20))
+    assert list(ring.since(15.5)["seq"]) == [16, 17, 18, 19]
+    assert list(ring.since(0.0)["seq"]) == list(range(12, 20))
+
+
+def test_reader_skips_slots_of_an_append_in_progress():
+    ring = DetectionRing(8)
+    for i in range(8):
+        append(ring, float(i), seq=i)
+    # The writer has claimed two slots (records 8 and 9 reuse the slots of 0 and 1)
+    # and scribbled over the first one, but has not published yet
+    ring._reserved[0] = ring.count + 2
+    ring.buf["seq"][0] = 999
+    assert list(ring.latest(8)["seq"]) == [2, 3, 4, 5, 6, 7]
+    assert list(ring.since(0.0)["seq"]) == [2, 3, 4, 5, 6, 7]
+
+
+def test_reader_retries_when_lapped_during_copy():
+    ring = DetectionRing(8)
+    for i in range(8):
+        append(ring, float(i), seq=i)
+    copy = ring._copy_range
+    calls = []
+
+    def lapped_copy(first, last):
+        out = copy(first, last)
+        if not calls:
+            append(ring, 8.0, n=3, seq=8)    # the writer overwrites the oldest slots mid-copy
+        calls.append((first, last))
+        return out
+
+    ring._copy_range = lapped_copy
+    out = ring.latest(8)
+    assert len(calls) == 2
+    assert list(out["seq"]) == [3, 4, 5, 6, 7, 8, 8, 8]
@@ -0,0 +1,44 @@
+import csv
+
+from detection_store import DetectionStore
+from sightings import Sighting
+
+
+def test_rows_round_trip_through_the_writer(tmp_path):
+    store = DetectionStore(str(tmp_path / "det.db"), flush_interval=0.05)
+    store.add_many(100.0, [("Deer", 0.9, (1, 2, 3, 4)), ("Fox", 0.6, None)], robot_id="r1")
+    store.add(200.0, "Deer", 0.7, (5, 6, 7, 8), robot_id="r2")
+    s = Sighting(1, 0, "Deer", 100.0, 0.5, (0, 0, 10, 10))
+    s._extend(103.0, 0.9, (1, 1, 11, 11))
+    store.add_sighting(s, robot_id="r1")
+    store.close()       # drains the queue before returning
+
+    assert store.dropped == 0
+    assert store.query(animal="Deer") == [(100.0, "Deer", 0.9, 1, 2, 3, 4, "r1"),
+                                          (200.0, "Deer", 0.7, 5, 6, 7, 8, "r2")]
+    assert [r[0] for r in store.query(start=150)] == [200.0]
+    assert [r[0] for r in store.query(end="150")] == [100.0, 100.0]
+    assert store.query(robot_id="r2", limit=5)[0][1] == "Deer"
+    assert store.counts_by_animal() == {"Deer": 2, "Fox": 1}
+    (row,) = store.query_sightings(animal="Deer")
+    assert row[:4] == (100.0, 103.0, "Deer", 2) and row[6:] == (1, 1, 11, 11, "r1")
+
+
+def test_export_csv(tmp_path):
+    store = DetectionStore(str(tmp_path / "det.db"), flush_interval=0.05)
+    store.add(100.0, "Deer", 0.91234, (1, 2, 3, 4))
+    store.close()
+    out = tmp_path / "out.csv"
+    assert store.export_csv(str(out)) == 1
+    header, row = list(csv.reader(open(out, newline="")))
+    assert header[:3] == ["timestamp", "animal", "confidence"]
+    assert row[1:7] == ["Deer", "0.912", "1", "2", "3", "4"]
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    store = DetectionStore(str(tmp_path / "det.db"), max_pending=1)
+    store._running = False
+    store._writer.join()        # no writer: the queue stays full
+    store.add(1.0, "Deer", 0.5)
+    store.add(2.0, "Deer", 0.5)
+    assert store.dropped == 1
@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from model_registry import ModelRegistry
+
+
+def wait_for(cond, timeout=3.0):
+    t_end = time.monotonic() + timeout
+    while not cond():
+        if time.monotonic() > t_end:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+class FakeModels:
+    # load_fn / infer_fn for the registry; remembers which backends ran on which thread
+    def __init__(self):
+        self.loads = []
+        self.calls = []
+
+    def load(self, path):
+        self.loads.append(path)
+        return (f"model:{path}:{len(self.loads)}", None)
+
+    def infer(self, backend, frame):
+        self.calls.append((backend, threading.current_thread().name))
+        return np.zeros((1, 4), np.float32), np.array([0.5], np.float32), np.array([0])
+
+
+def test_sanity_run_never_touches_the_live_model(tmp_path):
+    models = FakeModels()
+    live = ("live", None)
+    reg = ModelRegistry(str(tmp_path / "a.pt"), models.load, models.infer, initial=live,
+                        poll_interval=0.05, watch=False)
+    reg.record_ms(live, 10.0)
+    reg.request_reload()
+    assert wait_for(lambda: reg.swaps == 1)
+    assert all(backend is not live for backend, _ in models.calls)
+    assert reg.previous is live
+
+
+def test_slow_model_rejected_against_live_timing(tmp_path):
+    models = FakeModels()
+    live = ("live", None)
+
+    def slow(backend, frame):
+        time.sleep(0.02)
+        return models.infer(backend, frame)
+    reg = ModelRegistry(str(tmp_path / "a.pt"), models.load, slow, initial=live, poll_interval=0.05, watch=False)
+    reg.record_ms(live, 1.0)
+    reg.request_reload()
+    assert wait_for(lambda: reg.status == "rejected")
+    assert reg.current is live
+
+
+def test_swapped_file_is_not_reloaded_by_the_watcher(tmp_path):
+    watched, new = tmp_path / "best.pt", tmp_path / "new.pt"
+    watched.write_bytes(b"old")
+    models = FakeModels()
+    reg = ModelRegistry(str(watched), models.load, models.infer, initial=("live", None), poll_interval=0.05)
+    new.write_bytes(b"new weights")
+    reg.request_reload(str(new))
+    assert wait_for(lambda: reg.swaps == 1)
+    time.sleep(0.4)                 # several watcher polls
+    assert reg.swaps == 1
+    assert models.loads == [str(new)]
+    assert reg.rollback() and reg.current == ("live", None)
+
+
+def test_changed_file_is_loaded_once(tmp_path):
+    watched = tmp_path / "best.pt"
+    watched.write_bytes(b"old")
+    models = FakeModels()
+    reg = ModelRegistry(str(watched), models.load, models.infer, initial=("live", None), poll_interval=0.05)
+    watched.write_bytes(b"retrained weights")
+    os.utime(watched, (time.time() + 5, time.time() + 5))
+    assert wait_for(lambda: reg.swaps == 1)
+    time.sleep(0.4)
+    assert models.loads == [str(watched)]
@@ -0,0 +1,86 @@
+import socket
+import threading
+
+import pytest
+
+from mux_protocol import CHANNELS, MUX_HDR, MuxConnection, read_json_line
+
+
+@pytest.fixture
+def pair():
+    a, b = socket.socketpair()
+    left, right = MuxConnection(a).start(), MuxConnection(b).start()
+    yield left, right
+    left.close()
+    right.close()
+
+
+def recv_exact(chan, n):
+    buf = b""
+    while len(buf) < n:
+        more = chan.recv(n - len(buf))
+        assert more, "channel ended early"
+        buf += more
+    return buf
+
+
+def test_channels_carry_independent_streams(pair):
+    left, right = pair
+    frame = bytes(range(256)) * 1000          # several chunks
+    left.channel("video").sendall(frame)
+    left.channel("control").sendall(b"F500\n")
+    right.channel("telemetry").sendall(b'{"v": 1}\n')
+    assert recv_exact(right.channel("control"), 5) == b"F500\n"
+    assert recv_exact(right.channel("video"), len(frame)) == frame
+    assert recv_exact(left.channel("telemetry"), 9) == b'{"v": 1}\n'
+
+
+def test_fin_ends_only_that_channel(pair):
+    left, right = pair
+    left.channel("audio").sendall(b"pcm")
+    left.channel("audio").close()
+    chan = right.channel("audio")
+    assert recv_exact(chan, 3) == b"pcm"
+    assert chan.recv(10) == b""
+    left.channel("control").sendall(b"I000\n")
+    assert recv_exact(right.channel("control"), 5) == b"I000\n"
+    with pytest.raises(OSError):
+        left.channel("audio").sendall(b"more")
+
+
+def test_control_goes_ahead_of_queued_video():
+    a, b = socket.socketpair()
+    mux = MuxConnection(a, chunk=1024)         # writer not started: everything stays queued
+    mux.send(CHANNELS["video"], b"v" * 4096)
+    mux.send(CHANNELS["control"], b"PING\n")
+    order = []
+    with mux._cond:
+        while mux._order:
+            order.append(mux._next()[0])
+    assert order == [CHANNELS["control"]] + [CHANNELS["video"]] * 4
+    a.close()
+    b.close()
+
+
+def test_peer_close_ends_every_channel(pair):
+    left, right = pair
+    closed = threading.Event()
+    right.on_close = lambda mux: closed.set()
+    left.close()
+    assert closed.wait(2.0)
+    assert not right.alive
+    assert right.channel("control").recv(10) == b""
+    with pytest.raises(OSError):
+        right.send(CHANNELS["control"], b"x")
+
+
+def test_frame_header_and_hello_line():
+    a, b = socket.socketpair()
+    assert MUX_HDR.unpack(MUX_HDR.pack(3, 1, 70000)) == (3, 1, 70000)
+    a.sendall(b'{"session": "s1"}\nrest')
+    assert read_json_line(b) == {"session": "s1"}
+    assert b.recv(4) == b"rest"
+    a.close()
+    with pytest.raises(ConnectionError):
+        read_json_line(b)
+    b.close()
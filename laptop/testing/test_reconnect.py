@@ -0,0 +1,17 @@
+from reconnect import Backoff
+
+
+def test_delays_grow_jittered_and_capped():
+    b = Backoff(initial=0.2, maximum=2.0, factor=2.0)
+    for cap in (0.2, 0.4, 0.8, 1.6, 2.0, 2.0):
+        d = b.next()
+        assert cap / 2 <= d <= cap
+    assert b.failures == 6
+
+
+def test_reset_makes_the_next_retry_quick():
+    b = Backoff(initial=0.2, maximum=2.0)
+    for _ in range(10):
+        b.next()
+    b.reset()
+    assert b.failures == 0 and b.next() <= 0.2
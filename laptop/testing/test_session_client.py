@@ -0,0 +1,83 @@
+import json
+import socket
+import threading
+
+import pytest
+
+from mux_protocol import MuxConnection, read_json_line
+from session_client import SessionClient
+
+
+@pytest.fixture
+def pi_session():
+    # Stand-in for the Pi's SessionServer: control channel only, answering PING with PONG
+    lsock = socket.socket()
+    lsock.bind(("127.0.0.1", 0))
+    lsock.listen(4)
+
+    def control(chan):
+        while True:
+            data = chan.recv(1024)
+            if not data:
+                return
+            if data.startswith(b"PING"):
+                chan.sendall(b"PONG\n")
+
+    def accept_loop():
+        while True:
+            try:
+                conn, _ = lsock.accept()
+            except OSError:
+                return
+            read_json_line(conn)
+            conn.sendall((json.dumps({"session": "s1", "channels": ["control"], "resumed": False}) + "\n").encode())
+            mux = MuxConnection(conn).start()
+            threading.Thread(target=control, args=(mux.channel("control"),), daemon=True).start()
+
+    threading.Thread(target=accept_loop, daemon=True).start()
+    yield lsock.getsockname()[1]
+    lsock.close()
+
+
+def ping(chan):
+    chan.settimeout(2.0)
+    chan.sendall(b"PING\n")
+    return chan.recv(1024)
+
+
+def test_control_channel(pi_session):
+    client = SessionClient("127.0.0.1", pi_session, channels=("control",))
+    assert ping(client.connect().channel("control")) == b"PONG\n"
+    client.close()
+
+
+def test_closed_channel_is_not_handed_out_again(pi_session):
+    client = SessionClient("127.0.0.1", pi_session, channels=("control",))
+    old = client.connect().channel("control")
+    old.close()
+    with pytest.raises(ConnectionError):
+        client.connect().channel("control")
+
+    # What the GUI does after a lost control link: drop the session, connect again
+    client.close()
+    new = client.connect().channel("control")
+    assert new is not old
+    assert ping(new) == b"PONG\n"
+    client.close()
+
+
+def test_stale_channel_does_not_close_a_reopened_session(pi_session):
+    client = SessionClient("127.0.0.1", pi_session, channels=("control",))
+    first = client.connect().channel("control")
+    first_mux = first.mux
+
+    # One side's channel drops and it closes its own mux, then reconnects
+    assert client.close_if(first_mux)
+    new = client.connect().channel("control")
+    assert new.mux is not first_mux
+
+    # The other side's channel, from the old mux, drops afterwards: the new session survives
+    assert not client.close_if(first_mux)
+    assert client.alive
+    assert ping(new) == b"PONG\n"
+    client.close()
@@ -0,0 +1,56 @@
+import numpy as np
+
+from sightings import SightingTracker, iou_matrix
+
+NAMES = {0: "Deer", 1: "Fox"}
+
+
+def test_iou_matrix():
+    iou = iou_matrix([[0, 0, 10, 10]], [[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]])
+    assert np.allclose(iou, [[1.0, 1 / 3, 0.0]])
+    assert iou_matrix(np.zeros((0, 4)), [[0, 0, 1, 1]]).shape == (0, 1)
+
+
+def test_track_extends_and_closes_after_gap():
+    tr = SightingTracker(NAMES.get, max_gap=1.0)
+    ids, confirmed, ended = tr.update(0.0, [[0, 0, 10, 10]], [0.5], [0])
+    assert not confirmed and not ended
+    ids2, confirmed, _ = tr.update(0.1, [[1, 0, 11, 10]], [0.8], [0])
+    assert ids2[0] == ids[0]
+    assert len(confirmed) == 1 and confirmed[0].animal == "Deer"
+    _, confirmed, _ = tr.update(0.2, [[1, 0, 11, 10]], [0.7], [0])
+    assert not confirmed            # reported once, when the track reaches min_frames
+    assert tr.current().peak_conf == np.float32(0.8)
+    _, _, ended = tr.update(1.1, [], [], [])
+    assert not ended                # last seen at 0.2
+    _, _, ended = tr.update(1.5, [], [], [])
+    (s,) = ended
+    assert s.frames == 3 and abs(s.duration - 0.2) < 1e-9 and s.best_bbox == (1, 0, 11, 10)
+    assert tr.current() is None
+
+
+def test_classes_do_not_match_unless_agnostic():
+    tr = SightingTracker(NAMES.get)
+    tr.update(0.0, [[0, 0, 10, 10]], [0.5], [0])
+    tr.update(0.1, [[0, 0, 10, 10]], [0.5], [1])
+    assert len(tr.active) == 2
+
+    tr = SightingTracker(NAMES.get, class_agnostic=True)
+    tr.update(0.0, [[0, 0, 10, 10]], [0.5], [0])
+    _, confirmed, _ = tr.update(0.1, [[0, 0, 10, 10]], [0.5], [1])
+    assert len(confirmed) == 1 and len(tr.active) == 1
+
+
+def test_single_frame_flicker_is_dropped():
+    tr = SightingTracker(NAMES.get, max_gap=0.5, min_frames=2)
+    tr.update(0.0, [[0, 0, 10, 10]], [0.9], [0])
+    _, _, ended = tr.update(1.0, [], [], [])
+    assert ended == [] and not tr.active
+
+
+def test_set_class_and_flush():
+    tr = SightingTracker(NAMES.get, min_frames=1)
+    ids, _, _ = tr.update(0.0, [[0, 0, 10, 10]], [0.9], [0])
+    tr.set_class(int(ids[0]), 1)
+    (s,) = tr.flush()
+    assert s.animal == "Fox" and s.cls_id == 1 and not tr.active
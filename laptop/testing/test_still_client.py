@@ -0,0 +1,15 @@
+import os
+
+from still_client import StillClient
+
+
+def test_same_second_stills_do_not_overwrite(tmp_path):
+    client = StillClient("127.0.0.1", out_dir=str(tmp_path))
+    client.send = lambda msg: None
+    ids = [client.request("Deer"), client.request("Deer")]
+    for req_id, payload in zip(ids, (b"first", b"second")):
+        client._save({"ids": [req_id], "ts": 1700000000.2, "w": 4, "h": 3}, payload)
+    jpgs = sorted(p for p in os.listdir(tmp_path) if p.endswith(".jpg"))
+    assert len(jpgs) == 2
+    assert all(p.startswith("Deer_") and "_full" in p for p in jpgs)
+    assert {open(tmp_path / p, "rb").read() for p in jpgs} == {b"first", b"second"}
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+from tiled_inference import TiledDetector, tile_grid  # noqa: E402
+
+
+def test_grid_covers_the_frame():
+    grid = tile_grid(540, 960, 416, 0.2)
+    assert len(grid) == 6
+    assert grid[:, 0].min() == 0 and grid[:, 2].max() == 960
+    assert grid[:, 1].min() == 0 and grid[:, 3].max() == 540
+
+
+def test_motion_everywhere_never_runs_the_whole_grid():
+    tiler = TiledDetector(tile=416, max_tiles=6, min_blob=1)
+    rng = np.random.default_rng(0)
+    tiler.select_tiles(np.zeros((540, 960, 3), np.uint8))       # background
+    tiles = tiler.select_tiles(rng.integers(0, 255, (540, 960, 3), dtype=np.uint8))
+    assert 0 < len(tiles) < len(tile_grid(540, 960, 416, 0.2))
+
+
+def test_tiles_follow_the_motion():
+    tiler = TiledDetector(tile=416, max_tiles=4, min_blob=1)
+    frame = np.zeros((540, 960, 3), np.uint8)
+    tiler.select_tiles(frame)
+    moved = frame.copy()
+    moved[20:80, 860:940] = 255         # top-right corner only
+    tiles = tiler.select_tiles(moved)
+    assert len(tiles) >= 1
+    assert all(x2 >= 860 and y1 <= 20 for x1, y1, x2, y2 in tiles.tolist())
+
+
+def test_static_frame_runs_no_tiles():
+    tiler = TiledDetector()
+    frame = np.zeros((540, 960, 3), np.uint8)
+    tiler.select_tiles(frame)
+    assert len(tiler.select_tiles(frame)) == 0
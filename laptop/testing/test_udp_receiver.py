@@ -0,0 +1,80 @@
+import time
+
+import pytest
+
+from udp_receiver import FRAG_HDR, PARITY, Reassembler, UdpFrameReceiver
+
+
+def fragments(fid, data, ts=0.0, payload=100):
+    count = max(1, -(-len(data) // payload))
+    return [FRAG_HDR.pack(fid, i, count, ts) + data[i * payload:(i + 1) * payload] for i in range(count)]
+
+
+def feed(reasm, fid, data):
+    out = None
+    for pkt in fragments(fid, data):
+        out = reasm.push(pkt) or out
+    return out
+
+
+def test_frame_delivered_when_complete():
+    reasm = Reassembler()
+    data = bytes(range(256)) * 2
+    frame, _ts = feed(reasm, 1, data)
+    assert frame == data
+    assert reasm.delivered == 1
+
+
+def test_late_frame_dropped():
+    reasm = Reassembler()
+    feed(reasm, 10, b"a" * 300)
+    assert feed(reasm, 9, b"b" * 300) is None
+    assert reasm.late == 3
+    assert reasm.last_id == 10
+
+
+def test_parity_after_complete_frame_is_not_late():
+    reasm = Reassembler()
+    feed(reasm, 1, b"a" * 300)
+    reasm.push(FRAG_HDR.pack(1, PARITY | 8, 3, 0.0) + bytes(100))
+    assert reasm.late == 0
+
+
+def test_sender_restart_after_long_run():
+    # A restarted Pi numbers from 1 again: a big jump back resets at once
+    reasm = Reassembler()
+    for fid in range(1, 300):
+        feed(reasm, fid, b"x" * 250)
+    delivered = reasm.delivered
+    for fid in range(1, 20):
+        assert feed(reasm, fid, b"y" * 250) is not None
+    assert reasm.delivered == delivered + 19
+    assert reasm.restarts == 1
+
+
+def test_sender_restart_after_short_run():
+    # Only a few frames back (within max_back): a run of late fragments resets instead
+    reasm = Reassembler(max_late_run=6)
+    for fid in range(1, 6):
+        feed(reasm, fid, b"x" * 250)
+    results = [feed(reasm, fid, b"y" * 250) for fid in range(1, 10)]
+    assert reasm.restarts == 1
+    assert all(r is not None for r in results[2:])
+
+
+def test_wraparound_is_not_a_restart():
+    reasm = Reassembler()
+    feed(reasm, 0xFFFFFFFF, b"x" * 250)
+    assert feed(reasm, 0, b"y" * 250) is not None
+    assert reasm.restarts == 0
+
+
+def test_receiver_ends_after_stall_timeout():
+    rx = UdpFrameReceiver("127.0.0.1", 9)        # nothing answers here
+    t0 = time.monotonic()
+    try:
+        with pytest.raises(ConnectionError):
+            next(rx.frames(stall_timeout=0.3))
+    finally:
+        rx.close()
+    assert time.monotonic() - t0 < 2.0
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("ultralytics")
+
+from video_client import VideoClient  # noqa: E402
+
+NAMES = ["Deer", "Fox"]
+
+
+class FakeFast:
+    # FastDetector stand-in: one box per input, in input coordinates
+    def __init__(self, max_batch=8):
+        self.max_batch = max_batch
+        self.batches = []
+
+    def _one(self, frame):
+        h, w = frame.shape[:2]
+        return (np.array([[0, 0, w // 2, h // 2]], np.float32), np.array([0.9], np.float32),
+                np.array([0], np.int64))
+
+    def __call__(self, frame):
+        return self._one(frame)
+
+    def infer_batch(self, frames):
+        self.batches.append(len(frames))
+        return [self._one(f) for f in frames]
+
+
+def make_client(**kwargs):
+    # No weights on disk: the client comes up without a model, which is all these tests need
+    return VideoClient("127.0.0.1", 8000, NAMES, best_shot=False, **kwargs)
+
+
+def test_sanity_run_leaves_the_live_tiler_alone():
+    client = make_client(tiled=True, imgsz=256)
+    assert client.registry.infer_fn == client._sanity_run
+    frame = np.random.default_rng(0).integers(0, 255, (540, 960, 3), dtype=np.uint8)
+    for _ in range(3):
+        client._sanity_run((None, FakeFast()), frame)
+    live = client.tiler
+    assert live.frames == 0 and live._bg is None and len(live._prev) == 0
+    assert client._sanity_tiler.frames == 3
+
+
+class FakeStills:
+    def __init__(self):
+        self.requests = []
+
+    def request(self, animal, confidence=None, bbox=None, reason="operator"):
+        self.requests.append((animal, reason))
+
+
+class FakeClips:
+    def __init__(self):
+        self.triggers = []
+
+        self.extends = []
+
+    def trigger(self, label, ts):
+        self.triggers.append((label, ts))
+
+    def extend(self, label, ts):
+        self.extends.append((label, ts))
+
+
+def feed(client, t, boxes):
+    frame = np.zeros((270, 480, 3), np.uint8)
+    n = len(boxes)
+    client._update_sightings(t, frame, np.array(boxes, dtype=int).reshape(-1, 4),
+                             np.full(n, 0.9, np.float32), np.zeros(n, np.int64))
+
+
+def test_flicker_sends_no_still_and_records_no_clip():
+    stills, clips = FakeStills(), FakeClips()
+    client = make_client(still_client=stills, clip_buffer=clips, sighting_gap=0.5)
+    feed(client, 0.0, [[10, 10, 50, 50]])       # one frame, then gone
+    feed(client, 1.0, [])
+    assert stills.requests == [] and clips.triggers == []
+
+    feed(client, 2.0, [[10, 10, 50, 50]])
+    assert stills.requests == [] and clips.triggers == []
+    feed(client, 2.1, [[12, 10, 52, 50]])       # second frame confirms the track
+    assert stills.requests == [("Deer", "sighting")]
+    assert clips.triggers == [("Deer", 2.1)]
+    feed(client, 2.2, [[14, 10, 54, 50]])
+    assert len(stills.requests) == 1 and len(clips.triggers) == 1
+    # Every later frame of the track pushes the clip's post-roll out
+    assert clips.extends == [("Deer", 2.2)]
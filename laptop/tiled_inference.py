@@ -0,0 +1,128 @@
+import cv2
+import numpy as np
+
+from fast_infer import batched_nms
+
+
+def tile_grid(h, w, tile, overlap):
+    # All tile boxes (x1, y1, x2, y2) covering an h x w frame with the given overlap
+    step = max(1, int(tile * (1.0 - overlap)))
+    xs = list(range(0, max(1, w - tile) + 1, step))
+    ys = list(range(0, max(1, h - tile) + 1, step))
+    if xs[-1] + tile < w:
+        xs.append(w - tile)
+    if ys[-1] + tile < h:
+        ys.append(h - tile)
+    gx, gy = np.meshgrid(np.maximum(xs, 0), np.maximum(ys, 0))
+    x1, y1 = gx.ravel(), gy.ravel()
+    return np.stack((x1, y1, np.minimum(x1 + tile, w), np.minimum(y1 + tile, h)), axis=1)
+
+
+class TiledDetector:
+    """
+    High-resolution inference on overlapping tiles, restricted to regions of interest.
+
+    ROIs are motion blobs (difference against a running background on a small
+    grey frame) plus the previous frame's detections. Only tiles touching an ROI
+    are cropped at native resolution; together with one letterboxed full-frame
+    view they go through the detector as a single batch, and the merged boxes are
+    de-duplicated with class-aware NMS across tiles. At most `max_tiles` tiles
+    run, and never the whole grid (one less than it): a frame where everything
+    moves is covered by the full-frame view, not by every tile at once.
+    """
+
+    def __init__(self, tile=416, overlap=0.2, max_tiles=4, motion_scale=0.125, motion_thresh=18,
+                 min_blob=4, roi_pad=0.5, iou=0.5, include_full=True):
+        self.tile = int(tile)
+        self.overlap = float(overlap)
+        self.max_tiles = int(max_tiles)
+        self.motion_scale = float(motion_scale)
+        self.motion_thresh = int(motion_thresh)
+        self.min_blob = int(min_blob)          # px area on the small motion frame
+        self.roi_pad = float(roi_pad)
+        self.iou = float(iou)
+        self.include_full = bool(include_full)
+
+        self._bg = None
+        self._grid = None
+        self._grid_shape = None
+        self._limit = self.max_tiles
+        self._prev = np.zeros((0, 4), np.float32)
+        self.frames = 0
+        self.tiles_run = 0
+
+    @property
+    def max_batch(self):
+        return self.max_tiles + (1 if self.include_full else 0)
+
+    def _motion_rois(self, frame):
+        small = cv2.resize(frame, None, fx=self.motion_scale, fy=self.motion_scale, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.float32)
+        if self._bg is None or self._bg.shape != gray.shape:
+            self._bg = gray
+            return np.zeros((0, 4), np.float32)
+        diff = cv2.absdiff(gray, self._bg)
+        cv2.accumulateWeighted(gray, self._bg, 0.1)
+        mask = (diff > self.motion_thresh).astype(np.uint8)
+        mask = cv2.dilate(mask, np.ones((3, 3), np.uint8))
+        n, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        stats = stats[1:]
+        stats = stats[stats[:, cv2.CC_STAT_AREA] >= self.min_blob]
+        if len(stats) == 0:
+            return np.zeros((0, 4), np.float32)
+        x, y = stats[:, cv2.CC_STAT_LEFT], stats[:, cv2.CC_STAT_TOP]
+        w, h = stats[:, cv2.CC_STAT_WIDTH], stats[:, cv2.CC_STAT_HEIGHT]
+        return np.stack((x, y, x + w, y + h), axis=1).astype(np.float32) / self.motion_scale
+
+    def select_tiles(self, frame):
+        h, w = frame.shape[:2]
+        if self._grid_shape != (h, w):
+            self._grid = tile_grid(h, w, self.tile, self.overlap)
+            self._grid_shape = (h, w)
+            self._limit = min(self.max_tiles, max(1, len(self._grid) - 1))
+            if self._limit < self.max_tiles:
+                print(f"[TILES] {w}x{h} has a {len(self._grid)}-tile grid at tile {self.tile}: "
+                      f"at most {self._limit} tiles per frame")
+        rois = self._motion_rois(frame)
+        if len(self._prev):
+            p = self._prev
+            pad = (p[:, 2:] - p[:, :2]) * self.roi_pad
+            rois = np.concatenate((rois, np.hstack((p[:, :2] - pad, p[:, 2:] + pad))))
+        if len(rois) == 0:
+            return self._grid[:0]
+        g = self._grid[:, None, :]
+        r = rois[None, :, :]
+        hit = (g[..., 0] < r[..., 2]) & (g[..., 2] > r[..., 0]) & (g[..., 1] < r[..., 3]) & (g[..., 3] > r[..., 1])
+        # Rank tiles by how many ROIs they touch; keep the busiest max_tiles
+        counts = hit.sum(axis=1)
+        idx = np.flatnonzero(counts)
+        idx = idx[np.argsort(-counts[idx], kind="stable")][:self._limit]
+        return self._grid[idx]
+
+    def __call__(self, detector, frame):
+        # detector: FastDetector with max_batch >= self.max_batch
+        tiles = self.select_tiles(frame)
+        crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles.tolist()]
+        if self.include_full or not crops:
+            crops.append(frame)
+            offsets = np.vstack((tiles[:, :2], [[0, 0]])) if len(tiles) else np.zeros((1, 2))
+        else:
+            offsets = tiles[:, :2]
+        results = detector.infer_batch(crops)
+        self.frames += 1
+        self.tiles_run += len(tiles)
+
+        boxes, scores, cls = [], [], []
+        for (ox, oy), (b, s, c) in zip(offsets.tolist(), results):
+            if len(b):
+                boxes.append(b + np.array([ox, oy, ox, oy], dtype=np.float32))
+                scores.append(s)
+                cls.append(c)
+        if not boxes:
+            self._prev = np.zeros((0, 4), np.float32)
+            return np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64)
+        boxes, scores, cls = np.concatenate(boxes), np.concatenate(scores), np.concatenate(cls)
+        keep = batched_nms(boxes, scores, cls, self.iou)
+        boxes, scores, cls = boxes[keep], scores[keep], cls[keep]
+        self._prev = boxes
+        return boxes, scores, cls
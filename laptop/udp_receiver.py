@@ -0,0 +1,181 @@
+import json
+import socket
+import struct
+import time
+
+import numpy as np
+
+# Must match pi/udp_sender.py
+FRAG_HDR = struct.Struct(">IHHd")
+HELLO = b"HELLO"
+PARITY = 0x8000
+
+
+class Reassembler:
+    """
+    Rebuilds fragmented frames and never waits for a missing piece.
+
+    A frame is delivered as soon as all its fragments are in. Anything older
+    than the newest delivered frame is late and discarded, and an incomplete
+    frame is abandoned once a newer frame completes or it is `max_age`
+    seconds old. A group with a single missing fragment is rebuilt from its
+    XOR parity datagram. Counters feed the loss report sent back to the Pi.
+
+    A restarted Pi numbers its frames from 1 again, which would look late
+    for ever. A jump back by more than `max_back` frames, or `max_late_run`
+    late fragments in a row, starts the numbering over instead.
+    """
+
+    def __init__(self, max_age=0.25, max_pending=8, max_back=64, max_late_run=30):
+        self.max_age = float(max_age)
+        self.max_pending = int(max_pending)
+        self.max_back = int(max_back)
+        self.max_late_run = int(max_late_run)
+        self._frames = {}           # frame_id -> [count, parts, n_received, first_seen, send_ts]
+        self.last_id = None
+        self.delivered = 0
+        self.lost = 0               # incomplete frames given up on
+        self.late = 0               # fragments of frames older than the last delivered one
+        self.recovered = 0          # frames completed with the help of parity
+        self.restarts = 0           # sender restarts detected (frame ids started over)
+        self._late_run = 0
+
+    def _newer(self, a, b):
+        # frame ids are u32 and wrap
+        return ((a - b) & 0xFFFFFFFF) < 0x80000000 and a != b
+
+    def _expire(self, now):
+        for fid in [f for f, e in self._frames.items() if now - e[3] > self.max_age]:
+            del self._frames[fid]
+            self.lost += 1
+
+    def push(self, packet, now=None):
+        # Returns (frame_bytes, send_ts) when a frame completes, else None
+        if len(packet) < FRAG_HDR.size:
+            return None
+        now = time.monotonic() if now is None else now
+        fid, idx, count, ts = FRAG_HDR.unpack_from(packet)
+        if self.last_id is not None and not self._newer(fid, self.last_id):
+            if idx & PARITY:            # parity trailing a frame that completed without it is expected
+                return None
+            self.late += 1
+            self._late_run += 1
+            if ((self.last_id - fid) & 0xFFFFFFFF) <= self.max_back and self._late_run < self.max_late_run:
+                return None
+            # The sender started over: forget the old numbering and take this frame as new
+            self._frames.clear()
+            self.last_id = None
+            self.restarts += 1
+        self._late_run = 0
+        entry = self._frames.get(fid)
+        if entry is None:
+            if len(self._frames) >= self.max_pending:
+                self._expire(now)
+                if len(self._frames) >= self.max_pending:
+                    oldest = min(self._frames, key=lambda f: self._frames[f][3])
+                    del self._frames[oldest]
+                    self.lost += 1
+            # [count, parts, n_received, first_seen, send_ts, parity {group: (size, bytes)}]
+            entry = self._frames[fid] = [count, [None] * count, 0, now, ts, {}]
+        parts, parity = entry[1], entry[5]
+        if idx & PARITY:
+            parity[(idx >> 4) & 0x7FF] = (idx & 0xF, packet[FRAG_HDR.size:])
+        elif idx < count and parts[idx] is None:
+            parts[idx] = packet[FRAG_HDR.size:]
+            entry[2] += 1
+        else:
+            return None
+        if entry[2] < count:
+            if not parity or entry[2] + len(parity) < count or not self._repair(parts, parity):
+                return None
+            self.recovered += 1
+
+        del self._frames[fid]
+        # Everything older than this frame can never be shown now
+        for old in [f for f in self._frames if not self._newer(f, fid)]:
+            del self._frames[old]
+            self.lost += 1
+        self.last_id = fid
+        self.delivered += 1
+        self._expire(now)
+        return b"".join(parts), ts
+
+    @staticmethod
+    def _repair(parts, parity):
+        # Every group must miss at most one fragment and have its parity; fills `parts` in place
+        fixes = []
+        size = next(iter(parity.values()))[0]
+        for start in range(0, len(parts), size):
+            missing = [i for i in range(start, min(start + size, len(parts))) if parts[i] is None]
+            if not missing:
+                continue
+            g = start // size
+            if len(missing) > 1 or g not in parity:
+                return False
+            fixes.append((missing[0], g))
+        for i, g in fixes:
+            acc = np.frombuffer(parity[g][1], np.uint8).copy()
+            n = len(acc)
+            for j in range(g * size, min(g * size + size, len(parts))):
+                if j != i:
+                    frag = np.frombuffer(parts[j], np.uint8)
+                    acc[:len(frag)] ^= frag
+            # A rebuilt last fragment keeps its zero padding; JPEG decoders stop at EOI
+            parts[i] = acc[:n].tobytes()
+        return True
+
+    def stats(self):
+        total = self.delivered + self.lost
+        return {"recv": self.delivered, "lost": self.lost, "late": self.late, "fec": self.recovered,
+                "restarts": self.restarts, "loss": round(self.lost / total, 4) if total else 0.0}
+
+
+class UdpFrameReceiver:
+    """Subscribes to the Pi's UDP video and yields complete frames; reports loss once a second."""
+
+    def __init__(self, server_ip, server_port, feedback_interval=1.0, max_age=0.25):
+        self.addr = (server_ip, server_port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 2 * 1024 * 1024)
+        self.sock.settimeout(0.5)
+        self.sock.connect(self.addr)
+        self.reasm = Reassembler(max_age=max_age)
+        self.feedback_interval = float(feedback_interval)
+        self._last_fb = 0.0
+        self.sock.send(HELLO)
+
+    def _feedback(self, now):
+        self._last_fb = now
+        try:
+            self.sock.send(json.dumps(self.reasm.stats()).encode())
+        except OSError:
+            pass
+
+    def frames(self, running=lambda: True, stall_timeout=None):
+        # Generator of (frame_bytes, send_ts); feedback doubles as the keep-alive. With stall_timeout,
+        # raises ConnectionError once that long has passed without a complete frame
+        last_frame = time.monotonic()
+        while running():
+            now = time.monotonic()
+            if stall_timeout is not None and now - last_frame > stall_timeout:
+                raise ConnectionError(f"no complete UDP frame for {stall_timeout:g} s")
+            if now - self._last_fb >= self.feedback_interval:
+                self._feedback(now)
+            try:
+                pkt = self.sock.recv(2048)
+            except socket.timeout:
+                continue
+            except ConnectionRefusedError:
+                # ICMP port unreachable: server not up (yet); keep saying hello
+                time.sleep(0.2)
+                continue
+            out = self.reasm.push(pkt)
+            if out is not None:
+                last_frame = time.monotonic()
+                yield out
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
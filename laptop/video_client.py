@@ -1,17 +1,57 @@
+import json
 import socket
 import time
 import struct
 import numpy as np
 import cv2
 import threading
-import queue
 from datetime import datetime
 import torch
 import os
 from ultralytics import YOLO
 from collections import deque
+from sightings import SightingTracker
+from best_shot import BestShotSelector
+from detection_ring import DetectionRing
+from fast_infer import FastDetector
+from cascade import SpeciesCascade
+from model_registry import ModelRegistry
+from tiled_inference import TiledDetector
+from frame_tags import read_tags
+from udp_receiver import UdpFrameReceiver
+from delta_compositor import DeltaCompositor, is_delta
+from video_decoders import H264Decoder, is_h264
+from reconnect import Backoff
+import autotune as autotuner
 
 MODEL_PATH = "laptop/best.pt"
+STREAM_SIZE = (960, 540)    # the Pi's default stream resolution
+
+# DCT-domain scaled JPEG decode: libjpeg skips the IDCT work for the dropped resolution
+DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+class LazyFrame:
+    """Received JPEG whose full-resolution decode only happens if someone asks for it."""
+
+    __slots__ = ("data", "small", "scale", "_full")
+
+    def __init__(self, data, small, scale):
+        self.data = data
+        self.small = small          # decoded at 1/scale for inference
+        self.scale = scale
+        self._full = small if scale == 1 else None
+
+    def get(self):
+        if self._full is None:
+            self._full = cv2.imdecode(np.frombuffer(self.data, np.uint8), cv2.IMREAD_COLOR)
+        return self._full
+
 
 class VideoClient(threading.Thread):
     def __init__(
@@ -21,11 +61,36 @@ class VideoClient(threading.Thread):
         animal_names,
         conf_threshold=0.80,
         iou_threshold=0.45,
-        imgsz=640,
+        imgsz=416,
         draw_threshold=None,         # threshold for drawing/Publishing
         annotate=True,               # turn off to save a few ms per frame
         label_name="video_stream",   # goes into d_names
-        publish_keep=200,            # ring-buffer size for GUI variables
+        publish_keep=4096,           # ring-buffer size for GUI variables
+        store=None,                  # optional DetectionStore for persistent logging
+        robot_id=None,               # recorded with each stored detection
+        log_frames=False,            # also store every per-frame detection, not just sightings
+        sighting_gap=2.0,            # seconds unseen before a sighting is closed
+        best_shot=True,              # auto-save the best frame of every sighting
+        clip_buffer=None,            # optional ClipBuffer: pre/post-roll clips per sighting
+        detection_ring=None,         # optional externally owned DetectionRing (e.g. shared memory)
+        decode_scale=2,              # decode at 1/2, 1/4 or 1/8 for inference; 1 = full resolution
+        fast_path=True,              # preallocated direct-tensor inference instead of model.predict()
+        threads=None,                # torch intra-op threads for CPU inference (None = torch default)
+        device=None,                 # "cpu" / "cuda" / "mps"; None = first available of mps, cuda, cpu
+        half=False,                  # fp16 on cuda/mps (fast path only)
+        autotune=False,              # benchmark settings once per machine and reuse the cached choice
+        target_fps=15.0,             # what autotune has to sustain
+        cascade_detector=None,       # weights of a generic "animal" detector; enables the cascade
+        cascade_classifier=None,     # species classifier weights (classes matched to animal_names by name)
+        tiled=False,                 # full-res tiles around motion / previous detections (small, distant animals)
+        max_tiles=4,                 # tiles per frame in tiled mode (fewer than the grid), batched with one full-frame view
+        still_client=None,           # optional StillClient: full-resolution still once a sighting is confirmed
+        transport="tcp",             # "udp": fragmented datagrams, late/incomplete frames dropped (Pi --udp)
+        codec=None,                  # ask the Pi for "mjpeg" / "delta" / "h264" (TCP); None = the Pi's default
+        acks=True,                   # per-frame acks for the Pi's rate controller (TCP, if the Pi runs one)
+        session=None,                # optional SessionClient: video over its "video" channel instead of port 8000
+        reconnect=True,              # keep reconnecting (jittered backoff) when the link drops; False = exit run()
+        stall_timeout=10.0,          # TCP: no bytes for this long counts as a dropped link
     ):
         super().__init__(daemon=True)
         self.server_ip = server_ip
@@ -37,55 +102,145 @@ class VideoClient(threading.Thread):
         self.annotate = bool(annotate)
         self.label_name = str(label_name)
         self.draw_threshold = self.conf_threshold if draw_threshold is None else float(draw_threshold)
+        self.store = store
+        self.robot_id = str(robot_id) if robot_id is not None else str(server_ip)
+        self.log_frames = bool(log_frames)
+        if decode_scale not in DECODE_FLAGS:
+            raise ValueError(f"decode_scale must be one of {sorted(DECODE_FLAGS)}")
+        if cascade_detector is not None and not cascade_classifier:
+            raise ValueError("cascade_detector needs cascade_classifier (species classifier weights)")
+        self.decode_scale = int(decode_scale)
+        # Tiling exists to use the native pixels, so it always decodes at full resolution.
+        # The tiler itself is built once autotune has settled imgsz (the tile size)
+        self.tiler = None
+        self._sanity_tiler = None
+        if tiled:
+            self.decode_scale = 1
 
+        self.transport = transport
+        self.session = session
+        self.codec = codec
+        self.stream_info = {}        # the Pi's stream header ({"codec", "w", "h", ...}); {} for older servers
+        self.acks = bool(acks)
+        self._send_acks = False      # only once the header says the Pi reads them
+        self._proc_ms = None         # EWMA of decode + inference time per frame, reported in acks
         self.sock = None
+        self.udp = None
         self.running = True
-        self.frame_queue = queue.Queue(maxsize=10)
+
+        # ---- link state (read by the GUI) ----
+        # "disconnected" -> "connected" <-> "reconnecting", "stopped" once run() returns.
+        # The thread, model and pipeline state all survive a reconnect; only the stream is reopened.
+        self.reconnect = bool(reconnect)
+        self.stall_timeout = float(stall_timeout)
+        self.link_state = "disconnected"
+        self.reconnects = 0
+        self.recovery_ms = deque(maxlen=100)   # per reconnect: link back up -> first frame handed to the GUI
+        self._backoff = Backoff()
+        self._wake = threading.Event()         # cuts a backoff wait short on stop()
+        self._connected_at = None              # monotonic time of the last connect, until its first frame
+        # Latest (LazyFrame, dets, fps); rendered at full resolution only when get_frame() is called
+        self._latest = None
+        self._frame_ready = threading.Event()
+        # Metadata the Pi attached to the newest frame (presence score etc.); {} for untagged streams
+        self.frame_tags = {}
+        self.compositor = DeltaCompositor()
+        self.h264 = None             # H264Decoder, created on the first H.264 payload
 
         self._last_t = None
         self._fps = 0.0
         self._ema_alpha = 0.90
 
         # ---- PUBLIC: in-memory detections for GUI (thread-safe) ----
-        # Read these four from the GUI. No CSV middle-man anymore.
-        self.v_lock    = threading.Lock()
-        self.v_times   = deque(maxlen=publish_keep)  # e.g., "2025-10-08T20:51:03"
-        self.v_animals = deque(maxlen=publish_keep)  # class names
-        self.v_scores  = deque(maxlen=publish_keep)  # confidences (float)
-        self.v_names   = self.label_name             # template/label string
-
-        # Device selection
-        if torch.backends.mps.is_available():
-            device = torch.device("mps")
-        elif torch.cuda.is_available():
-            device = torch.device("cuda")
-        else:
-            device = torch.device("cpu")
-        self.device = device
-
-        # Load model
-        self.model = YOLO(MODEL_PATH)
-        self.model.model.float()
-        self.model.fuse()
-        self.model.to(self.device)
-        print(f"Loaded YOLO model on {self.device}")
-
-        # Use smaller image size
-        self.imgsz = 416
+        # Structured-array ring (ts, cls, score, bbox, seq); readers use latest(k)/since(t),
+        # which copy only the requested records and never block the inference thread.
+        self.v_lock       = threading.Lock()
+        self.v_detections = detection_ring if detection_ring is not None else DetectionRing(publish_keep)
+        self.v_names      = self.label_name          # template/label string
+        self._frame_seq   = 0
+
+        # ---- sightings: per-frame detections linked into tracks ----
+        # Only the inference thread touches the tracker; finished sightings are published below.
+        # In cascade mode the detector has no species, so tracks match on IoU alone.
+        self.tracker = SightingTracker(class_name=self._class_name, max_gap=sighting_gap,
+                                       class_agnostic=cascade_detector is not None)
+        self.v_sightings = deque(maxlen=publish_keep)  # closed Sighting objects, newest last
+        self.best_shots = BestShotSelector() if best_shot else None
+        self.clip_buffer = clip_buffer
+        self.still_client = still_client
+
+        model_path = MODEL_PATH if os.path.exists(MODEL_PATH) else "best.pt"
+        if cascade_detector is not None:
+            model_path = cascade_detector
+        if autotune and os.path.exists(model_path):
+            try:
+                # Tuned on frames the size inference will actually get
+                size = (STREAM_SIZE[0] // self.decode_scale, STREAM_SIZE[1] // self.decode_scale)
+                # Tiled mode runs up to max_tiles tiles plus the full-frame view in one batch per frame
+                batch = max_tiles + 1 if tiled else 1
+                tuned = autotuner.load_or_tune(model_path, target_fps=target_fps, size=size, batch=batch)
+                device, imgsz, threads, half = tuned["device"], tuned["imgsz"], tuned["threads"], tuned["half"]
+                self.imgsz = imgsz
+            except Exception as e:
+                print(f"Autotune failed, using configured settings: {e}")
+        if tiled:
+            self.tiler = TiledDetector(tile=self.imgsz, max_tiles=max_tiles)
+            # The registry's sanity runs get their own: the live tiler's motion background
+            # and previous boxes belong to the inference thread
+            self._sanity_tiler = TiledDetector(tile=self.imgsz, max_tiles=max_tiles)
+
+        self.device = torch.device(device if device is not None else autotuner.default_device())
+        if threads:
+            torch.set_num_threads(int(threads))
+
+        # Load model; inference always goes through registry.current = (model, fast)
+        self.fast_path = bool(fast_path)
+        self.half = half
+        self.threads = threads
+        backend = (None, None)
         try:
-            path = MODEL_PATH if os.path.exists(MODEL_PATH) else "best.pt"
-            if not os.path.exists(path):
+            if not os.path.exists(model_path):
                 raise FileNotFoundError(f"Cannot find YOLO model at: {MODEL_PATH} or best.pt")
-            self.model = YOLO(path)
-            # Try to fuse for a small inference speedup; ignore if not supported
-            try:
-                self.model.fuse()
-            except Exception:
-                pass
-            print(f"Loaded YOLO model from {path} on device {self.device}")
+            backend = self._load_backend(model_path)
         except Exception as e:
             print(f"Failed to load YOLO model: {e}")
-            self.model = None
+
+        # Watches the weights file / takes reload requests and hot-swaps between frames
+        self.registry = ModelRegistry(
+            model_path, self._load_backend, self._sanity_run, initial=backend,
+            max_class=None if cascade_detector is not None else len(self.animal_names),
+        )
+
+        # Optional second stage: species classifier on detected crops, cached per track
+        self.cascade = None
+        if cascade_detector is not None:
+            self.cascade = SpeciesCascade(cascade_classifier, device=self.device, half=half,
+                                          class_names=self.animal_names)
+            print(f"Cascade enabled: detector {cascade_detector}, classifier {cascade_classifier}")
+
+    def _load_backend(self, path):
+        model = YOLO(path)
+        # Try to fuse for a small inference speedup; ignore if not supported
+        try:
+            model.fuse()
+        except Exception:
+            pass
+        print(f"Loaded YOLO model from {path} on device {self.device} (imgsz={self.imgsz})")
+
+        # Lean inference path; falls back to predict() if the model head isn't the expected shape
+        fast = None
+        if self.fast_path:
+            try:
+                fast = FastDetector(model, imgsz=self.imgsz, device=self.device, half=self.half,
+                                    conf=self.conf_threshold, iou=self.iou_threshold, threads=self.threads,
+                                    max_batch=self.tiler.max_batch if self.tiler is not None else 1)
+                print(f"Fast inference path enabled (imgsz={fast.imgsz}, half={fast.half})")
+            except Exception as e:
+                print(f"Fast inference path unavailable, using predict(): {e}")
+        return model, fast
+
+    def request_model_reload(self, path=None):
+        self.registry.request_reload(path)
 
     # ----- utility -----
     def _update_fps(self):
@@ -125,11 +280,58 @@ class VideoClient(threading.Thread):
         return str(cls_id)
 
     # ----- detection -----
-    def _detect_and_annotate(self, frame):
-        if self.model is None:
+    def _detect_and_annotate(self, frame, scale=1, full=None):
+        # Detect on `frame` (possibly decoded at 1/scale). Returned boxes are in full-res
+        # coordinates; drawing is deferred to _annotate() on the frame actually displayed.
+        backend = self.registry.current
+        if backend[0] is None:
             return []
 
-        results = self.model.predict(
+        try:
+            t0 = time.perf_counter()
+            xyxy, confs, clss = self._run_backend(backend, frame, self.tiler)
+            self.registry.record_ms(backend, 1000 * (time.perf_counter() - t0))
+        except Exception as e:
+            # A freshly swapped model that breaks on live frames is rolled back, not fatal
+            if backend is self.registry.current and self.registry.rollback():
+                print(f"[MODEL] inference error after swap: {e}")
+                return []
+            raise
+        if self._frame_seq % 15 == 0:
+            self.registry.remember(frame.copy())
+        now = time.time()
+        dets = []
+
+        keep = confs >= self.draw_threshold
+        xyxy = (xyxy[keep] * scale).astype(int)
+        confs, clss = confs[keep], clss[keep]
+
+        clss = self._update_sightings(now, frame, xyxy, confs, clss, scale, full)
+
+        for (x1, y1, x2, y2), conf, cls_id in zip(xyxy.tolist(), confs.tolist(), clss.tolist()):
+            dets.append((self._class_name(cls_id), conf, (x1, y1, x2, y2)))
+
+        # Publish to the GUI buffers; persistent logging is queued to the store's writer thread
+        if dets:
+            self.v_detections.append(now, clss, confs, xyxy, self._frame_seq)
+            if self.store is not None and self.log_frames:
+                self.store.add_many(now, dets, robot_id=self.robot_id)
+
+        return dets
+
+    def _sanity_run(self, backend, frame):
+        # Registry thread: a candidate model never touches the live tiler
+        return self._run_backend(backend, frame, self._sanity_tiler)
+
+    def _run_backend(self, backend, frame, tiler=None):
+        # -> (xyxy float32 (n, 4), conf (n,), cls int (n,)) in `frame` coordinates
+        model, fast = backend
+        if fast is not None:
+            if tiler is not None:
+                return tiler(fast, frame)
+            return fast(frame)
+
+        results = model.predict(
             source=frame,
             imgsz=self.imgsz,
             conf=self.conf_threshold,
@@ -137,105 +339,315 @@ class VideoClient(threading.Thread):
             verbose=False,
             device=self.device
         )
-
-        dets = []
-        r = results[0]
-        boxes = getattr(r, "boxes", None)
+        boxes = getattr(results[0], "boxes", None)
         if boxes is None or boxes.xyxy is None:
-            return dets
+            return np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64)
+        # Move to CPU once
+        return boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy().astype(int)
 
-        # Move to CPU once, then lightweight loops
-        xyxy = boxes.xyxy.cpu().numpy().astype(int)
-        confs = boxes.conf.cpu().numpy()
-        clss = boxes.cls.cpu().numpy().astype(int)
-
-        for (x1, y1, x2, y2), conf, cls_id in zip(xyxy, confs, clss):
-            if float(conf) < self.draw_threshold:
-                continue
+    def _annotate(self, frame, dets):
+        if not self.annotate:
+            return
+        for name, conf, (x1, y1, x2, y2) in dets:
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            cv2.putText(frame, f"{name} {conf:.2f}", (x1, max(0, y1-8)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
 
-            name = self._class_name(cls_id)
-            dets.append((name, float(conf)))
+    def _update_sightings(self, now, frame, xyxy, confs, clss, scale=1, full=None):
+        # `confirmed`: tracks that just reached min_frames; single-frame flickers never get here
+        track_ids, confirmed, ended = self.tracker.update(now, xyxy, confs, clss)
+        if self.cascade is not None:
+            # Species for each box comes from its track's accumulated classifier votes
+            clss, _ = self.cascade.classify(frame, xyxy / scale, track_ids)
+            for tid, c in zip(track_ids.tolist(), clss.tolist()):
+                self.tracker.set_class(tid, c)
+            self.cascade.retain(self.tracker.active)
+        if self.clip_buffer is not None:
+            for s in confirmed:
+                self.clip_buffer.trigger(s.animal, now)
+            # Post-roll runs from a confirmed track's latest frame, so long sightings are not cut off
+            for tid in set(track_ids.tolist()):
+                s = self.tracker.active.get(tid)
+                if s is not None and s.frames > self.tracker.min_frames:
+                    self.clip_buffer.extend(s.animal, now)
+        if self.still_client is not None:
+            # Full-sensor still from the Pi; arrives later on the side channel
+            for s in confirmed:
+                self.still_client.request(s.animal, s.peak_conf, s.last_bbox, reason="sighting")
+        if self.best_shots is not None:
+            # Scored on the inference-resolution frame; full res is decoded only if a candidate is kept
+            for tid, box, conf in zip(track_ids, xyxy, confs):
+                self.best_shots.offer(int(tid), frame, box / scale, conf, full_frame=full)
+        if ended:
+            with self.v_lock:
+                self.v_sightings.extend(ended)
+            for s in ended:
+                print(f"[SIGHTING] {s}")
+                if self.best_shots is not None:
+                    self.best_shots.finish(s)
+                if self.store is not None:
+                    self.store.add_sighting(s, robot_id=self.robot_id)
+        if self.best_shots is not None:
+            self.best_shots.retain(self.tracker.active)
+        return clss
 
-            if self.annotate:
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                cv2.putText(frame, f"{name} {conf:.2f}", (x1, max(0, y1-8)),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+    def current_sighting(self):
+        # Open sighting with the highest peak confidence, else the most recent closed one
+        s = self.tracker.current()
+        if s is not None:
+            return s
+        with self.v_lock:
+            return self.v_sightings[-1] if self.v_sightings else None
 
-        # Publish (no CSV writes)
-        if dets:
-            ts = datetime.now().isoformat(timespec='seconds')
-            with self.v_lock:
-                for name, conf in dets:
-                    self.v_times.append(ts)
-                    self.v_animals.append(name)
-                    self.v_scores.append(round(float(conf), 3))
-                # d_names is a string label; keep as-is
+    def shots_saved(self):
+        return self.best_shots.saved if self.best_shots is not None else 0
 
-        return dets
+    def get_frame(self, timeout=0.0):
+        # Newest annotated full-res frame for display, or None if nothing new arrived.
+        # Frames nobody asks for are never decoded at full resolution.
+        if not self._frame_ready.wait(timeout):
+            return None
+        self._frame_ready.clear()
+        lazy, dets, fps = self._latest
+        frame = lazy.get()
+        if frame is None:
+            return None
+        self._annotate(frame, dets)
+        self._draw_fps(frame, fps)
+        if self._connected_at is not None:
+            ms = 1000 * (time.monotonic() - self._connected_at)
+            self._connected_at = None
+            if self.reconnects:
+                self.recovery_ms.append(ms)
+            print(f"[VIDEO] first frame {ms:.0f} ms after {'reconnect' if self.reconnects else 'connect'}")
+        return frame
 
     # Optional helper for GUI: returns snapshot copies (thread-safe)
     def get_latest(self, n=10):
-        with self.v_lock:
-            return {
-                "times": list(self.v_times)[-n:],
-                "animals": list(self.v_animals)[-n:],
-                "scores": list(self.v_scores)[-n:],
-                "name": self.v_names,
-            }
+        recs = self.v_detections.latest(n)
+        return {
+            "times": [datetime.fromtimestamp(t).isoformat(timespec='seconds') for t in recs["ts"].tolist()],
+            "animals": [self._class_name(c) for c in recs["cls"].tolist()],
+            "scores": [round(s, 3) for s in recs["score"].tolist()],
+            "bboxes": recs["bbox"].astype(int).tolist(),
+            "name": self.v_names,
+        }
 
     def connect(self):
+        # -> True if the stream is open. Safe to call again after the link dropped.
+        if self.udp is not None or self.sock is not None:
+            return True
+        if self.transport == "udp":
+            try:
+                self.udp = UdpFrameReceiver(self.server_ip, self.server_port)
+                print("Subscribed to Pi Zero 2 W video over UDP")
+            except OSError as e:
+                print(f"Connection error: {e}")
+                self.udp = None
+                return False
+            self._link_up()
+            return True
         try:
-            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.sock.connect((self.server_ip, self.server_port))
+            if self.session is not None:
+                self.sock = self.session.connect().channel("video")
+            else:
+                self.sock = socket.create_connection((self.server_ip, self.server_port), timeout=5.0)
+            self.sock.settimeout(self.stall_timeout)
+            # Codec hello; a server without negotiation ignores it and starts streaming straight away
+            hello = {"codecs": [self.codec] if self.codec else [], "acks": self.acks}
+            self.sock.sendall((json.dumps(hello) + "\n").encode("utf-8"))
             print("Connected to Pi Zero 2 W video server")
-        except socket.error as e:
+        except (socket.error, ValueError, KeyError) as e:
             print(f"Connection error: {e}")
-            self.sock = None
+            self._close_link()
+            return False
+        self._link_up()
+        return True
 
-    # ----- main loop -----
-    def run(self):
+    def _link_up(self):
+        # A new stream starts from scratch: header, codec state and delta canvas belong to the old one
+        self.stream_info = {}
+        self._send_acks = False
+        self.compositor = DeltaCompositor()
+        self.h264 = None
+        self._connected_at = time.monotonic()
+        self.link_state = "connected"
+
+    def _close_link(self):
+        try:
+            if self.udp is not None:
+                self.udp.close()
+            elif self.sock is not None:
+                self.sock.close()
+                if self.session is not None:
+                    # A closed channel cannot be reopened: end the mux it belonged to (unless control
+                    # already replaced it), and the next connect() resumes the session on a new one
+                    self.session.close_if(self.sock.mux)
+        except Exception:
+            pass
+        self.sock = None
+        self.udp = None
+
+    # ----- frame sources: each yields one encoded frame (bytes) at a time -----
+    def _tcp_frames(self):
         buf = b''
+        # Stream header: one JSON line. A length prefix never starts with "{" (that would be > 2 GB)
+        while not buf:
+            more = self.sock.recv(4096)
+            if not more:
+                raise ConnectionError("Connection closed by server")
+            buf += more
+        if buf[:1] == b"{":
+            while b"\n" not in buf:
+                more = self.sock.recv(4096)
+                if not more:
+                    raise ConnectionError("Connection closed by server")
+                buf += more
+            line, buf = buf.split(b"\n", 1)
+            self.stream_info = json.loads(line)
+            self._send_acks = self.acks and bool(self.stream_info.get("acks"))
+            print(f"Video stream: {self.stream_info.get('codec')} "
+                  f"{self.stream_info.get('w')}x{self.stream_info.get('h')}")
+        while self.running:
+            # read 4-byte length
+            while len(buf) < 4:
+                more = self.sock.recv(4096)
+                if not more:
+                    raise ConnectionError("Connection closed by server")
+                buf += more
+            msg_len = struct.unpack(">I", buf[:4])[0]
+            buf = buf[4:]
+
+            # read payload
+            while len(buf) < msg_len:
+                more = self.sock.recv(4096)
+                if not more:
+                    raise ConnectionError("Connection closed by server")
+                buf += more
+
+            frame_data = buf[:msg_len]
+            buf = buf[msg_len:]
+            yield frame_data
+
+    def _udp_frames(self):
+        # Incomplete / late frames never get here: the reassembler drops them instead of waiting.
+        # A silent Pi ends the stream after stall_timeout, like a TCP read timeout, so run() reconnects
+        for frame_data, _sent in self.udp.frames(lambda: self.running, self.stall_timeout):
+            yield frame_data
 
+    def frames(self):
+        return self._udp_frames() if self.udp is not None else self._tcp_frames()
+
+    def link_stats(self):
+        # UDP receive/loss counters ({} on TCP, where loss shows up as stalls instead)
+        return self.udp.reasm.stats() if self.udp is not None else {}
+
+    def _from_full(self, full):
+        # Codecs that only ever yield full-resolution frames: scale down for inference here
+        if full is None:
+            return None, None
+        s = self.decode_scale
+        frame = full if s == 1 else cv2.resize(full, (full.shape[1] // s, full.shape[0] // s),
+                                               interpolation=cv2.INTER_AREA)
+        lazy = LazyFrame(None, frame, s)
+        lazy._full = full
+        return lazy, frame
+
+    def _decode(self, frame_data):
+        # -> (LazyFrame, frame at inference resolution), or (None, None) if nothing can be shown
+        if self.clip_buffer is not None:
+            # As received, whatever the codec: the clip writer converts only what ends up in a clip
+            self.clip_buffer.push(time.time(), frame_data)
+        if is_delta(frame_data):
+            # Tile delta from the Pi's delta mode: rebuild the full frame on the compositor canvas
+            full = self.compositor.apply(frame_data)
+            self.frame_tags = self.compositor.tags
+            return self._from_full(full)
+
+        if is_h264(frame_data):
+            if self.h264 is None:
+                self.h264 = H264Decoder()
+            full = self.h264.decode(frame_data)
+            self.frame_tags = self.h264.tags
+            return self._from_full(full)
+
+        self.frame_tags = read_tags(frame_data) or {}
+        # decode JPEG -> BGR at inference resolution; full res stays lazy
+        frame = cv2.imdecode(np.frombuffer(frame_data, np.uint8), DECODE_FLAGS[self.decode_scale])
+        if frame is None:
+            return None, None
+        lazy = LazyFrame(frame_data, frame, self.decode_scale)
+        if "dseq" in self.frame_tags:
+            # Keyframe of a delta stream: the compositor needs it at full resolution
+            self.compositor.keyframe(lazy.get(), self.frame_tags)
+        return lazy, frame
+
+    def _ack(self):
+        # Tells the Pi's rate controller this frame is decoded and how long frames take us
+        seq = self.frame_tags.get("f")
+        if not self._send_acks or seq is None:
+            return
+        ack = {"f": seq} if self._proc_ms is None else {"f": seq, "p": round(self._proc_ms, 1)}
         try:
-            while self.running:
-                # read 4-byte length
-                while len(buf) < 4:
-                    more = self.sock.recv(4096)
-                    if not more:
-                        raise ConnectionError("Connection closed by server")
-                    buf += more
-                msg_len = struct.unpack(">I", buf[:4])[0]
-                buf = buf[4:]
-
-                # read payload
-                while len(buf) < msg_len:
-                    more = self.sock.recv(4096)
-                    if not more:
-                        raise ConnectionError("Connection closed by server")
-                    buf += more
-
-                frame_data = buf[:msg_len]
-                buf = buf[msg_len:]
-
-                # decode JPEG/PNG -> BGR frame
-                frame = cv2.imdecode(np.frombuffer(frame_data, np.uint8), cv2.IMREAD_COLOR)
-                if frame is None:
-                    continue
+            self.sock.sendall((json.dumps(ack) + "\n").encode("utf-8"))
+        except OSError:
+            pass
 
-                fps = self._update_fps()
-                self._draw_fps(frame, fps)
+    # ----- main loop -----
+    def _stream(self):
+        for frame_data in self.frames():
+            t0 = time.perf_counter()
+            lazy, frame = self._decode(frame_data)
+            self._ack()
+            if frame is None:
+                continue
+            self._frame_seq += 1
+            if self._backoff.failures:
+                self._backoff.reset()       # the link delivers frames again
 
-                self._detect_and_annotate(frame)
+            fps = self._update_fps()
+            dets = self._detect_and_annotate(frame, self.decode_scale, lazy.get)
 
-                if not self.frame_queue.full():
-                    self.frame_queue.put(frame)
-        except Exception as e:
-            print(f"VideoClient error: {e}")
+            self._latest = (lazy, dets, fps)
+            self._frame_ready.set()
+            ms = 1000 * (time.perf_counter() - t0)
+            self._proc_ms = ms if self._proc_ms is None else 0.8 * self._proc_ms + 0.2 * ms
+
+    def run(self):
+        try:
+            while self.running:
+                if not self.connect():
+                    if not self.reconnect:
+                        break
+                    self.link_state = "reconnecting"
+                    delay = self._backoff.next()
+                    print(f"[VIDEO] retrying in {delay:.1f} s")
+                    self._wake.wait(delay)
+                    continue
+                try:
+                    self._stream()
+                except Exception as e:
+                    print(f"VideoClient error: {e}")
+                self._close_link()
+                if not self.reconnect or not self.running:
+                    break
+                self.link_state = "reconnecting"
+                self.reconnects += 1
+                # Also wait before the first retry: a server that accepts and drops at once must not spin us
+                self._wake.wait(self._backoff.next())
         finally:
-            try:
-                self.sock.close()
-            except Exception:
-                pass
+            self.link_state = "stopped"
+            self._close_link()
+            for sighting in self.tracker.flush():
+                with self.v_lock:
+                    self.v_sightings.append(sighting)
+                if self.best_shots is not None:
+                    self.best_shots.finish(sighting)
+                if self.store is not None:
+                    self.store.add_sighting(sighting, robot_id=self.robot_id)
+            if self.clip_buffer is not None:
+                self.clip_buffer.flush()
 
     def stop(self):
-        self.running = False
\ No newline at end of file
+        self.running = False
+        self._wake.set()
\ No newline at end of file
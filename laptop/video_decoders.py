@@ -0,0 +1,56 @@
+import json
+import struct
+
+try:
+    import av
+except ImportError:     # only needed when the Pi streams H.264
+    av = None
+
+# Must match pi/video_codecs.py
+H264_MAGIC = b"WAVC"
+H264_HDR = struct.Struct(">H")
+
+
+def is_h264(data):
+    return data[:4] == H264_MAGIC
+
+
+def h264_is_keyframe(data):
+    # The Pi repeats SPS/PPS on every IDR, so a keyframe's first NAL unit is an SPS (7) or the IDR (5)
+    off = len(H264_MAGIC)
+    off += H264_HDR.size + H264_HDR.unpack_from(data, off)[0]
+    start = data.find(b"\x00\x00\x01", off, off + 8)
+    return start >= 0 and start + 3 < len(data) and data[start + 3] & 0x1F in (5, 7)
+
+
+class H264Decoder:
+    """
+    Client side of the Pi's H.264 codec (PyAV / libavcodec).
+
+    Each payload is one access unit and is fed as one packet, so a frame comes
+    out of decode() for the payload that carried it, with no parser delay.
+    Until the first keyframe (or after a corrupt unit) decode() returns None;
+    the Pi forces a keyframe for new and resyncing clients.
+    """
+
+    def __init__(self):
+        if av is None:
+            raise RuntimeError("H.264 stream needs PyAV (pip install av)")
+        self._ctx = av.CodecContext.create("h264", "r")
+        self.tags = {}
+        self.errors = 0
+
+    def decode(self, data):
+        # -> BGR frame, or None if this unit produced no picture
+        off = len(H264_MAGIC)
+        n_tags = H264_HDR.unpack_from(data, off)[0]
+        off += H264_HDR.size
+        self.tags = json.loads(data[off:off + n_tags]) if n_tags else {}
+        try:
+            frames = self._ctx.decode(av.Packet(data[off + n_tags:]))
+        except av.error.FFmpegError:
+            self.errors += 1
+            return None
+        if not frames:
+            return None
+        return frames[-1].to_ndarray(format="bgr24")
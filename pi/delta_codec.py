@@ -0,0 +1,108 @@
+import json
+import struct
+import time
+
+import cv2
+import numpy as np
+
+from frame_tags import tag_jpeg
+
+# Delta payload: MAGIC, header, tags JSON, then per run: run header + JPEG of that strip of tiles
+DELTA_MAGIC = b"WDLT"
+DELTA_HDR = struct.Struct(">IIHHHHH")     # seq, prev seq, width, height, tile, n_runs, tags length
+RUN_HDR = struct.Struct(">HHHI")          # tile row, first tile col, n tiles, JPEG length
+
+
+class DeltaEncoder:
+    """
+    Tile-based delta encoding for a mostly static scene.
+
+    Each frame is shrunk to 1/`scale` luma and compared tile by tile (mean
+    absolute difference, one vectorized reshape) against the luma of what the
+    client last received. Only changed tiles are sent: horizontally adjacent
+    changed tiles are merged into one strip and JPEG-encoded. A full JPEG
+    keyframe goes out every `key_interval` seconds, when more than
+    `max_changed` of the tiles changed, or when force_key is set (new client,
+    dropped delta). Keyframes are ordinary JPEGs tagged with "dseq".
+    """
+
+    name = "delta"
+
+    def __init__(self, tile=64, scale=4, thresh=4.0, key_interval=2.0, max_changed=0.5, quality=60):
+        if tile % scale:
+            raise ValueError("tile must be a multiple of scale")
+        self.tile = int(tile)
+        self.scale = int(scale)
+        self.thresh = float(thresh)
+        self.key_interval = float(key_interval)
+        self.max_changed = float(max_changed)
+        self.enc = [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)]
+        self.force_key = True
+        self.seq = 0
+        self._ref = None
+        self._last_key = 0.0
+        self._grid = None
+
+    def _luma(self, frame):
+        h, w = frame.shape[:2]
+        ts = self.tile // self.scale
+        rows, cols = -(-h // self.tile), -(-w // self.tile)
+        small = cv2.resize(frame, (w // self.scale, h // self.scale), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGRA2GRAY if small.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+        # Pad to whole tiles so the per-tile SAD is a single reshape + mean
+        ph, pw = rows * ts - small.shape[0], cols * ts - small.shape[1]
+        if ph or pw:
+            small = cv2.copyMakeBorder(small, 0, ph, 0, pw, cv2.BORDER_REPLICATE)
+        self._grid = (rows, cols, ts)
+        return small
+
+    def _key(self, frame, small, tags, now):
+        ok, jpeg = cv2.imencode(".jpg", frame, self.enc)
+        if not ok:
+            return None, True
+        self._ref = small
+        self._last_key = now
+        self.force_key = False
+        return tag_jpeg(jpeg.tobytes(), dict(tags or {}, dseq=self.seq)), True
+
+    def encode(self, frame, tags=None, now=None):
+        # -> (payload bytes, is_keyframe)
+        now = time.monotonic() if now is None else now
+        small = self._luma(frame)
+        prev = self.seq
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        if self.force_key or self._ref is None or self._ref.shape != small.shape or now - self._last_key >= self.key_interval:
+            return self._key(frame, small, tags, now)
+
+        rows, cols, ts = self._grid
+        sad = cv2.absdiff(small, self._ref).reshape(rows, ts, cols, ts).mean(axis=(1, 3))
+        changed = sad > self.thresh
+        if changed.mean() > self.max_changed:
+            return self._key(frame, small, tags, now)
+
+        h, w = frame.shape[:2]
+        t = self.tile
+        runs = []
+        for r in np.flatnonzero(changed.any(axis=1)).tolist():
+            row = changed[r]
+            # Runs of consecutive changed tiles in this row
+            edges = np.flatnonzero(np.diff(np.concatenate(([0], row.view(np.int8), [0]))))
+            for c0, c1 in zip(edges[::2].tolist(), edges[1::2].tolist()):
+                strip = frame[r * t:min(h, (r + 1) * t), c0 * t:min(w, c1 * t)]
+                ok, jpeg = cv2.imencode(".jpg", strip, self.enc)
+                if not ok:
+                    return self._key(frame, small, tags, now)
+                runs.append(RUN_HDR.pack(r, c0, c1 - c0, len(jpeg)) + jpeg.tobytes())
+                # The client now has these tiles: they become the reference
+                self._ref[r * ts:(r + 1) * ts, c0 * ts:c1 * ts] = small[r * ts:(r + 1) * ts, c0 * ts:c1 * ts]
+
+        tag_bytes = json.dumps(tags, separators=(",", ":")).encode() if tags else b""
+        head = DELTA_MAGIC + DELTA_HDR.pack(self.seq, prev, w, h, t, len(runs), len(tag_bytes))
+        return head + tag_bytes + b"".join(runs), False
+
+    def set_quality(self, quality):
+        self.enc[1] = int(quality)
+
+    def close(self):
+        self._ref = None
@@ -0,0 +1,15 @@
+def read_lines(conn, bufsize=1024):
+    # Yields whole "\n"-terminated commands from a stream socket; TCP may split one command
+    # across reads or pack several into one, so nothing is dispatched until its newline arrives.
+    # A trailing partial line left when the peer disconnects is dropped.
+    buf = b""
+    while True:
+        chunk = conn.recv(bufsize)
+        if not chunk:
+            return
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            line = line.decode("ascii", "replace").strip()
+            if line:
+                yield line
@@ -2,16 +2,16 @@ import socket
 import serial
 import sys
 import struct
-import cv2
-import queue
-from picamera2 import Picamera2
-import numpy as np
 import threading
 import RPi.GPIO as GPIO
 import time
 import json
 import subprocess
 from gpiozero import LED
+from video_server import video_streaming_server
+from still_server import StillServer
+from session_server import SessionServer
+from line_reader import read_lines
 
 
 # ---------- UART setup ----------
@@ -27,7 +27,31 @@ def open_serial():
 
 
 # -------- Robot Control Server --------
-def robot_control_server(ser, host = '', port = 5000):
+def handle_control_client(conn, ser, stills=None):
+    # One control connection (TCP port 5000 or a session's control channel)
+    for line in read_lines(conn):
+        # "SNAP <id>" asks for a full-resolution still, "PING <x>" is answered with "PONG <x>";
+        # neither reaches the STM32
+        if line.startswith("SNAP"):
+            if stills is not None:
+                req_id = line[4:].strip() or str(time.time())
+                stills.request(req_id)
+                print(f"[STILL] request {req_id}")
+            continue
+        if line.startswith("PING"):
+            conn.sendall(("PONG" + line[4:] + "\n").encode("ascii"))
+            continue
+
+        # Forward raw command directly to UART
+        try:
+            ser.write((line + "\n").encode("ascii"))
+            print(f"[UART] Sent: {line}")
+        except Exception as e:
+            print(f"[UART] Write error: {e}")
+    print("[TCP] Client disconnected")
+
+
+def robot_control_server(ser, host = '', port = 5000, stills=None):
     
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
@@ -39,34 +63,29 @@ def robot_control_server(ser, host = '', port = 5000):
         conn, addr = server_socket.accept()
         print(f"Robot Control client connected from {addr}")
         with conn:
-            while True:
-                data = conn.recv(1024).decode().strip()
-                if not data:
-                    print("[TCP] Client disconnected")
-                    break
-
-                # Forward raw command directly to UART
-                msg = data + "\n"
-                try:
-                    ser.write(msg.encode("ascii"))
-                    print(f"[UART] Sent: {data}")
-                except Exception as e:
-                    print(f"[UART] Write error: {e}")
+            handle_control_client(conn, ser, stills)
 
 
 # -------- Audio Streaming Server --------
 def audio_streaming_server(host='', port=8001, device='plughw:0,0', sample_rate=16000, channels=1, sample_fmt='S16_LE', chunk_ms=20):
 
-    # bytes per sample for S16_LE is 2
-    bytes_per_sample = 2 if sample_fmt.endswith('16_LE') else 4
-    chunk_bytes = int(sample_rate * channels * bytes_per_sample * (chunk_ms / 1000.0))
-
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server_socket.bind((host, port))
     server_socket.listen(1)
     print(f"Audio server listening on port {port}...")
     client_socket, addr = server_socket.accept()
     print(f"Audio client connected from {addr}")
+    try:
+        stream_audio(client_socket, device, sample_rate, channels, sample_fmt, chunk_ms)
+    finally:
+        server_socket.close()
+
+
+def stream_audio(client_socket, device='plughw:0,0', sample_rate=16000, channels=1, sample_fmt='S16_LE', chunk_ms=20):
+    # One audio client (TCP port 8001 or a session's audio channel); only one arecord can hold the device
+    # bytes per sample for S16_LE is 2
+    bytes_per_sample = 2 if sample_fmt.endswith('16_LE') else 4
+    chunk_bytes = int(sample_rate * channels * bytes_per_sample * (chunk_ms / 1000.0))
 
     # Send one-line JSON header so the client knows what to expect
     header = {
@@ -109,136 +128,35 @@ def audio_streaming_server(host='', port=8001, device='plughw:0,0', sample_rate=
         except Exception:
             pass
         client_socket.close()
-        server_socket.close()
-
-
-
-def video_streaming_server(host='', port=8000):
-
-    class ClientWriter(threading.Thread):
-        def __init__(self, conn, on_close):
-            super().__init__(daemon=True)
-            self.conn = conn
-            self.q = queue.Queue(maxsize=1)  # latest frame only
-            self.on_close = on_close
-            self.alive = True
-            # Keep sends from blocking forever
-            try:
-                self.conn.settimeout(2.0)
-                # Modest send buffer helps smoothness without hiding backpressure
-                self.conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 256 * 1024)
-            except Exception:
-                pass
-
-        def push(self, frame_bytes):
-            # Drop previous frame if still waiting to be sent
-            try:
-                if self.q.full():
-                    _ = self.q.get_nowait()
-                self.q.put_nowait(frame_bytes)
-            except queue.Full:
-                # Extremely rare with the get_nowait above; okay to drop
-                pass
-
-        def run(self):
-            try:
-                while self.alive:
-                    data = self.q.get()  # blocks until a frame is available
-                    if data is None:
-                        break
-                    # length-prefix then payload
-                    self.conn.sendall(struct.pack(">I", len(data)))
-                    self.conn.sendall(data)
-            except Exception:
-                # client likely disconnected / too slow / timeout
-                pass
-            finally:
-                try:
-                    self.conn.close()
-                except Exception:
-                    pass
-                self.on_close(self)
-
-        def stop(self):
-            self.alive = False
-            # Unblock the queue
-            try:
-                self.q.put_nowait(None)
-            except Exception:
-                pass
-
-    # ---- server socket ----
-    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    server_socket.bind((host, port))
-    server_socket.listen(16)
-    print(f"[VIDEO] Listening on port {port}...")
-
-    # ---- camera ----
-    picam2 = Picamera2()
-    # Keep resolution/quality modest; you can tune these
-    config = picam2.create_video_configuration(main={"size": (960, 540)})
-    picam2.configure(config)
-    picam2.start()
-    time.sleep(0.5)  # warm-up
-
-    # ---- client registry ----
-    clients = set()
-    lock = threading.Lock()
-
-    def on_close(writer):
-        with lock:
-            if writer in clients:
-                clients.remove(writer)
-        print("[VIDEO] client closed")
-
-    # ---- accept loop ----
-    def accept_loop():
-        while True:
-            conn, addr = server_socket.accept()
-            print(f"[VIDEO] client connected from {addr}")
-            writer = ClientWriter(conn, on_close)
-            with lock:
-                clients.add(writer)
-            writer.start()
-
-    threading.Thread(target=accept_loop, daemon=True).start()
-
-    # ---- capture + fan-out ----
-    try:
-        # You can add a simple FPS cap if needed:
-        # target_dt = 1.0 / 30.0
-        while True:
-            frame = picam2.capture_array()
-            ok, jpeg = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), 60])
-            if not ok:
-                continue
-            data = jpeg.tobytes()
-            with lock:
-                # push latest frame; slow clients auto-drop old frames
-                for w in list(clients):
-                    w.push(data)
-            # Optional FPS cap:
-            # time.sleep(target_dt)
-    except KeyboardInterrupt:
-        pass
-    finally:
-        with lock:
-            for w in list(clients):
-                w.stop()
-        try:
-            server_socket.close()
-        except Exception:
-            pass
-        try:
-            picam2.stop()
-        except Exception:
-            pass
 
 
 
 # -------- Main --------
 if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Wildlife robot Pi servers")
+    ap.add_argument("--presence", action="store_true",
+                    help="Score frames on the Pi and send only low-rate keyframes while nothing is present")
+    ap.add_argument("--presence-onnx", default=None, help="Optional tiny ONNX animal/background classifier")
+    ap.add_argument("--sentinel", action="store_true",
+                    help="Duty-cycle the camera: low-rate motion watch, full-rate streaming only after a trigger")
+    ap.add_argument("--sentinel-fps", type=float, default=2.0, help="Camera frame rate while in sentinel")
+    ap.add_argument("--sentinel-hold", type=float, default=20.0, help="Seconds of full-rate streaming after the last motion")
+    ap.add_argument("--udp", action="store_true", help="Also serve video over UDP on port 8000 (drops late frames)")
+    ap.add_argument("--delta", action="store_true",
+                    help="Send only changed tiles between keyframes (static scenes; needs a delta-aware client)")
+    ap.add_argument("--codec", choices=["mjpeg", "delta", "h264"], default="mjpeg",
+                    help="Codec for clients that do not ask for one (and for UDP); clients may negotiate another")
+    ap.add_argument("--h264-preset", default="ultrafast", help="x264 preset (ultrafast .. medium)")
+    ap.add_argument("--h264-gop", type=int, default=60, help="Frames between H.264 keyframes")
+    ap.add_argument("--h264-bitrate", type=int, default=800, help="H.264 target bitrate in kbit/s")
+    ap.add_argument("--rate-control", action="store_true",
+                    help="Adapt quality, resolution and frame rate to client acks to hold --target-latency")
+    ap.add_argument("--target-latency", type=float, default=0.25, help="Rate control latency target in seconds")
+    ap.add_argument("--session-port", type=int, default=5050,
+                    help="Port for the multiplexed session protocol (control/video/audio/telemetry); 0 = off")
+    args = ap.parse_args()
 
     # Toggle NRST on STM32 to boot and run the firmware (GPIO4 is connected to NRST on STM32)
     led = LED(4)
@@ -253,9 +171,30 @@ if __name__ == "__main__":
     ser = open_serial()
     print("[UART] Opened /dev/ttyS0 @115200")
 
+    # Full-resolution stills on request (control "SNAP <id>"), delivered on port 8002
+    stills = StillServer(port=8002)
+    stills.start()
+
+    # Everything on one connection, next to the legacy ports; video registers its own handler
+    session = None
+    if args.session_port:
+        session = SessionServer(port=args.session_port)
+        session.handlers["control"] = lambda conn: handle_control_client(conn, ser, stills)
+        session.handlers["audio"] = lambda conn: stream_audio(conn, device="plughw:0,0")
+        session.start()
+
     # Start servers in separate threads
-    control_thread = threading.Thread(target=robot_control_server, args=(ser,), daemon=True)
-    video_thread1 = threading.Thread(target=video_streaming_server, kwargs={"port": 8000}, daemon=True)
+    control_thread = threading.Thread(target=robot_control_server, args=(ser,), kwargs={"stills": stills}, daemon=True)
+    video_thread1 = threading.Thread(
+        target=video_streaming_server,
+        kwargs={"port": 8000, "presence": args.presence, "presence_onnx": args.presence_onnx,
+                "sentinel": args.sentinel, "sentinel_fps": args.sentinel_fps, "sentinel_hold": args.sentinel_hold,
+                "stills": stills, "udp": args.udp, "delta": args.delta,
+                "codec": args.codec, "h264_opts": {"preset": args.h264_preset, "gop": args.h264_gop,
+                                                   "bitrate": args.h264_bitrate * 1000},
+                "rate_control": args.rate_control, "target_latency": args.target_latency, "session": session},
+        daemon=True
+    )
     audio_thread = threading.Thread(
         target=audio_streaming_server,
         kwargs={"port": 8001, "device": "plughw:0,0", "sample_rate": 16000, "channels": 1, "sample_fmt": "S16_LE"},
@@ -265,7 +204,8 @@ if __name__ == "__main__":
     video_thread1.start()
     audio_thread.start()
 
-    print("Pi servers running (video:8000, audio:8001, control:5000). Press Ctrl+C to exit.")
+    print("Pi servers running (video:8000, audio:8001, stills:8002, control:5000"
+          f"{f', session:{args.session_port}' if args.session_port else ''}). Press Ctrl+C to exit.")
     try:
         while True:
             time.sleep(1)
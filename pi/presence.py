@@ -0,0 +1,120 @@
+import time
+
+import cv2
+import numpy as np
+
+
+def to_gray(frame):
+    # picamera2 hands out XBGR8888 (4 channels) by default; replayed frames are BGR
+    if frame.ndim == 2:
+        return frame
+    if frame.shape[2] == 4:
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+
+class PresenceDetector:
+    """
+    Cheap "might there be an animal?" score for the Pi, run on every captured frame.
+
+    Motion + blob stage: the frame is shrunk to ~160 px wide grey, differenced
+    against a running background, and the connected blobs are scored by size and
+    shape (tiny specks and frame-wide lighting changes score low). An optional
+    tiny ONNX classifier (cv2.dnn, CPU) is consulted only when the motion stage
+    is unsure, and at most every `dnn_every` frames, to keep within the Pi Zero's
+    budget next to JPEG encode.
+
+    score(frame) -> float in [0, 1]; present(score) applies hysteresis + hold time.
+    """
+
+    def __init__(self, width=160, thresh=20, min_area=0.0015, max_area=0.5, alpha=0.05,
+                 on=0.5, off=0.25, hold=3.0, onnx_path=None, onnx_size=96, dnn_every=5):
+        self.width = int(width)
+        self.thresh = int(thresh)
+        self.min_area = float(min_area)     # blob area as a fraction of the frame
+        self.max_area = float(max_area)     # larger than this is a lighting change / camera shake
+        self.alpha = float(alpha)
+        self.on = float(on)
+        self.off = float(off)
+        self.hold = float(hold)
+
+        self.net = None
+        self.onnx_size = int(onnx_size)
+        self.dnn_every = int(dnn_every)
+        if onnx_path:
+            # Expected: a 2-logit/prob (background, animal) classifier, ideally int8-quantised
+            self.net = cv2.dnn.readNetFromONNX(onnx_path)
+            self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+        self._bg = None
+        self._kernel = np.ones((3, 3), np.uint8)
+        self._n = 0
+        self._dnn_score = 0.0
+        self._present = False
+        self._last_hit = 0.0
+        self.last_score = 0.0
+        self.last_boxes = []
+
+    def _small(self, frame):
+        h, w = frame.shape[:2]
+        sw = min(self.width, w)
+        sh = max(1, int(round(h * sw / w)))
+        # Subsample before the colour conversion: it is the expensive part at full size
+        return to_gray(cv2.resize(frame, (sw, sh), interpolation=cv2.INTER_NEAREST))
+
+    def _motion(self, gray):
+        g = gray.astype(np.float32)
+        if self._bg is None or self._bg.shape != g.shape:
+            self._bg = g
+            return 0.0, []
+        diff = cv2.absdiff(g, self._bg)
+        cv2.accumulateWeighted(g, self._bg, self.alpha)
+        mask = (diff > self.thresh).astype(np.uint8)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self._kernel)
+        n, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        if n <= 1:
+            return 0.0, []
+        total = float(gray.shape[0] * gray.shape[1])
+        best, boxes = 0.0, []
+        for x, y, w, h, area in stats[1:].tolist():
+            frac = area / total
+            if frac < self.min_area or frac > self.max_area:
+                continue
+            fill = area / float(w * h)          # solid blobs, not scattered leaf flicker
+            aspect = min(w, h) / float(max(w, h))
+            s = min(1.0, frac / (4 * self.min_area)) * (0.5 + 0.5 * fill) * (0.6 + 0.4 * aspect)
+            best = max(best, s)
+            boxes.append((x, y, w, h))
+        return best, boxes
+
+    def _dnn(self, frame):
+        blob = cv2.dnn.blobFromImage(frame[..., :3], 1.0 / 255, (self.onnx_size, self.onnx_size), swapRB=True)
+        self.net.setInput(blob)
+        out = self.net.forward().ravel()
+        if out.size < 2:
+            return float(out[0]) if out.size else 0.0
+        e = np.exp(out[:2] - out[:2].max())
+        return float(e[1] / e.sum())
+
+    def score(self, frame):
+        self._n += 1
+        s, boxes = self._motion(self._small(frame))
+        if self.net is not None:
+            if s <= 0.1:
+                self._dnn_score = 0.0           # nothing moving: nothing for the classifier to confirm
+            elif s < self.on and self._n % self.dnn_every == 0:
+                self._dnn_score = self._dnn(frame)
+            s = max(s, self._dnn_score)
+        self.last_score = s
+        self.last_boxes = boxes
+        return s
+
+    def present(self, score, now=None):
+        now = time.monotonic() if now is None else now
+        if score >= self.on or (self._present and score >= self.off):
+            self._last_hit = now
+            self._present = True
+        elif self._present and now - self._last_hit > self.hold:
+            self._present = False
+        return self._present
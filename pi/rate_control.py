@@ -0,0 +1,173 @@
+import time
+
+
+class RateController:
+    """
+    Holds a target glass-to-client latency by trading JPEG quality, resolution
+    and frame rate, driven by the clients' per-frame acknowledgements.
+
+    The settings form one ladder, best first: quality steps of 10 down to
+    `min_quality` at each scale in `scales`, then halving frame rates down to
+    `min_fps`. Every `interval` seconds the worst acking client's latency is
+    compared with `target`. Above it, the controller measures what the link
+    actually delivered (acked bytes per second) and jumps straight to the
+    first rung whose estimated bitrate fits in 70% of that, so one step is
+    usually enough. Below half the target, and at least `hold` seconds after
+    the last change, it steps back up by one rung. A step up that has to be
+    undone doubles that wait (up to 8x), so a link at its limit is not probed
+    constantly.
+
+    Samples for frames encoded before the last change are ignored, since they
+    say nothing about the new setting. A frame outstanding for longer than the
+    target counts as a sample even before its ack arrives (stalled link).
+
+    Clients also report how long they take per frame (decode + inference). If
+    that is the bottleneck, sending more frames only fills socket buffers. The
+    frame rate is then capped at what the slowest client keeps up with, and the
+    ladder is left alone for `hold` seconds while the backlog drains.
+    """
+
+    def __init__(self, target=0.25, quality=60, min_quality=20, scales=(1.0, 0.75, 0.5), fps=30.0, min_fps=2.0,
+                 interval=0.25, hold=2.0):
+        self.target = float(target)
+        self.interval = float(interval)
+        self.hold = float(hold)
+        qualities = list(range(int(quality), int(min_quality) - 1, -10))
+        self.ladder = [(q, s, float(fps)) for s in scales for q in qualities]
+        q, s, f = self.ladder[-1]
+        while f / 2 >= min_fps:
+            f /= 2
+            self.ladder.append((q, s, f))
+        self.level = 0
+        self.client_fps = None          # cap from the slowest client's processing time
+        self.latency = 0.0              # worst client latency at the last tick
+        self.goodput = None             # bits/s the slowest acking client received at the last tick
+        self.changes = 0
+
+        self._seq = 0                   # frame sequence number of the next encode
+        self._frame_bytes = {}          # ladder level -> EWMA of encoded frame size
+        self._changed_seq = 0
+        self._changed_at = 0.0
+        self._raised_at = None
+        self._base_hold = self.hold
+        self._capped_at = None
+        self._last_tick = None
+        self._next_tick = 0.0
+        self._next_frame = 0.0
+
+    # ----- settings -----
+    @property
+    def quality(self):
+        return self.ladder[self.level][0]
+
+    @property
+    def scale(self):
+        return self.ladder[self.level][1]
+
+    @property
+    def fps(self):
+        f = self.ladder[self.level][2]
+        return f if self.client_fps is None else max(1.0, min(f, self.client_fps))
+
+    def due(self, now):
+        # Frame-rate gate for the capture loop: True when the next frame should be sent
+        if now < self._next_frame:
+            return False
+        self._next_frame = max(self._next_frame + 1.0 / self.fps, now - 1.0 / self.fps)
+        return True
+
+    def next_seq(self):
+        seq = self._seq
+        self._seq += 1
+        return seq
+
+    def tags(self, seq):
+        return {"f": seq, "t": round(time.time(), 3), "q": self.quality, "s": self.scale}
+
+    def sent(self, nbytes):
+        # Size of the frame just encoded at the current setting (feeds the bitrate estimates)
+        b = self._frame_bytes.get(self.level)
+        self._frame_bytes[self.level] = nbytes if b is None else 0.8 * b + 0.2 * nbytes
+
+    # ----- control -----
+    def _bitrate(self, level):
+        # Estimated bits/s at `level`, scaled from the frame size measured at the current level:
+        # JPEG size goes roughly with pixel count and quality^0.7 in this range
+        b = self._frame_bytes.get(self.level)
+        if b is None:
+            return None
+        q0, s0, _ = self.ladder[self.level]
+        q, s, f = self.ladder[level]
+        if self.client_fps is not None:
+            f = min(f, self.client_fps)
+        return 8 * b * (s / s0) ** 2 * (q / q0) ** 0.7 * f
+
+    def _fitting_level(self, bps):
+        budget = 0.7 * bps
+        for level in range(self.level + 1, len(self.ladder)):
+            est = self._bitrate(level)
+            if est is not None and est <= budget:
+                return level
+        return len(self.ladder) - 1
+
+    def tick(self, now, get_reports):
+        # get_reports() -> per acking client: (samples [(seq, latency, bytes)], oldest unacked (seq, age)
+        # or None, ms per frame or None). Only called when a control step is due. -> True if the settings changed.
+        if now < self._next_tick:
+            return False
+        self._next_tick = now + self.interval
+        elapsed = None if self._last_tick is None else now - self._last_tick
+        self._last_tick = now
+        reports = get_reports()
+        if not reports:
+            return False
+        worst = 0.0
+        procs, goodputs = [], []
+        for samples, oldest, proc_ms in reports:
+            fresh = [lat for seq, lat, _ in samples if seq >= self._changed_seq]
+            if fresh:
+                worst = max(worst, sum(fresh) / len(fresh))
+            if oldest is not None and oldest[0] >= self._changed_seq and oldest[1] > self.target:
+                worst = max(worst, oldest[1])
+            if proc_ms:
+                procs.append(proc_ms)
+            if elapsed:
+                goodputs.append(8 * sum(n for _, _, n in samples) / elapsed)
+        self.latency = worst
+        self.goodput = min(goodputs) if goodputs else None
+        self.client_fps = 0.9 * 1000.0 / max(procs) if procs else None
+
+        level = self.level
+        if self.client_fps is not None and self.client_fps < self.ladder[level][2]:
+            if self._capped_at is None:
+                self._capped_at = now
+        else:
+            self._capped_at = None
+        draining = self._capped_at is not None and now - self._capped_at < self.hold
+        if worst > self.target and not draining:
+            if self.goodput:
+                level = self._fitting_level(self.goodput)
+            else:
+                # Nothing acked at all: no throughput figure, step by the size of the overshoot
+                level = min(len(self.ladder) - 1, level + max(1, int(worst / self.target)))
+        elif worst < 0.5 * self.target and now - self._changed_at >= self.hold:
+            level = max(0, level - 1)
+        if level == self.level:
+            return False
+
+        if level > self.level and self._raised_at is not None and now - self._raised_at < 2 * self.hold:
+            # The last step up did not hold: probe less often
+            self.hold = min(8 * self._base_hold, 2 * self.hold)
+        self._raised_at = now if level < self.level else None
+        if level == 0:
+            self.hold = self._base_hold
+        self.level = level
+        self._changed_seq = self._seq
+        self._changed_at = now
+        self.changes += 1
+        return True
+
+    def describe(self):
+        cap = "" if self.client_fps is None else f", client keeps up with {self.client_fps:.0f} FPS"
+        link = "" if self.goodput is None else f", link {self.goodput / 1e6:.1f} Mbit/s"
+        return f"q{self.quality} x{self.scale:g} {self.fps:.0f} FPS (latency {1000 * self.latency:.0f} ms{link}{cap})"
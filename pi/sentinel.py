@@ -0,0 +1,67 @@
+import time
+
+from presence import PresenceDetector
+
+SENTINEL = "sentinel"
+ACTIVE = "active"
+
+
+class Sentinel:
+    """
+    Duty cycle for unattended runs.
+
+    In SENTINEL the camera runs at `sentinel_fps` and only the small grey lores
+    frame is read and scored for motion; nothing is encoded except a keyframe
+    every `keyframe_interval` seconds so clients can see the robot is alive.
+    A hit escalates to ACTIVE (full frame rate, normal streaming) until nothing
+    has moved for `hold` seconds. Worst-case trigger-to-full-rate latency is one
+    sentinel frame interval plus the frame-rate switch.
+    """
+
+    def __init__(self, cam, sentinel_fps=2.0, active_fps=30.0, hold=20.0, keyframe_interval=30.0, detector=None):
+        self.cam = cam
+        self.sentinel_fps = float(sentinel_fps)
+        self.active_fps = float(active_fps)
+        self.hold = float(hold)
+        self.keyframe_interval = float(keyframe_interval)
+        # Lores frames are already small; a lower on-threshold since there are few pixels per animal
+        self.detector = detector or PresenceDetector(width=160, on=0.4, off=0.2, hold=0.0)
+        self.state = None
+        self.since = 0.0
+        self.triggered_at = None        # monotonic time of the last escalation
+        self.transitions = 0
+        self._last_hit = 0.0
+        self.last_score = 0.0
+        self._enter(SENTINEL, time.monotonic())
+
+    def _enter(self, state, now):
+        if state == self.state:
+            return
+        self.state = state
+        self.since = now
+        self.transitions += 1
+        self.cam.set_frame_rate(self.active_fps if state == ACTIVE else self.sentinel_fps)
+        if state == ACTIVE:
+            self.triggered_at = now
+        print(f"[SENTINEL] -> {state} (score {self.last_score:.2f})")
+
+    def update(self):
+        # SENTINEL: read and score one lores frame (paced by the camera frame rate)
+        return self.observe(self.cam.read_lores())
+
+    def observe(self, frame):
+        # Score a frame (lores grey, or the main frame while ACTIVE). Returns True on a state change.
+        now = time.monotonic()
+        self.last_score = self.detector.score(frame)
+        hit = self.last_score >= self.detector.on
+        if hit:
+            self._last_hit = now
+        before = self.state
+        if self.state == SENTINEL and hit:
+            self._enter(ACTIVE, now)
+        elif self.state == ACTIVE and now - self._last_hit > self.hold:
+            self._enter(SENTINEL, now)
+        return self.state != before
+
+    def tags(self):
+        return {"mode": self.state, "since": round(time.time() - (time.monotonic() - self.since), 1)}
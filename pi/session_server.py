@@ -0,0 +1,124 @@
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+
+from mux_protocol import CHANNELS, MuxConnection, read_json_line
+
+
+class SessionServer:
+    """
+    Optional single-connection alternative to the control/video/audio ports.
+
+    The client opens with {"session": id or null, "channels": [...]} and gets
+    {"session": id, "channels": [accepted], "resumed": bool} back, then both
+    sides speak MuxConnection. Each accepted channel runs the same handler the
+    legacy port runs, on a ChannelSocket:
+      handlers["control"](conn)        the robot control loop
+      handlers["video"](conn, addr)    video_streaming_server's client handshake
+      handlers["audio"](conn)          the audio streamer
+    and "telemetry" gets a JSON status line every `telemetry_interval` seconds.
+    Handlers are filled in by whoever owns them (video_streaming_server sets
+    its own once it is listening); channels without one are refused.
+
+    The session id survives reconnects: a client that comes back with its id
+    replaces the old connection instead of leaving it to time out.
+    """
+
+    def __init__(self, host='', port=5050, telemetry_interval=1.0, priorities=True):
+        self.host = host
+        self.port = port
+        self.telemetry_interval = float(telemetry_interval)
+        self.priorities = bool(priorities)
+        self.handlers = {}
+        self.sessions = {}          # session id -> MuxConnection
+        self.status = {}            # extra fields for telemetry (set by other components)
+        self._lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def _accept_loop(self):
+        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server_socket.bind((self.host, self.port))
+        server_socket.listen(4)
+        print(f"[SESSION] Listening on port {self.port}...")
+        while True:
+            conn, addr = server_socket.accept()
+            threading.Thread(target=self._open, args=(conn, addr), daemon=True).start()
+
+    def _open(self, conn, addr):
+        try:
+            conn.settimeout(5.0)
+            hello = read_json_line(conn)
+        except (OSError, ValueError, ConnectionError) as e:
+            print(f"[SESSION] bad hello from {addr}: {e}")
+            conn.close()
+            return
+        sid = hello.get("session") or uuid.uuid4().hex[:12]
+        wanted = hello.get("channels") or list(CHANNELS)
+        accepted = [c for c in wanted if c in CHANNELS and (c == "telemetry" or c in self.handlers)]
+        with self._lock:
+            old = self.sessions.get(sid)
+        resumed = old is not None
+        if old is not None:
+            old.close()
+        try:
+            reply = {"session": sid, "channels": accepted, "resumed": resumed}
+            conn.sendall((json.dumps(reply) + "\n").encode("utf-8"))
+        except OSError:
+            conn.close()
+            return
+
+        mux = MuxConnection(conn, priorities=self.priorities, on_close=lambda m: self._closed(sid, m))
+        with self._lock:
+            self.sessions[sid] = mux
+        mux.start()
+        print(f"[SESSION] {sid} {'resumed' if resumed else 'opened'} from {addr}: {', '.join(accepted)}")
+        for name in accepted:
+            chan = mux.channel(name)
+            if name == "telemetry":
+                target, args = self._telemetry, (mux, chan)
+            elif name == "video":
+                target, args = self.handlers[name], (chan, addr)
+            else:
+                target, args = self.handlers[name], (chan,)
+            threading.Thread(target=self._run_channel, args=(sid, name, target, args), daemon=True).start()
+
+    def _run_channel(self, sid, name, target, args):
+        try:
+            target(*args)
+        except Exception as e:
+            print(f"[SESSION] {sid} {name} channel error: {e}")
+
+    def _closed(self, sid, mux):
+        with self._lock:
+            if self.sessions.get(sid) is mux:
+                del self.sessions[sid]
+        print(f"[SESSION] {sid} closed")
+
+    def _telemetry(self, mux, chan):
+        t0 = time.monotonic()
+        while mux.alive:
+            msg = {"t": round(time.time(), 3), "uptime": round(time.monotonic() - t0, 1),
+                   "load": round(os.getloadavg()[0], 2), "sessions": len(self.sessions)}
+            temp = _cpu_temp()
+            if temp is not None:
+                msg["temp"] = temp
+            msg.update(self.status)
+            try:
+                chan.sendall((json.dumps(msg) + "\n").encode("utf-8"))
+            except OSError:
+                break
+            time.sleep(self.telemetry_interval)
+
+
+def _cpu_temp():
+    try:
+        with open("/sys/class/thermal/thermal_zone0/temp") as f:
+            return round(int(f.read()) / 1000.0, 1)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,134 @@
+import json
+import os
+import queue
+import socket
+import threading
+import time
+
+import cv2
+
+
+class StillServer:
+    """
+    Full-sensor-resolution stills on request, delivered on a side channel.
+
+    The control server calls request(id) for "SNAP <id>"; the capture loop
+    notices pending(), grabs one full-resolution frame between stream frames and
+    hands it to submit(). Encoding and sending happen here on a low-priority
+    thread: the socket is marked background class (DSCP CS1) with a small send
+    buffer, and data goes out in chunks paced to `rate` bytes/s, so a multi-MB
+    still never stalls the live video writers.
+
+    Wire format per still: one JSON header line, then `size` bytes of JPEG.
+    """
+
+    def __init__(self, host='', port=8002, quality=92, chunk=32 * 1024, rate=512 * 1024):
+        self.host = host
+        self.port = port
+        self.quality = int(quality)
+        self.chunk = int(chunk)
+        self.rate = float(rate)
+        self._requests = queue.Queue(maxsize=8)
+        self._frames = queue.Queue(maxsize=2)       # (ids, ts, frame) waiting for encode/send
+        self._conn = None
+        self._lock = threading.Lock()
+
+    # ----- control side -----
+    def request(self, req_id):
+        try:
+            self._requests.put_nowait(str(req_id))
+            return True
+        except queue.Full:
+            print(f"[STILL] request {req_id} dropped, too many pending")
+            return False
+
+    # ----- capture side -----
+    def pending(self):
+        return not self._requests.empty()
+
+    def take(self):
+        ids = []
+        while True:
+            try:
+                ids.append(self._requests.get_nowait())
+            except queue.Empty:
+                return ids
+
+    def submit(self, ids, frame, ts=None):
+        # One capture answers every request that was pending when it was taken
+        try:
+            self._frames.put_nowait((ids, time.time() if ts is None else ts, frame))
+        except queue.Full:
+            print(f"[STILL] sender busy, dropped still for {ids}")
+
+    # ----- side channel -----
+    def start(self):
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        threading.Thread(target=self._send_loop, daemon=True).start()
+
+    def _accept_loop(self):
+        server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server_socket.bind((self.host, self.port))
+        server_socket.listen(1)
+        print(f"[STILL] Listening on port {self.port}...")
+        while True:
+            conn, addr = server_socket.accept()
+            print(f"[STILL] client connected from {addr}")
+            try:
+                conn.setsockopt(socket.IPPROTO_IP, socket.IP_TOS, 0x20)   # CS1: background traffic
+                conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 64 * 1024)
+                conn.settimeout(10.0)
+            except Exception:
+                pass
+            with self._lock:
+                if self._conn is not None:
+                    try:
+                        self._conn.close()
+                    except Exception:
+                        pass
+                self._conn = conn
+
+    def _send_loop(self):
+        try:
+            # Linux: per-thread nice, so the (long) full-res encode yields to capture/stream threads
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+        except (AttributeError, OSError):
+            pass
+        enc = [int(cv2.IMWRITE_JPEG_QUALITY), self.quality]
+        while True:
+            ids, ts, frame = self._frames.get()
+            if frame.ndim == 3 and frame.shape[2] == 4:
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+            ok, jpeg = cv2.imencode(".jpg", frame, enc)
+            if not ok:
+                continue
+            data = jpeg.tobytes()
+            header = {"ids": ids, "ts": ts, "w": int(frame.shape[1]), "h": int(frame.shape[0]), "size": len(data)}
+            with self._lock:
+                conn = self._conn
+            if conn is None:
+                print(f"[STILL] no client connected, dropped still for {ids}")
+                continue
+            try:
+                self._send(conn, (json.dumps(header) + "\n").encode("utf-8") + data)
+                print(f"[STILL] sent {header['w']}x{header['h']} ({len(data) // 1024} KB) for {ids}")
+            except Exception as e:
+                print(f"[STILL] send failed: {e}")
+                with self._lock:
+                    if self._conn is conn:
+                        self._conn = None
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+    def _send(self, conn, data):
+        view = memoryview(data)
+        t0 = time.monotonic()
+        for off in range(0, len(view), self.chunk):
+            conn.sendall(view[off:off + self.chunk])
+            # Pace to `rate`: sleep until this many bytes are "due"
+            delay = (off + self.chunk) / self.rate - (time.monotonic() - t0)
+            if delay > 0:
+                time.sleep(delay)
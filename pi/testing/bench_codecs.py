@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+MJPEG vs H.264 on the Pi: CPU per frame against bandwidth and end-to-end latency.
+
+Synthetic 960x540 scenes (static with sensor noise, and the same scene with an
+animal crossing) are encoded with each codec. Per configuration the table shows
+encoder CPU ms/frame (process CPU time, so x264's worker threads count) and
+wall ms/frame, mean KB/frame and the resulting Mbit/s at --fps, PSNR of the
+decoded frames, and capture -> decoded latency when the stream is sent in real
+time over a loopback socket paced to --link-mbps (Wi-Fi stand-in; 0 = no cap).
+The replay never drops frames, so a codec above the link rate shows up as a
+growing queue (the live server would drop frames instead).
+
+Run on the Pi for real CPU numbers: python pi/testing/bench_codecs.py
+H.264 rows need PyAV (pip install av) on both ends.
+"""
+
+import argparse
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(1, os.path.join(HERE, "..", "..", "laptop"))
+from delta_compositor import DeltaCompositor, is_delta  # noqa: E402
+from frame_tags import read_tags  # noqa: E402
+from video_codecs import available_codecs, make_encoder  # noqa: E402
+from video_decoders import H264Decoder, is_h264  # noqa: E402
+from video_server import SyntheticCamera  # noqa: E402
+
+
+def psnr(a, b):
+    mse = np.mean((a.astype(np.float32) - b.astype(np.float32)) ** 2)
+    return 99.0 if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+
+class Decoder:
+    # Same dispatch as VideoClient._decode, full resolution
+    def __init__(self):
+        self.delta = DeltaCompositor()
+        self.h264 = None
+
+    def __call__(self, data):
+        if is_delta(data):
+            return self.delta.apply(data)
+        if is_h264(data):
+            if self.h264 is None:
+                self.h264 = H264Decoder()
+            return self.h264.decode(data)
+        frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        tags = read_tags(data) or {}
+        if "dseq" in tags:
+            self.delta.keyframe(frame, tags)
+        return frame
+
+
+def encode_all(name, frames, fps, quality, opts):
+    enc = make_encoder(name, quality=quality, **opts)
+    out, cpu, wall, keys = [], [], [], 0
+    for i, f in enumerate(frames):
+        c0, w0 = time.process_time(), time.perf_counter()
+        data, key = enc.encode(f, now=i / fps)
+        cpu.append(time.process_time() - c0)
+        wall.append(time.perf_counter() - w0)
+        out.append(data)
+        keys += bool(key)
+    enc.close()
+    return out, cpu, wall, keys
+
+
+def stream_latency(payloads, wall, fps, link_mbps):
+    # Replays the encoded stream in real time: frame i is captured at t0 + i/fps, ready after its
+    # encode time, serialized at the link rate, then decoded on the other end
+    a, b = socket.socketpair()
+    t0 = time.perf_counter() + 0.2
+    lat = []
+
+    def sender():
+        link_free = 0.0
+        for i, data in enumerate(payloads):
+            if data is None:
+                continue
+            ready = t0 + i / fps + wall[i]
+            if link_mbps > 0:
+                link_free = max(link_free, ready) + len(data) * 8 / (link_mbps * 1e6)
+                ready = link_free
+            time.sleep(max(0.0, ready - time.perf_counter()))
+            a.sendall(struct.pack(">II", len(data), i) + data)
+        a.close()
+
+    threading.Thread(target=sender, daemon=True).start()
+    decode = Decoder()
+    f = b.makefile("rb")
+    while True:
+        head = f.read(8)
+        if len(head) < 8:
+            break
+        n, i = struct.unpack(">II", head)
+        if decode(f.read(n)) is not None:
+            lat.append(time.perf_counter() - (t0 + i / fps))
+    b.close()
+    return lat
+
+
+def run(label, name, frames, args, opts):
+    payloads, cpu, wall, keys = encode_all(name, frames, args.fps, args.quality, opts)
+    decode = Decoder()
+    quality_db = []
+    for data, f in zip(payloads, frames):
+        out = decode(data) if data is not None else None
+        if out is not None:
+            quality_db.append(psnr(out, f))
+    sizes = [len(p) for p in payloads if p is not None]
+    lat = stream_latency(payloads, wall, args.fps, args.link_mbps)
+    kb = np.mean(sizes) / 1024
+    print(f"  {label:28s} {1000 * np.mean(cpu):7.1f} {1000 * np.mean(wall):7.1f} {kb:8.1f} "
+          f"{kb * 8 * 1024 * args.fps / 1e6:7.2f} {np.mean(quality_db):6.1f} "
+          f"{1000 * np.percentile(lat, 50):7.1f} {1000 * np.percentile(lat, 95):7.1f} {keys:5d}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="MJPEG vs H.264: CPU, bandwidth and latency")
+    ap.add_argument("--frames", type=int, default=150)
+    ap.add_argument("--fps", type=float, default=30.0)
+    ap.add_argument("--quality", type=int, default=60, help="MJPEG quality (the stream default)")
+    ap.add_argument("--presets", nargs="+", default=["ultrafast", "veryfast"])
+    ap.add_argument("--bitrates", type=int, nargs="+", default=[800, 2000], help="H.264 kbit/s")
+    ap.add_argument("--gop", type=int, default=60)
+    ap.add_argument("--link-mbps", type=float, default=10.0, help="Link rate for the latency replay (0 = no cap)")
+    args = ap.parse_args()
+
+    h264 = "h264" in available_codecs()
+    if not h264:
+        print("PyAV not installed: H.264 rows skipped")
+    scenes = {
+        "static": SyntheticCamera(realtime=False, animal_every=0),
+        "animal crossing": SyntheticCamera(realtime=False, animal_every=4.0, animal_for=3.0),
+    }
+    for scene, cam in scenes.items():
+        frames = [cam.read() for _ in range(args.frames)]
+        print(f"\n{scene}: {len(frames)} frames 960x540 @ {args.fps:.0f} FPS, link {args.link_mbps:g} Mbit/s")
+        print(f"  {'codec':28s} {'cpu ms':>7s} {'wall ms':>7s} {'KB/frm':>8s} {'Mbit/s':>7s} {'PSNR':>6s} "
+              f"{'p50 ms':>7s} {'p95 ms':>7s} {'keys':>5s}")
+        run(f"mjpeg q{args.quality}", "mjpeg", frames, args, {})
+        if not h264:
+            continue
+        for preset in args.presets:
+            for kbps in args.bitrates:
+                opts = {"preset": preset, "gop": args.gop, "bitrate": kbps * 1000, "fps": args.fps}
+                run(f"h264 {preset} {kbps}k gop{args.gop}", "h264", frames, args, opts)
+
+
+if __name__ == "__main__":
+    main()
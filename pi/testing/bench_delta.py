@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Bandwidth and CPU of tile delta encoding vs plain MJPEG.
+
+Encodes synthetic 960x540 scenes (static with sensor noise, and a static scene
+with an animal crossing) both ways, rebuilds the delta stream with the
+laptop's DeltaCompositor and reports bytes/frame, encode ms/frame and the
+PSNR of the rebuilt frames against the camera frames.
+
+Run from the repo root: python pi/testing/bench_delta.py
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(1, os.path.join(HERE, "..", "..", "laptop"))
+from delta_codec import DeltaEncoder  # noqa: E402
+from delta_compositor import DeltaCompositor, is_delta  # noqa: E402
+from frame_tags import read_tags  # noqa: E402
+from video_server import SyntheticCamera  # noqa: E402
+
+
+def psnr(a, b):
+    mse = np.mean((a.astype(np.float32) - b.astype(np.float32)) ** 2)
+    return 99.0 if mse == 0 else 10 * np.log10(255.0 ** 2 / mse)
+
+
+def run(name, cam, n, fps, quality):
+    frames = [cam.read() for _ in range(n)]
+    enc = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
+
+    t0 = time.perf_counter()
+    mjpeg = [cv2.imencode(".jpg", f, enc)[1].tobytes() for f in frames]
+    t_mjpeg = (time.perf_counter() - t0) / n
+
+    delta = DeltaEncoder(quality=quality)
+    comp = DeltaCompositor()
+    sizes, keys, quality_db = [], 0, []
+    t_enc = 0.0
+    for i, f in enumerate(frames):
+        t0 = time.perf_counter()
+        data, key = delta.encode(f, now=i / fps)
+        t_enc += time.perf_counter() - t0
+        sizes.append(len(data))
+        keys += key
+        if is_delta(data):
+            out = comp.apply(data)
+        else:
+            out = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            comp.keyframe(out, read_tags(data))
+        quality_db.append(psnr(out, f))
+
+    ref_db = np.mean([psnr(cv2.imdecode(np.frombuffer(m, np.uint8), cv2.IMREAD_COLOR), f)
+                      for m, f in zip(mjpeg[::10], frames[::10])])
+    full = np.mean([len(m) for m in mjpeg])
+    print(f"--- {name}: {n} frames ---")
+    print(f"mjpeg : {full / 1024:7.1f} KB/frame  {1000 * t_mjpeg:5.2f} ms/frame  PSNR {ref_db:5.1f} dB")
+    print(f"delta : {np.mean(sizes) / 1024:7.1f} KB/frame  {1000 * t_enc / n:5.2f} ms/frame  "
+          f"PSNR {np.mean(quality_db):5.1f} dB  ({keys} keyframes, {full / np.mean(sizes):.1f}x smaller)")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark tile delta encoding")
+    ap.add_argument("--frames", type=int, default=300)
+    ap.add_argument("--fps", type=float, default=30.0)
+    ap.add_argument("--quality", type=int, default=60)
+    args = ap.parse_args()
+
+    cv2.setNumThreads(1)
+    run("static scene", SyntheticCamera(fps=args.fps, animal_every=0, realtime=False), args.frames, args.fps, args.quality)
+    run("animal crossing", SyntheticCamera(fps=args.fps, animal_every=10, animal_for=4, realtime=False),
+        args.frames, args.fps, args.quality)
+
+
+if __name__ == "__main__":
+    main()
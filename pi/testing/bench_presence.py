@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+CPU cost and hit rate of the on-Pi presence pre-filter.
+
+Runs PresenceDetector over (a) the synthetic camera (known ground truth: a blob
+crosses the scene 4 s out of every 10) and (b) stills from laptop/stored_image
+replayed as a 960x540 sequence, interleaved with empty-scene stretches. Reports
+ms/frame for scoring vs JPEG encode and the frames/bytes that would actually be
+sent with presence gating, so it can be checked against the Pi Zero 2 W budget.
+
+Run from the repo root: python pi/testing/bench_presence.py [--onnx model.onnx]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from presence import PresenceDetector  # noqa: E402
+from video_server import SyntheticCamera  # noqa: E402
+
+
+def synthetic_frames(n, fps):
+    cam = SyntheticCamera(fps=fps, realtime=False)
+    out = []
+    for _ in range(n):
+        t = cam.scene_time()
+        out.append((cam.read(), cam.animal_visible(t)))
+    return out
+
+
+def replayed_frames(image_dir, fps, hold=3.0, gap=8.0):
+    # Each still is "walked" across an empty background for `hold` s, then `gap` s of empty scene
+    paths = sorted(glob.glob(os.path.join(image_dir, "*.png")))
+    if not paths:
+        return []
+    rng = np.random.default_rng(1)
+    bg = cv2.GaussianBlur(rng.integers(60, 160, (540, 960, 3), dtype=np.uint8), (31, 31), 0)
+    out = []
+    for path in paths:
+        img = cv2.imread(path, cv2.IMREAD_COLOR)
+        if img is None:
+            continue
+        crop = cv2.resize(img, (240, 136), interpolation=cv2.INTER_AREA)
+        for k in range(int(hold * fps)):
+            f = bg.copy()
+            x = 40 + 4 * k
+            f[300:436, x:x + 240] = crop
+            out.append((f, True))
+        out.extend((bg, False) for _ in range(int(gap * fps)))
+    return out
+
+
+def run(name, frames, onnx, fps, idle_interval, quality):
+    det = PresenceDetector(onnx_path=onnx)
+    enc = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
+    t_score, t_enc, sent_bytes, all_bytes, sent = 0.0, 0.0, 0, 0, 0
+    tp = fp = fn = 0
+    last_sent = -1e9
+    for i, (frame, truth) in enumerate(frames):
+        now = i / fps
+        t0 = time.perf_counter()
+        present = det.present(det.score(frame), now)
+        t1 = time.perf_counter()
+        ok, jpeg = cv2.imencode(".jpg", frame, enc)
+        t2 = time.perf_counter()
+        t_score += t1 - t0
+        t_enc += t2 - t1
+        all_bytes += len(jpeg)
+        if present or now - last_sent >= idle_interval:
+            sent += 1
+            sent_bytes += len(jpeg)
+            last_sent = now
+        tp += present and truth
+        fp += present and not truth
+        fn += truth and not present
+    n = len(frames)
+    ms_score, ms_enc = 1000 * t_score / n, 1000 * t_enc / n
+    # Per-second CPU: always score; encode only what is sent (ungated: encode everything)
+    gated = ms_score * fps + ms_enc * sent / n * fps
+    ungated = ms_enc * fps
+    print(f"--- {name}: {n} frames @ {fps:.0f} FPS ---")
+    print(f"score  : {ms_score:6.2f} ms/frame   encode: {ms_enc:6.2f} ms/frame")
+    print(f"sent   : {sent}/{n} frames, {sent_bytes / 1e6:.1f} of {all_bytes / 1e6:.1f} MB "
+          f"({100 * sent_bytes / max(1, all_bytes):.0f}%)")
+    print(f"recall : {tp / max(1, tp + fn):.2f}   false-present frames: {fp}")
+    print(f"CPU    : {gated:.0f} ms/s gated vs {ungated:.0f} ms/s ungated (1000 ms/s = one core)")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the Pi presence pre-filter")
+    ap.add_argument("--onnx", default=None)
+    ap.add_argument("--images", default="laptop/stored_image")
+    ap.add_argument("--frames", type=int, default=600)
+    ap.add_argument("--fps", type=float, default=30.0)
+    ap.add_argument("--idle-interval", type=float, default=2.0)
+    ap.add_argument("--quality", type=int, default=60)
+    args = ap.parse_args()
+
+    cv2.setNumThreads(1)    # the Pi loop is single-threaded next to the encoder
+    run("synthetic", synthetic_frames(args.frames, args.fps), args.onnx, args.fps, args.idle_interval, args.quality)
+    frames = replayed_frames(args.images, args.fps)
+    if frames:
+        run("replayed", frames, args.onnx, args.fps, args.idle_interval, args.quality)
+
+
+if __name__ == "__main__":
+    main()
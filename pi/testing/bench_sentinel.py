@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Average CPU and trigger latency of sentinel mode vs always-on streaming.
+
+Drives the synthetic camera in real time (an "animal" crosses for --animal-for
+seconds every --animal-every seconds) through the same capture/encode steps as
+video_streaming_server, once flat out and once with Sentinel. CPU is process
+time per wall second; latency is from the animal appearing to the first frame
+captured at full rate.
+
+Run from the repo root: python pi/testing/bench_sentinel.py [--seconds 60]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from sentinel import ACTIVE, SENTINEL, Sentinel  # noqa: E402
+from video_server import SyntheticCamera  # noqa: E402
+
+ENC = [int(cv2.IMWRITE_JPEG_QUALITY), 60]
+
+
+def always_on(cam, seconds):
+    frames = 0
+    c0, t0 = time.process_time(), time.monotonic()
+    while time.monotonic() - t0 < seconds:
+        cv2.imencode(".jpg", cam.read(), ENC)
+        frames += 1
+    wall = time.monotonic() - t0
+    return (time.process_time() - c0) / wall, frames / wall
+
+
+def sentinel(cam, seconds, args):
+    duty = Sentinel(cam, sentinel_fps=args.sentinel_fps, active_fps=args.fps, hold=args.hold, keyframe_interval=30.0)
+    frames, latencies = 0, []
+    escalated = False
+    last_sent = 0.0
+    c0, t0 = time.process_time(), time.monotonic()
+    while time.monotonic() - t0 < seconds:
+        if duty.state == SENTINEL:
+            changed = duty.update()
+            escalated = duty.state == ACTIVE
+            if duty.state == SENTINEL:
+                now = time.monotonic()
+                if changed or now - last_sent >= duty.keyframe_interval:
+                    cv2.imencode(".jpg", cam.read(), ENC)
+                    last_sent = now
+                continue
+        frame = cam.read()
+        t = cam.scene_time()
+        if escalated and t > args.animal_every:
+            # Scene time since this crossing began (the first one starts before the background exists)
+            latencies.append(t % args.animal_every)
+        escalated = False
+        duty.observe(frame)
+        cv2.imencode(".jpg", frame, ENC)
+        frames += 1
+    wall = time.monotonic() - t0
+    return (time.process_time() - c0) / wall, frames / wall, latencies, duty.transitions
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark sentinel duty cycling")
+    ap.add_argument("--seconds", type=float, default=60.0)
+    ap.add_argument("--fps", type=float, default=30.0)
+    ap.add_argument("--sentinel-fps", type=float, default=2.0)
+    ap.add_argument("--hold", type=float, default=5.0)
+    ap.add_argument("--animal-every", type=float, default=30.0)
+    ap.add_argument("--animal-for", type=float, default=3.0)
+    args = ap.parse_args()
+
+    cv2.setNumThreads(1)
+    kw = dict(fps=args.fps, animal_every=args.animal_every, animal_for=args.animal_for)
+    cpu_on, fps_on = always_on(SyntheticCamera(**kw), args.seconds)
+    cpu_s, fps_s, lat, transitions = sentinel(SyntheticCamera(**kw), args.seconds, args)
+
+    print(f"always on : {100 * cpu_on:5.1f}% CPU  {fps_on:5.1f} frames/s")
+    print(f"sentinel  : {100 * cpu_s:5.1f}% CPU  {fps_s:5.1f} full-rate frames/s  ({transitions} transitions)")
+    print(f"saving    : {cpu_on / max(cpu_s, 1e-6):.1f}x average CPU")
+    if lat:
+        print(f"trigger -> full rate: mean {1000 * sum(lat) / len(lat):.0f} ms, max {1000 * max(lat):.0f} ms "
+              f"over {len(lat)} triggers")
+    else:
+        print("no triggers observed; increase --seconds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# test_pi_*.py need the Pi's UART / GPIO / camera and are run by hand on the robot, not collected
+collect_ignore_glob = ["test_pi_*.py"]
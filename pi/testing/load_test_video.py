@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Fan-out load test for the video server: many viewers, slow ones and stalled ones.
+
+Starts video_streaming_server on the synthetic camera in a child process
+(so its CPU and memory can be read from /proc) and connects synthetic
+subscribers given as count:rate groups:
+  full      read as fast as frames come
+  <fps>     read at most this many frames per second (slow Wi-Fi, slow laptop)
+  stall     connect, then never read
+  stall@<s> read normally for <s> seconds, then stop reading
+Subscribers have a small receive buffer, so backpressure reaches the server
+the way a slow link does.
+
+The "full" readers run the whole test. Every other group joins halfway, so
+the first half is the baseline and the second half shows what the slow
+clients cost. Frames carry the server's sequence number and capture time,
+so each client reports:
+- FPS
+- drops: frames the server captured that it never got
+- latency
+- whether the server cut it off
+
+The server's capture rate is read off the sequence numbers, CPU and RSS
+from /proc. The test fails if, with the slow clients connected, the
+capture rate or the full-rate readers' FPS drops more than 10%, or their
+p95 latency grows by more than half.
+
+Run from the repo root: python pi/testing/load_test_video.py [--clients 4:full,2:5,2:1,2:stall,1:stall@3]
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(__file__)
+sys.path.insert(0, os.path.join(HERE, ".."))
+from frame_tags import read_tags  # noqa: E402
+
+SERVER = """
+import sys
+sys.path.insert(0, {pi!r})
+from video_server import video_streaming_server
+video_streaming_server(host="127.0.0.1", port={port}, camera="synthetic", jpeg_quality={quality},
+                       rate_control=True, target_latency=1e9)
+"""
+
+
+def free_port():
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def parse_clients(text):
+    # "4:full,2:5,1:stall@3" -> [(name, rate or None, stall_after or None)]
+    out = []
+    for part in text.split(","):
+        count, kind = part.split(":")
+        if kind == "full":
+            rate, stall = None, None
+        elif kind.startswith("stall"):
+            rate, stall = None, float(kind[6:]) if "@" in kind else 0.0
+        else:
+            rate, stall = float(kind), None
+        out += [(f"{kind}#{i + 1}", rate, stall) for i in range(int(count))]
+    return out
+
+
+class Subscriber(threading.Thread):
+    def __init__(self, name, port, rate=None, stall_after=None, rcvbuf=64 * 1024):
+        super().__init__(daemon=True)
+        self.name = name
+        self.port = port
+        self.rate = rate
+        self.stall_after = stall_after
+        self.rcvbuf = rcvbuf
+        self.frames = []        # (receive time, seq, latency)
+        self.closed_at = None   # when the server hung up on us
+        self.error = None
+        self.running = True
+        self.t0 = None
+
+    def run(self):
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.rcvbuf)
+            sock.connect(("127.0.0.1", self.port))
+            sock.sendall(b'{"codecs": ["mjpeg"], "acks": false}\n')
+            self.t0 = time.monotonic()
+            f = sock.makefile("rb")
+            f.readline()
+            next_read = self.t0
+            while self.running:
+                now = time.monotonic()
+                if self.stall_after is not None and now - self.t0 >= self.stall_after:
+                    self._stall(sock)
+                    break
+                if self.rate:
+                    if next_read > now:
+                        time.sleep(next_read - now)
+                    next_read = max(next_read + 1.0 / self.rate, time.monotonic() - 1.0)
+                head = f.read(4)
+                if len(head) < 4:
+                    self.closed_at = time.monotonic()
+                    break
+                data = f.read(int.from_bytes(head, "big"))
+                tags = read_tags(data) or {}
+                self.frames.append((time.monotonic(), tags.get("f"), time.time() - tags.get("t", time.time())))
+        except OSError as e:
+            self.error = str(e)
+            self.closed_at = time.monotonic()
+
+    def _stall(self, sock):
+        # Stop reading. Unread data hides the server's FIN, so notice it giving up on us (its send
+        # timeout) by writing: a blank line is ignored by the server, a closed socket answers with RST
+        while self.running:
+            time.sleep(0.25)
+            try:
+                sock.send(b"\n")
+            except OSError:
+                self.closed_at = time.monotonic()
+                return
+
+    def window(self, start, end):
+        # -> (fps, drops, p50 ms, p95 ms) over [start, end)
+        rows = [r for r in self.frames if start <= r[0] < end]
+        if not rows:
+            return 0.0, 0, None, None
+        seqs = [s for _, s, _ in rows if s is not None]
+        drops = sum(max(0, b - a - 1) for a, b in zip(seqs, seqs[1:]))
+        lat = 1000 * np.array([r[2] for r in rows])
+        return len(rows) / (end - start), drops, float(np.percentile(lat, 50)), float(np.percentile(lat, 95))
+
+
+class ProcSampler(threading.Thread):
+    # CPU% (of one core) and RSS of a process, once a second, from /proc
+    def __init__(self, pid):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.samples = []       # (time, cpu %, rss MB, threads)
+        self.running = True
+
+    def _read(self):
+        with open(f"/proc/{self.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        ticks = int(fields[11]) + int(fields[12])       # utime + stime
+        rss = threads = 0
+        with open(f"/proc/{self.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1]) / 1024
+                elif line.startswith("Threads:"):
+                    threads = int(line.split()[1])
+        return ticks, rss, threads
+
+    def run(self):
+        hz = os.sysconf("SC_CLK_TCK")
+        try:
+            last_ticks, _, _ = self._read()
+            last_t = time.monotonic()
+            while self.running:
+                time.sleep(1.0)
+                ticks, rss, threads = self._read()
+                now = time.monotonic()
+                self.samples.append((now, 100 * (ticks - last_ticks) / hz / (now - last_t), rss, threads))
+                last_ticks, last_t = ticks, now
+        except OSError:
+            pass
+
+    def window(self, start, end):
+        rows = [s for s in self.samples if start <= s[0] <= end]
+        if not rows:
+            return None, None, None
+        return np.mean([r[1] for r in rows]), max(r[2] for r in rows), max(r[3] for r in rows)
+
+
+def capture_rate(subs, start, end):
+    # Server frames per second from the sequence numbers the fastest reader saw
+    best = None
+    for s in subs:
+        rows = [(t, q) for t, q, _ in s.frames if start <= t < end and q is not None]
+        if len(rows) >= 2 and (best is None or len(rows) > best[0]):
+            best = (len(rows), (rows[-1][1] - rows[0][1]) / (rows[-1][0] - rows[0][0]))
+    return None if best is None else best[1]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Video server fan-out load test")
+    ap.add_argument("--clients", default="4:full,2:5,2:1,2:stall,1:stall@3",
+                    help="count:rate groups; rate is full, an FPS, stall or stall@<seconds>")
+    ap.add_argument("--duration", type=float, default=30.0, help="seconds; slow clients join halfway")
+    ap.add_argument("--quality", type=int, default=60)
+    ap.add_argument("--verbose", action="store_true", help="show the server's output")
+    args = ap.parse_args()
+
+    port = free_port()
+    code = SERVER.format(pi=os.path.abspath(os.path.join(HERE, "..")), port=port, quality=args.quality)
+    out = None if args.verbose else subprocess.DEVNULL
+    server = subprocess.Popen([sys.executable, "-c", code], stdout=out, stderr=out)
+    try:
+        deadline = time.monotonic() + 10.0
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1.0).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise SystemExit("video server did not start")
+                time.sleep(0.2)
+        sampler = ProcSampler(server.pid)
+        sampler.start()
+
+        specs = parse_clients(args.clients)
+        fast = [Subscriber(n, port, r, s) for n, r, s in specs if r is None and s is None]
+        slow = [Subscriber(n, port, r, s) for n, r, s in specs if not (r is None and s is None)]
+        t0 = time.monotonic()
+        for s in fast:
+            s.start()
+        half = t0 + args.duration / 2
+        time.sleep(max(0.0, half - time.monotonic()))
+        for s in slow:
+            s.start()
+        time.sleep(max(0.0, t0 + args.duration - time.monotonic()))
+        t_end = time.monotonic()
+        for s in fast + slow:
+            s.running = False
+    finally:
+        server.terminate()
+        server.wait(timeout=5.0)
+
+    # Skip the first second of each half: connections and encoders are still settling
+    phases = {"baseline": (t0 + 1.0, half), "loaded": (half + 1.0, t_end)}
+    print(f"{len(fast)} full-rate readers for {args.duration:g} s; {len(slow)} slow/stalled join at "
+          f"{args.duration / 2:g} s")
+    print(f"\n  {'phase':<9s} {'capture FPS':>11s} {'server CPU %':>12s} {'RSS MB':>7s} {'threads':>7s}")
+    rates = {}
+    for name, (a, b) in phases.items():
+        rates[name] = capture_rate(fast, a, b)
+        cpu, rss, threads = sampler.window(a, b)
+        print(f"  {name:<9s} {rates[name] or 0:11.1f} {cpu or 0:12.0f} {rss or 0:7.0f} {threads or 0:7d}")
+
+    print(f"\n  {'client':<12s} {'phase':<9s} {'FPS':>5s} {'drops':>6s} {'drop %':>6s} {'p50 ms':>7s} "
+          f"{'p95 ms':>7s}  server")
+    per_phase = {}
+    for s in fast + slow:
+        for name, (a, b) in phases.items():
+            if s in slow and name == "baseline":
+                continue
+            fps, drops, p50, p95 = s.window(a, b)
+            per_phase[(s.name, name)] = (fps, p95)
+            total = fps * (b - a) + drops
+            cut = ""
+            if s.closed_at is not None and s.t0 is not None and s.closed_at < t_end:
+                cut = f"closed after {s.closed_at - s.t0:.1f} s"
+            print(f"  {s.name:<12s} {name:<9s} {fps:5.1f} {drops:6d} {100 * drops / max(1, total):6.0f} "
+                  f"{p50 if p50 is not None else float('nan'):7.0f} {p95 if p95 is not None else float('nan'):7.0f}"
+                  f"  {cut}")
+
+    # ----- verdict -----
+    failures = []
+    if rates["baseline"] and (rates["loaded"] or 0) < 0.9 * rates["baseline"]:
+        failures.append(f"capture rate fell from {rates['baseline']:.1f} to {rates['loaded'] or 0:.1f} FPS")
+    for s in fast:
+        fps0, p95_0 = per_phase[(s.name, "baseline")]
+        fps1, p95_1 = per_phase[(s.name, "loaded")]
+        if fps1 < 0.9 * fps0:
+            failures.append(f"{s.name}: {fps0:.1f} -> {fps1:.1f} FPS")
+        if p95_0 is not None and p95_1 is not None and p95_1 > 1.5 * p95_0 + 10:
+            failures.append(f"{s.name}: p95 latency {p95_0:.0f} -> {p95_1:.0f} ms")
+    print()
+    if failures:
+        print("FAIL: slow clients degraded the stream")
+        for f in failures:
+            print(f"  {f}")
+        sys.exit(1)
+    print("PASS: capture rate and full-rate readers unaffected by slow and stalled clients")
+
+
+if __name__ == "__main__":
+    main()
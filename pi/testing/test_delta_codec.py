@@ -0,0 +1,70 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from delta_codec import DeltaEncoder
+from frame_tags import read_tags
+
+# The decoder half lives on the laptop; appended so the Pi's own modules still win
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "laptop"))
+from delta_compositor import DeltaCompositor, is_delta  # noqa: E402
+
+
+def scene(seed=0):
+    rng = np.random.default_rng(seed)
+    return cv2.GaussianBlur(rng.integers(0, 255, (270, 480, 3), dtype=np.uint8), (9, 9), 0)
+
+
+def decode(comp, payload):
+    if is_delta(payload):
+        return comp.apply(payload)
+    frame = cv2.imdecode(np.frombuffer(payload, np.uint8), cv2.IMREAD_COLOR)
+    comp.keyframe(frame, read_tags(payload))
+    return frame
+
+
+def test_only_changed_tiles_are_sent_and_composited():
+    enc, comp = DeltaEncoder(quality=90, key_interval=60), DeltaCompositor()
+    base = scene()
+    key, is_key = enc.encode(base, tags={"fid": 1}, now=0.0)
+    assert is_key and not is_delta(key)
+    key_frame = decode(comp, key).copy()
+
+    moved = base.copy()
+    moved[64:128, 128:256] = 255          # two tiles in one row -> one strip
+    delta, is_key = enc.encode(moved, tags={"fid": 2}, now=0.1)
+    assert not is_key and is_delta(delta) and len(delta) < len(key) // 4
+    out = decode(comp, delta)
+    assert comp.tags == {"fid": 2}
+    assert np.abs(out[64:128, 128:256].astype(int) - 255).mean() < 3
+    # Everything outside the strip is the keyframe, untouched
+    out[64:128, 128:256] = key_frame[64:128, 128:256]
+    assert np.array_equal(out, key_frame)
+
+    still, is_key = enc.encode(moved, now=0.2)
+    assert not is_key and len(still) < 40     # header only, no runs
+    assert decode(comp, still) is not None
+
+
+def test_dropped_delta_is_skipped_until_keyframe():
+    enc, comp = DeltaEncoder(key_interval=60), DeltaCompositor()
+    base = scene()
+    decode(comp, enc.encode(base, now=0.0)[0])
+    changed = base.copy()
+    changed[:64, :64] = 0
+    enc.encode(changed, now=0.1)                 # lost on the way
+    changed[:64, 64:128] = 0
+    assert decode(comp, enc.encode(changed, now=0.2)[0]) is None
+    assert comp.skipped == 1
+    enc.force_key = True
+    payload, is_key = enc.encode(changed, now=0.3)
+    assert is_key and decode(comp, payload) is not None
+
+
+def test_large_change_falls_back_to_keyframe():
+    enc = DeltaEncoder(key_interval=60, max_changed=0.5)
+    enc.encode(scene(0), now=0.0)
+    _, is_key = enc.encode(scene(1), now=0.1)
+    assert is_key
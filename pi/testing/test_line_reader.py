@@ -0,0 +1,28 @@
+import socket
+
+from line_reader import read_lines
+
+
+def lines_from(*chunks):
+    a, b = socket.socketpair()
+    with a:
+        for chunk in chunks:
+            a.sendall(chunk)
+    with b:
+        return list(read_lines(b, bufsize=4))
+
+
+def test_command_split_across_reads():
+    assert lines_from(b"SN", b"AP 3", b"\nF500\n") == ["SNAP 3", "F500"]
+
+
+def test_several_commands_in_one_read():
+    assert lines_from(b"PING 1\nF500\r\nSNAP 2\n") == ["PING 1", "F500", "SNAP 2"]
+
+
+def test_partial_line_at_disconnect_is_dropped():
+    assert lines_from(b"F000\nSNA") == ["F000"]
+
+
+def test_blank_lines_skipped():
+    assert lines_from(b"\n\nI000\n\n") == ["I000"]
@@ -0,0 +1,115 @@
+import json
+import queue
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+# Per-datagram header: frame id, fragment index, fragment count, send time (unix s)
+FRAG_HDR = struct.Struct(">IHHd")
+MTU_PAYLOAD = 1400 - FRAG_HDR.size     # stays under a 1500-byte Ethernet/Wi-Fi MTU with IP/UDP headers
+HELLO = b"HELLO"
+PARITY = 0x8000     # fragment index flag: XOR parity of a group, index = PARITY | group << 4 | group size
+
+
+def fragment(frame_id, data, ts, payload=MTU_PAYLOAD, fec=8):
+    # Data fragments, plus (fec > 0) one XOR parity datagram per `fec` fragments,
+    # which lets the receiver rebuild any single lost fragment of that group.
+    count = max(1, -(-len(data) // payload))
+    fid = frame_id & 0xFFFFFFFF
+    for idx in range(count):
+        yield FRAG_HDR.pack(fid, idx, count, ts) + data[idx * payload:(idx + 1) * payload]
+    if not fec:
+        return
+    padded = np.zeros(count * payload, np.uint8)
+    padded[:len(data)] = np.frombuffer(data, np.uint8)
+    padded = padded.reshape(count, payload)
+    for g, start in enumerate(range(0, count, fec)):
+        parity = np.bitwise_xor.reduce(padded[start:start + fec], axis=0)
+        yield FRAG_HDR.pack(fid, PARITY | (g << 4) | fec, count, ts) + parity.tobytes()
+
+
+class UdpVideoSender:
+    """
+    Optional UDP transport next to the TCP video server.
+
+    Clients subscribe by sending HELLO (or any feedback datagram) to the video
+    port and stay subscribed while feedback keeps arriving. Each frame is split
+    into MTU-sized fragments; nothing is ever retransmitted, so a lost fragment
+    costs at most one frame instead of stalling every frame behind it, and with
+    `fec` one XOR parity datagram per group repairs a single loss. Receivers
+    report loss in JSON feedback datagrams, kept per client in `feedback`.
+    """
+
+    def __init__(self, host='', port=8000, client_timeout=5.0, payload=MTU_PAYLOAD, fec=8):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1024 * 1024)
+        self.sock.bind((host, port))
+        self.port = self.sock.getsockname()[1]
+        self.client_timeout = float(client_timeout)
+        self.payload = int(payload)
+        self.fec = min(15, int(fec))    # 0 = no parity
+        self.clients = {}           # addr -> last feedback time
+        self.feedback = {}          # addr -> last feedback dict
+        self._lock = threading.Lock()
+        self._q = queue.Queue(maxsize=1)  # latest frame only, like ClientWriter
+        self._frame_id = 0
+        self.on_need_key = None     # delta mode: called when a delta had to be dropped here
+        print(f"[VIDEO] UDP transport on port {self.port}")
+        threading.Thread(target=self._recv_loop, daemon=True).start()
+        threading.Thread(target=self._send_loop, daemon=True).start()
+
+    def _recv_loop(self):
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(2048)
+            except OSError:
+                return
+            now = time.monotonic()
+            with self._lock:
+                if addr not in self.clients:
+                    print(f"[VIDEO] UDP client subscribed from {addr}")
+                self.clients[addr] = now
+            if data != HELLO:
+                try:
+                    fb = json.loads(data)
+                except ValueError:
+                    continue
+                prev = self.feedback.get(addr)
+                self.feedback[addr] = fb
+                if fb.get("loss", 0) > 0.05 and (prev is None or prev.get("loss", 0) <= 0.05):
+                    print(f"[VIDEO] UDP client {addr} reports {100 * fb['loss']:.0f}% frame loss")
+
+    def push(self, data, key=True):
+        try:
+            if self._q.full():
+                self._q.get_nowait()
+                if not key and self.on_need_key is not None:
+                    self.on_need_key()
+            self._q.put_nowait(data)
+        except (queue.Full, queue.Empty):
+            pass
+
+    def _send_loop(self):
+        while True:
+            data = self._q.get()
+            now = time.monotonic()
+            with self._lock:
+                for addr, seen in list(self.clients.items()):
+                    if now - seen > self.client_timeout:
+                        del self.clients[addr]
+                        self.feedback.pop(addr, None)
+                        print(f"[VIDEO] UDP client {addr} timed out")
+                addrs = list(self.clients)
+            if not addrs:
+                continue
+            self._frame_id += 1
+            frags = list(fragment(self._frame_id, data, time.time(), self.payload, self.fec))
+            for addr in addrs:
+                for pkt in frags:
+                    try:
+                        self.sock.sendto(pkt, addr)
+                    except OSError:
+                        break       # e.g. unreachable: the rest of this frame is lost anyway
@@ -0,0 +1,145 @@
+import json
+import struct
+import time
+from fractions import Fraction
+
+import cv2
+
+from delta_codec import DeltaEncoder
+from frame_tags import tag_jpeg
+
+try:
+    import av
+    from av.video.frame import PictureType
+except ImportError:     # H.264 is optional; MJPEG/delta need only OpenCV
+    av = None
+
+# H.264 payload: MAGIC, tags length, tags JSON, then one Annex-B access unit
+H264_MAGIC = b"WAVC"
+H264_HDR = struct.Struct(">H")
+
+CODECS = ("mjpeg", "delta", "h264")
+
+
+class MjpegEncoder:
+    """Every frame an independent JPEG; tags go in a COM segment."""
+
+    name = "mjpeg"
+
+    def __init__(self, quality=60):
+        self.enc = [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)]
+        self.force_key = False      # every frame is a keyframe
+
+    def set_quality(self, quality):
+        self.enc[1] = int(quality)
+
+    def encode(self, frame, tags=None, now=None):
+        # -> (payload bytes, is_keyframe); (None, True) on failure
+        ok, jpeg = cv2.imencode(".jpg", frame, self.enc)
+        if not ok:
+            return None, True
+        data = jpeg.tobytes()
+        return (tag_jpeg(data, tags) if tags else data), True
+
+    def close(self):
+        pass
+
+
+class H264Encoder:
+    """
+    Software H.264 through PyAV (libx264, the same libraries ffmpeg uses).
+
+    Tuned for live monitoring: `tune` zerolatency means no B-frames and no
+    lookahead, so every input frame comes straight back out as one access unit.
+    SPS/PPS are repeated on every IDR so a client can join at any keyframe.
+    A keyframe comes every `gop` frames, or on the next frame after force_key is
+    set (new client, a client that dropped a frame). `bitrate` is in bits/s.
+    `encoder` can name a hardware encoder (e.g. "h264_v4l2m2m"); the x264
+    options are then not applied.
+    """
+
+    name = "h264"
+
+    def __init__(self, preset="ultrafast", gop=60, bitrate=800_000, fps=30.0, tune="zerolatency",
+                 encoder="libx264"):
+        if av is None:
+            raise RuntimeError("H.264 needs PyAV (pip install av)")
+        self.preset = preset
+        self.gop = int(gop)
+        self.bitrate = int(bitrate)
+        self.fps = float(fps)
+        self.tune = tune
+        self.encoder = encoder
+        self.base_bitrate = self.bitrate
+        self.base_quality = 60
+        self.force_key = True
+        self._ctx = None
+        self._size = None
+        self._t0 = None
+        self._pts = -1
+
+    def _open(self, w, h):
+        ctx = av.CodecContext.create(self.encoder, "w")
+        ctx.width, ctx.height = w, h
+        ctx.pix_fmt = "yuv420p"
+        ctx.bit_rate = self.bitrate
+        ctx.gop_size = self.gop
+        ctx.time_base = Fraction(1, 1000)
+        ctx.framerate = Fraction(self.fps).limit_denominator(1000)
+        if self.encoder == "libx264":
+            ctx.options = {"preset": self.preset, "tune": self.tune, "x264-params": "repeat-headers=1"}
+        ctx.open()
+        self._ctx = ctx
+        self._size = (w, h)
+        self._t0 = None
+        self._pts = -1
+        self.force_key = True
+
+    def set_quality(self, quality):
+        # Rate control speaks JPEG quality; scale the bitrate with it. Reopens on the next frame (a keyframe).
+        bitrate = int(self.base_bitrate * quality / self.base_quality)
+        if bitrate != self.bitrate:
+            self.bitrate = bitrate
+            self._size = None
+
+    def encode(self, frame, tags=None, now=None):
+        # -> (payload bytes, is_keyframe); (None, False) if the encoder produced nothing for this frame
+        h, w = frame.shape[:2]
+        if self._size != (w, h):
+            self._open(w, h)
+        fmt = "bgra" if frame.ndim == 3 and frame.shape[2] == 4 else "bgr24"
+        vf = av.VideoFrame.from_ndarray(frame, format=fmt)
+        # Wall-clock timestamps (ms): rate control stays right when sentinel/presence thin the frame rate
+        now = time.monotonic() if now is None else now
+        if self._t0 is None:
+            self._t0 = now
+        self._pts = max(self._pts + 1, int((now - self._t0) * 1000))
+        vf.pts = self._pts
+        if self.force_key:
+            vf.pict_type = PictureType.I
+            self.force_key = False
+        packets = self._ctx.encode(vf)
+        if not packets:
+            return None, False
+        key = any(p.is_keyframe for p in packets)
+        tag_bytes = json.dumps(tags, separators=(",", ":")).encode() if tags else b""
+        return H264_MAGIC + H264_HDR.pack(len(tag_bytes)) + tag_bytes + b"".join(bytes(p) for p in packets), key
+
+    def close(self):
+        self._ctx = None
+
+
+def available_codecs():
+    return [c for c in CODECS if c != "h264" or av is not None]
+
+
+def make_encoder(name, quality=60, **h264_opts):
+    if name == "mjpeg":
+        return MjpegEncoder(quality)
+    if name == "delta":
+        return DeltaEncoder(quality=quality)
+    if name == "h264":
+        enc = H264Encoder(**h264_opts)
+        enc.base_quality = int(quality)
+        return enc
+    raise ValueError(f"unknown codec {name!r}, expected one of {CODECS}")
@@ -0,0 +1,496 @@
+import json
+import queue
+import socket
+import struct
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from presence import PresenceDetector
+from rate_control import RateController
+from sentinel import SENTINEL, Sentinel
+from udp_sender import UdpVideoSender
+from video_codecs import available_codecs, make_encoder
+
+
+# -------- Cameras --------
+class PiCamera:
+    def __init__(self, size=(960, 540), lores_size=(320, 180)):
+        from picamera2 import Picamera2
+
+        self.size = size
+        self.lores_size = lores_size
+        self.picam2 = Picamera2()
+        # Keep resolution/quality modest; you can tune these.
+        # The lores (YUV420) stream is what sentinel mode watches; its Y plane is a free grey frame.
+        config = self.picam2.create_video_configuration(main={"size": size},
+                                                       lores={"size": lores_size, "format": "YUV420"})
+        self.picam2.configure(config)
+        self.still_config = self.picam2.create_still_configuration()    # full sensor resolution
+        self.picam2.start()
+        time.sleep(0.5)  # warm-up
+
+    def read(self):
+        return self.picam2.capture_array()
+
+    def read_lores(self):
+        # Grey lores frame only; the main stream is never copied out
+        return self.picam2.capture_array("lores")[:self.lores_size[1]]
+
+    def set_frame_rate(self, fps):
+        # Sensor + ISP run at this rate, which is where the sentinel saving comes from
+        self.picam2.set_controls({"FrameRate": float(fps)})
+
+    def capture_still(self):
+        # Briefly switches the sensor to the full-resolution mode and back (a few hundred ms gap)
+        return self.picam2.switch_mode_and_capture_array(self.still_config, "main")
+
+    def close(self):
+        try:
+            self.picam2.stop()
+        except Exception:
+            pass
+
+
+class SyntheticCamera:
+    """Noisy static scene with an occasional moving blob; for benchmarks and load tests off the Pi."""
+
+    def __init__(self, size=(960, 540), fps=30.0, animal_every=10.0, animal_for=4.0, seed=0, realtime=True,
+                 lores_size=(320, 180)):
+        self.size = size
+        self.lores_size = lores_size
+        self.dt = 1.0 / fps
+        self.realtime = bool(realtime)      # False: no pacing, scene time advances dt per frame
+        self.animal_every = float(animal_every)
+        self.animal_for = float(animal_for)
+        w, h = size
+        rng = np.random.default_rng(seed)
+        self._bg_small = rng.integers(40, 200, (h // 8, w // 8, 3), dtype=np.uint8)
+        self._noise = rng.integers(-6, 7, (4, h, w, 3), dtype=np.int16)
+        self._scenes = {}
+        self.t0 = time.monotonic()
+        self.n = 0
+        self._next = self.t0
+
+    def scene_time(self):
+        return time.monotonic() - self.t0 if self.realtime else self.n * self.dt
+
+    def animal_visible(self, t):
+        return self.animal_every > 0 and (t % self.animal_every) < self.animal_for
+
+    def set_frame_rate(self, fps):
+        self.dt = 1.0 / fps
+
+    def _scene(self, size):
+        if size not in self._scenes:
+            w, h = size
+            bg = cv2.resize(self._bg_small, (w, h), interpolation=cv2.INTER_LINEAR)
+            self._scenes[size] = (bg, self._noise[:, :h, :w])
+        return self._scenes[size]
+
+    def _render(self, size):
+        if self.realtime:
+            self._next += self.dt
+            delay = self._next - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                self._next = time.monotonic()
+        t = self.scene_time()
+        bg, noise = self._scene(size)
+        frame = np.clip(bg + noise[self.n % len(noise)], 0, 255).astype(np.uint8)
+        self.n += 1
+        if self.animal_visible(t):
+            w, h = size
+            k = w / 960.0
+            x = int((t % self.animal_every) / self.animal_for * (w - 120 * k))
+            cv2.ellipse(frame, (int(60 * k) + x, int(h * 0.6)), (int(50 * k), int(28 * k)), 0, 0, 360,
+                        (25, 35, 45), -1)
+        return frame
+
+    def read(self):
+        return self._render(self.size)
+
+    def read_lores(self):
+        return cv2.cvtColor(self._render(self.lores_size), cv2.COLOR_BGR2GRAY)
+
+    def capture_still(self):
+        return cv2.resize(self.read(), None, fx=2, fy=2, interpolation=cv2.INTER_LINEAR)
+
+    def close(self):
+        pass
+
+
+def open_camera(kind="pi", size=(960, 540)):
+    if kind == "synthetic":
+        return SyntheticCamera(size)
+    return PiCamera(size)
+
+
+# -------- Video Streaming Server --------
+def video_streaming_server(host='', port=8000, camera="pi", size=(960, 540), jpeg_quality=60,
+                           presence=False, presence_onnx=None, idle_interval=2.0,
+                           sentinel=False, sentinel_fps=2.0, active_fps=30.0, sentinel_hold=20.0,
+                           stills=None, udp=False, delta=False, codec="mjpeg", h264_opts=None,
+                           hello_timeout=0.5, rate_control=False, target_latency=0.25, session=None):
+    """
+    presence=True runs the on-Pi PresenceDetector: every frame is scored, frames
+    carry the score in a JPEG COM tag, and while nothing is present only one
+    keyframe every `idle_interval` seconds is encoded and sent.
+
+    sentinel=True duty-cycles the camera (see Sentinel): low-rate lores motion
+    watch until something moves, then full-rate streaming for `sentinel_hold`
+    seconds. Every frame carries the current mode in its tag.
+
+    stills: optional StillServer; pending SNAP requests are served between frames.
+
+    udp=True also serves the same frames over UDP on the same port number
+    (UdpVideoSender): fragmented, never retransmitted, late frames dropped.
+
+    delta=True sends only changed tiles between periodic JPEG keyframes
+    (DeltaEncoder). Needs a delta-aware client (VideoClient); a client that
+    misses a delta is held back until the keyframe forced for it.
+
+    codec: "mjpeg", "delta" (same as delta=True) or "h264" (H264Encoder,
+    tuned with h264_opts: preset, gop, bitrate). A client may open with one
+    JSON hello line {"codecs": [preferred, ...]}; it is answered with a JSON
+    header line {"codec", "w", "h", "codecs"} and gets the first codec both
+    sides support. Clients that say nothing within `hello_timeout` get
+    `codec` with no header, exactly as before. Each codec in use is encoded
+    once per frame and shared by its clients; UDP always carries `codec`.
+
+    rate_control=True runs a RateController: clients that ask for it in their
+    hello ("acks": true) send one JSON line per decoded frame back on the same
+    connection ({"f": frame seq, "p": their ms per frame}), and quality,
+    resolution and frame rate are adjusted to hold `target_latency` seconds.
+    Frames then carry "f" (seq), "t" (capture time), "q" and "s" tags.
+
+    session: optional SessionServer; its video channels are served like any
+    other client connection.
+    """
+
+    class ClientWriter(threading.Thread):
+        def __init__(self, conn, on_close, on_need_key=None, codec="mjpeg", acks=False):
+            super().__init__(daemon=True)
+            self.conn = conn
+            self.codec = codec
+            self.acks = acks
+            self.inflight = {}      # frame seq -> (capture time, bytes) for frames sent and not yet acked
+            self.samples = []       # (seq, latency) since the last report
+            self.proc_ms = None
+            self.ack_lock = threading.Lock()
+            self.q = queue.Queue(maxsize=1)  # latest frame only
+            self.on_close = on_close
+            self.on_need_key = on_need_key
+            self.need_key = on_need_key is not None     # delta mode: start from a keyframe
+            self.alive = True
+            # Keep sends from blocking forever
+            try:
+                self.conn.settimeout(2.0)
+                # Modest send buffer helps smoothness without hiding backpressure. Rate-controlled
+                # clients get a small one: frames then queue here, where they can be dropped
+                # and measured, instead of in the kernel.
+                self.conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, (64 if acks else 256) * 1024)
+            except Exception:
+                pass
+
+        def push(self, frame_bytes, key=True, seq=None, t_cap=None):
+            # Delta / H.264: inter frames only make sense on top of everything sent before them
+            if not key and self.need_key:
+                return
+            # Drop previous frame if still waiting to be sent
+            try:
+                if self.q.full():
+                    _ = self.q.get_nowait()
+                    if not key:
+                        # This client lost a frame its canvas depends on: resync on a keyframe
+                        self.need_key = True
+                        self.on_need_key()
+                        return
+                self.q.put_nowait((frame_bytes, seq, t_cap))
+                if key:
+                    self.need_key = False
+            except queue.Full:
+                # Extremely rare with the get_nowait above; okay to drop
+                pass
+
+        def run(self):
+            try:
+                while self.alive:
+                    item = self.q.get()  # blocks until a frame is available
+                    if item is None:
+                        break
+                    data, seq, t_cap = item
+                    if self.acks and seq is not None:
+                        with self.ack_lock:
+                            self.inflight[seq] = (t_cap, len(data))
+                    # length-prefix then payload
+                    self.conn.sendall(struct.pack(">I", len(data)))
+                    self.conn.sendall(data)
+            except Exception:
+                # client likely disconnected / too slow / timeout
+                pass
+            finally:
+                try:
+                    self.conn.close()
+                except Exception:
+                    pass
+                self.on_close(self)
+
+        def read_acks(self):
+            # Runs on its own thread; the socket timeout only means the client had nothing to say
+            buf = b""
+            while self.alive:
+                try:
+                    more = self.conn.recv(4096)
+                except socket.timeout:
+                    continue
+                except OSError:
+                    break
+                if not more:
+                    break
+                buf += more
+                *lines, buf = buf.split(b"\n")
+                now = time.monotonic()
+                for line in lines:
+                    try:
+                        ack = json.loads(line)
+                        self.ack(int(ack["f"]), ack.get("p"), now)
+                    except (ValueError, KeyError, TypeError):
+                        pass
+
+        def ack(self, seq, proc_ms, now):
+            with self.ack_lock:
+                sent = self.inflight.pop(seq, None)
+                # Anything older than an acked frame will never be acked (client skipped it)
+                for s in [s for s in self.inflight if s < seq]:
+                    del self.inflight[s]
+                if sent is not None:
+                    self.samples.append((seq, now - sent[0], sent[1]))
+                if proc_ms is not None:
+                    self.proc_ms = float(proc_ms)
+
+        def report(self, now):
+            # -> (samples, (seq, age) of the oldest unacked frame or None, client ms per frame or None)
+            with self.ack_lock:
+                samples, self.samples = self.samples, []
+                oldest = None
+                if self.inflight:
+                    seq = min(self.inflight)
+                    oldest = (seq, now - self.inflight[seq][0])
+                return samples, oldest, self.proc_ms
+
+        def stop(self):
+            self.alive = False
+            # Unblock the queue
+            try:
+                self.q.put_nowait(None)
+            except Exception:
+                pass
+
+    # ---- server socket ----
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server_socket.bind((host, port))
+    server_socket.listen(16)
+    print(f"[VIDEO] Listening on port {port}...")
+    udp_sender = UdpVideoSender(host, port) if udp else None
+
+    # ---- codecs ----
+    offered = available_codecs()
+    default_codec = "delta" if delta else codec
+    if default_codec not in offered:
+        print(f"[VIDEO] codec {default_codec} unavailable here, using mjpeg")
+        default_codec = "mjpeg"
+    h264_opts = dict({"fps": active_fps}, **(h264_opts or {}))
+    encoders = {}       # codec name -> encoder, created when the first client asks for it
+
+    def encoder(name):
+        if name not in encoders:
+            encoders[name] = make_encoder(name, quality=jpeg_quality, **h264_opts)
+            print(f"[VIDEO] {name} encoder started")
+        return encoders[name]
+
+    encoder(default_codec)
+    rc = RateController(target=target_latency, quality=jpeg_quality, fps=active_fps) if rate_control else None
+    applied_quality = {}    # codec name -> quality last set from the rate controller
+
+    # ---- camera ----
+    cam = open_camera(camera, size)
+    detector = PresenceDetector(onnx_path=presence_onnx) if presence else None
+    duty = Sentinel(cam, sentinel_fps=sentinel_fps, active_fps=active_fps, hold=sentinel_hold) if sentinel else None
+
+    # ---- client registry ----
+    clients = set()
+    lock = threading.Lock()
+
+    def on_close(writer):
+        with lock:
+            if writer in clients:
+                clients.remove(writer)
+        print("[VIDEO] client closed")
+
+    def key_requester(name):
+        def need_key():
+            encoders[name].force_key = True
+        return need_key
+
+    if udp_sender is not None:
+        udp_sender.on_need_key = key_requester(default_codec)
+
+    # ---- accept loop ----
+    def read_hello(conn):
+        # One short JSON line, or None if the client sends nothing (legacy client)
+        line = b""
+        try:
+            conn.settimeout(hello_timeout)
+            while not line.endswith(b"\n") and len(line) < 1024:
+                more = conn.recv(1)
+                if not more:
+                    return None
+                line += more
+            return json.loads(line)
+        except (OSError, ValueError):
+            return None
+
+    def handshake(conn, addr):
+        hello = read_hello(conn)
+        name = default_codec
+        acks = False
+        if isinstance(hello, dict):
+            wanted = [c for c in hello.get("codecs") or [] if c in offered]
+            name = wanted[0] if wanted else default_codec
+            acks = bool(hello.get("acks")) and rc is not None
+            header = {"codec": name, "w": size[0], "h": size[1], "codecs": offered, "acks": acks}
+            try:
+                conn.sendall((json.dumps(header) + "\n").encode("utf-8"))
+            except OSError:
+                conn.close()
+                return
+        print(f"[VIDEO] client {addr} streaming {name}{'' if hello else ' (no hello)'}")
+        with lock:
+            enc = encoder(name)
+            inter = name != "mjpeg"
+            writer = ClientWriter(conn, on_close, key_requester(name) if inter else None, codec=name, acks=acks)
+            enc.force_key = inter
+            clients.add(writer)
+        writer.start()
+        if acks:
+            threading.Thread(target=writer.read_acks, daemon=True).start()
+
+    def accept_loop():
+        while True:
+            conn, addr = server_socket.accept()
+            print(f"[VIDEO] client connected from {addr}")
+            # The hello wait must not hold up other clients
+            threading.Thread(target=handshake, args=(conn, addr), daemon=True).start()
+
+    threading.Thread(target=accept_loop, daemon=True).start()
+    if session is not None:
+        session.handlers["video"] = handshake
+
+    # ---- capture + fan-out ----
+    last_sent = 0.0
+    was_present = None
+
+    def send(frame, tags):
+        t_cap = time.monotonic()
+        with lock:
+            groups = {}
+            for w in clients:
+                groups.setdefault(w.codec, []).append(w)
+            if udp_sender is not None:
+                groups.setdefault(default_codec, [])
+        seq = None
+        if rc is not None:
+            seq = rc.next_seq()
+            tags = dict(tags, **rc.tags(seq))
+            if rc.scale < 1.0:
+                h, w = frame.shape[:2]
+                # Even sizes keep 4:2:0 codecs happy
+                frame = cv2.resize(frame, (int(w * rc.scale) // 2 * 2, int(h * rc.scale) // 2 * 2),
+                                   interpolation=cv2.INTER_AREA)
+        ok = True
+        # One encode per codec in use, shared by all of its clients
+        for name, writers in groups.items():
+            if rc is not None and applied_quality.get(name) != rc.quality:
+                encoders[name].set_quality(rc.quality)
+                applied_quality[name] = rc.quality
+            data, key = encoders[name].encode(frame, tags)
+            if data is None:
+                ok = False
+                continue
+            if rc is not None:
+                rc.sent(len(data))
+            # push latest frame; slow clients auto-drop old frames
+            for w in writers:
+                w.push(data, key, seq, t_cap)
+            if udp_sender is not None and name == default_codec:
+                udp_sender.push(data, key)
+        return ok
+
+    def ack_reports(now):
+        with lock:
+            acking = [w for w in clients if w.acks]
+        return [w.report(now) for w in acking]
+
+    try:
+        while True:
+            if stills is not None and stills.pending():
+                ids = stills.take()
+                try:
+                    stills.submit(ids, cam.capture_still())
+                except Exception as e:
+                    print(f"[VIDEO] still capture failed for {ids}: {e}")
+
+            if duty is not None and duty.state == SENTINEL:
+                changed = duty.update()
+                now = time.monotonic()
+                if duty.state == SENTINEL:
+                    # Asleep: one keyframe now and then so clients know the robot is alive
+                    if changed or now - last_sent >= duty.keyframe_interval:
+                        if send(cam.read(), dict(duty.tags(), key=1)):
+                            last_sent = now
+                    continue
+                # Escalated: fall through and stream this frame straight away
+
+            frame = cam.read()
+            now = time.monotonic()
+            tags = {}
+            force = False
+            if duty is not None:
+                force = duty.observe(frame)     # state changes are always sent
+                tags.update(duty.tags())
+            if detector is not None:
+                score = detector.score(frame)
+                present = detector.present(score, now)
+                if present != was_present:
+                    print(f"[VIDEO] presence {'on' if present else 'off'} (score {score:.2f})")
+                    was_present = present
+                # Nothing there: skip the encode entirely except for the periodic keyframe
+                if not present and not force and now - last_sent < idle_interval:
+                    continue
+                tags.update(p=round(score, 3), on=int(present), key=int(not present))
+            if rc is not None:
+                if rc.tick(now, lambda: ack_reports(now)):
+                    print(f"[VIDEO] rate control: {rc.describe()}")
+                # Frame-rate step of the controller: capture keeps running, the encode is skipped
+                if not force and not rc.due(now):
+                    continue
+            if send(frame, tags):
+                last_sent = now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        with lock:
+            for w in list(clients):
+                w.stop()
+        try:
+            server_socket.close()
+        except Exception:
+            pass
+        cam.close()
+        for enc in encoders.values():
+            enc.close()